@@ -1,7 +1,14 @@
 # analyzer.py
 import os
-from utils import is_video_file, is_part_file, get_video_info, find_best_quality_video, calculate_quality_score
+import re
+from utils import is_video_file, is_part_file, get_video_infos, iter_video_infos, find_best_quality_video, calculate_quality_score
 from sanitizer import sanitize_name
+from duplicate_index import find_duplicate_groups
+from inventory import get_inventory
+from perceptual import get_fingerprints, find_near_duplicate_groups
+from report_writer import ReportWriter, file_record
+from profiler import profiled
+from download_tracker import active_packages
 from colorama import Fore, Style
 
 FFPROBE_FIELDS = {
@@ -12,6 +19,10 @@ FFPROBE_FIELDS = {
     "duration": "Duration",
 }
 EXTRA_FIELDS = ["Size (MB)"]
+ANSI_PATTERN = re.compile(r'\x1B(?:[@-Z\\-_]|\[[0-?]*[ -/]*[@-~])')
+
+def strip_ansi(text):
+    return ANSI_PATTERN.sub('', str(text))
 
 def compare_video_infos(video_infos):
     differences = {}
@@ -22,15 +33,12 @@ def compare_video_infos(video_infos):
             differences[key] = values
     return differences
 
+@profiled("print table")
 def print_video_info_table(video_files, video_infos, differences):
     headers = ["Quality Score"] + list(FFPROBE_FIELDS.values()) + EXTRA_FIELDS + ["Filename"]
     rows = []
     best_index = find_best_quality_video(video_files, video_infos)
 
-    def strip_ansi(text):
-        import re
-        return re.sub(r'\x1B(?:[@-Z\\-_]|\[[0-?]*[ -/]*[@-~])', '', str(text))
-
     for i, (path, info) in enumerate(zip(video_files, video_infos)):
         filename = os.path.basename(path)
         sanitized_name = sanitize_name(os.path.splitext(filename)[0]) + os.path.splitext(filename)[1]
@@ -69,27 +77,24 @@ def print_video_info_table(video_files, video_infos, differences):
         row.append(display_name)
         rows.append(row)
 
-    col_widths = [max(len(strip_ansi(str(cell))) for cell in col) for col in zip(*rows, headers)]
-    header_line = " | ".join(f"{h:<{col_widths[i]}}" for i, h in enumerate(headers))
-    separator = "-+-".join("-" * col_widths[i] for i in range(len(headers)))
-    print(header_line)
-    print(separator)
-    for row in rows:
-        print(" | ".join(str(row[i]) + ' ' * (col_widths[i] - len(strip_ansi(str(row[i])))) for i in range(len(row))))
+    # Visible width of every cell, measured once and reused for padding
+    cells = [[str(cell) for cell in row] for row in rows]
+    widths = [[len(strip_ansi(cell)) for cell in row] for row in cells]
+    col_widths = [max(col) for col in zip(*widths, [len(h) for h in headers])]
+    lines = [" | ".join(f"{h:<{col_widths[i]}}" for i, h in enumerate(headers)),
+             "-+-".join("-" * col_widths[i] for i in range(len(headers)))]
+    for row, row_widths in zip(cells, widths):
+        lines.append(" | ".join(cell + ' ' * (col_widths[i] - row_widths[i]) for i, cell in enumerate(row)))
+    print("\n".join(lines))
 
-def count_videos(dir_path):
-    video_files = []
-    for root, _, files in os.walk(dir_path):
-        for f in files:
-            if is_video_file(f):
-                video_files.append(os.path.join(root, f))
-    return len(video_files)
+def count_videos(dir_path, inventory):
+    return sum(1 for f in inventory.files(dir_path) if is_video_file(f))
 
-def analyze_directory(dir_path):
+def list_directory(dir_path, inventory):
     video_files = []
     part_files = []
     needing_sanitize = []
-    for root, _, files in os.walk(dir_path):
+    for root, _, files in inventory.walk(dir_path):
         for f in files:
             if is_video_file(f):
                 video_files.append(os.path.join(root, f))
@@ -101,6 +106,11 @@ def analyze_directory(dir_path):
             highlight = filename != sanitized
             if highlight:
                 needing_sanitize.append(filename)
+    return video_files, part_files, needing_sanitize
+
+def analyze_directory(dir_path, listing=None, video_infos=None, inventory=None):
+    inventory = get_inventory(dir_path, inventory)
+    video_files, part_files, needing_sanitize = listing or list_directory(dir_path, inventory)
 
     video_count = len(video_files)
     part_count = len(part_files)
@@ -116,7 +126,8 @@ def analyze_directory(dir_path):
             print(Fore.YELLOW + f"   - Incomplete file: {os.path.basename(part_file)}" + Style.RESET_ALL)
 
         if video_count > 1:
-            video_infos = [get_video_info(f) for f in video_files]
+            if video_infos is None:
+                video_infos = get_video_infos(video_files, inventory)
             diffs = compare_video_infos(video_infos)
             print("Video Properties (Best Quality marked in BLUE):\n")
             print_video_info_table(video_files, video_infos, diffs)
@@ -129,69 +140,113 @@ def analyze_directory(dir_path):
 
     return video_files, part_files
 
-def count_files(root):
+def report_directory(dir_path, listing, video_infos, report):
+    """Machine-readable counterpart of analyze_directory: one record per folder and per file."""
+    video_files, part_files, _ = listing
+    best_index = find_best_quality_video(video_files, video_infos) if len(video_files) > 1 else None
+    report.write({"record": "folder", "path": dir_path, "videos": len(video_files), "parts": len(part_files),
+                  "downloading": False})
+    for i, (path, info) in enumerate(zip(video_files, video_infos)):
+        score = None if "error" in info else round(calculate_quality_score(info), 1)
+        report.write(file_record(path, dir_path, info, i == best_index, score))
+    return video_files, part_files
+
+def count_files(root, inventory=None):
+    inventory = get_inventory(root, inventory)
     total_video_files = 0
 
     print("\nCounting Video Files...\n...")
 
-    for entry in os.listdir(root):
-        full_path = os.path.join(root, entry)
-        if os.path.isdir(full_path):
-            videos = count_videos(full_path)
-            total_video_files += videos
+    for full_path in inventory.subdirs(root):
+        total_video_files += count_videos(full_path, inventory)
 
     print("\n" + "=" * 50)
     print("Summary:")
     print(f" Total video files:              {total_video_files}")
 
-def scan_root_directory(root):
+def scan_root_directory(root, inventory=None, perceptual=False, report=None):
+    """Analyze every package folder, then look for duplicates across folders.
+
+    With a ReportWriter, results are streamed as records instead of the
+    colorized tables and lists.
+    """
+    inventory = get_inventory(root, inventory)
     total_video_files = 0
     total_folders_with_duplicates = 0
     total_incomplete_folders = 0
     all_video_files = []
     all_video_infos = []
 
-    for entry in os.listdir(root):
-        full_path = os.path.join(root, entry)
-        if os.path.isdir(full_path):
-            videos, parts = analyze_directory(full_path)
-            total_video_files += len(videos)
-            if len(videos) > 1:
-                total_folders_with_duplicates += 1
-            if len(parts) > 0:
-                total_incomplete_folders += 1
-
-            for vf in videos:
-                vi = get_video_info(vf)
-                if "error" not in vi:
-                    all_video_files.append(vf)
-                    all_video_infos.append(vi)
+    directories = inventory.subdirs(root)
+    listings = [list_directory(d, inventory) for d in directories]
+    # Half-written videos would only waste probes (and compete with the downloader for I/O)
+    downloading = active_packages(root, inventory, announce=report is None)
+
+    # Probe every folder's videos on the shared pool; results come back in
+    # order, so each folder is reported as soon as its own probes finish.
+    infos = iter_video_infos((vf for full_path, listing in zip(directories, listings)
+                              if full_path not in downloading for vf in listing[0]), inventory)
+    for full_path, listing in zip(directories, listings):
+        if full_path in downloading:
+            total_incomplete_folders += 1
+            if report is not None:
+                report.write({"record": "folder", "path": full_path, "videos": len(listing[0]),
+                              "parts": len(listing[1]), "downloading": True})
+            continue
+        video_infos = [next(infos) for _ in listing[0]]
+        if report is None:
+            videos, parts = analyze_directory(full_path, listing, video_infos, inventory)
+        else:
+            videos, parts = report_directory(full_path, listing, video_infos, report)
+        total_video_files += len(videos)
+        if len(videos) > 1:
+            total_folders_with_duplicates += 1
+        if len(parts) > 0:
+            total_incomplete_folders += 1
+
+        for vf, vi in zip(videos, video_infos):
+            if "error" not in vi:
+                all_video_files.append(vf)
+                all_video_infos.append(vi)
 
     # Global duplicate detection
-    print("\nChecking for similar videos across folders...")
-    duplicates_found = 0
-    threshold_seconds = 2
-    threshold_resolution = 32
-    visited = set()
-
-    for i in range(len(all_video_infos)):
-        for j in range(i + 1, len(all_video_infos)):
-            info_a = all_video_infos[i]
-            info_b = all_video_infos[j]
-            if i in visited or j in visited:
-                continue
-            try:
-                duration_diff = abs(float(info_a["Duration"]) - float(info_b["Duration"]))
-                width_diff = abs(int(info_a["Width"]) - int(info_b["Width"]))
-                height_diff = abs(int(info_a["Height"]) - int(info_b["Height"]))
-                if duration_diff < threshold_seconds and width_diff < threshold_resolution and height_diff < threshold_resolution:
-                    print(Fore.CYAN + f"Possible duplicate across folders:\n  {all_video_files[i]}\n  {all_video_files[j]}" + Style.RESET_ALL)
-                    print(Fore.YELLOW + f'Duration:{info_a["Duration"]}=={info_b["Duration"]} Width={info_a["Width"]}=={info_b["Width"]} Height={info_a["Height"]}=={info_b["Height"]}' + Style.RESET_ALL)
-                    duplicates_found += 1
-                    visited.add(i)
-                    visited.add(j)
-            except:
+    if report is None:
+        print("\nChecking for similar videos across folders...")
+    groups = find_duplicate_groups(all_video_files, all_video_infos)
+    for number, group in enumerate(groups, 1):
+        if report is not None:
+            report.write({"record": "duplicate_group", "kind": "similar", "group": number,
+                          "files": [path for path, _ in group]})
+            continue
+        print(Fore.CYAN + f"Possible duplicates across folders ({len(group)} files):" + Style.RESET_ALL)
+        for path, info in group:
+            print(Fore.CYAN + f"  {path}" + Style.RESET_ALL)
+            print(Fore.YELLOW + f'    Duration:{info["Duration"]} Width={info["Width"]} Height={info["Height"]}' + Style.RESET_ALL)
+    duplicates_found = len(groups)
+
+    near_duplicates_found = 0
+    if perceptual:
+        if report is None:
+            print("\nComparing video fingerprints across folders...")
+        fingerprints = get_fingerprints(all_video_files, all_video_infos, inventory)
+        near_groups = find_near_duplicate_groups(all_video_files, fingerprints)
+        for number, group in enumerate(near_groups, len(groups) + 1):
+            if report is not None:
+                report.write({"record": "duplicate_group", "kind": "visual", "group": number, "files": group})
                 continue
+            print(Fore.CYAN + f"Visually similar videos across folders ({len(group)} files):" + Style.RESET_ALL)
+            for path in group:
+                print(Fore.CYAN + f"  {path}" + Style.RESET_ALL)
+        near_duplicates_found = len(near_groups)
+
+    if report is not None:
+        summary = {"record": "summary", "videos": total_video_files,
+                   "folders_with_duplicates": total_folders_with_duplicates,
+                   "incomplete_folders": total_incomplete_folders, "similar_groups": duplicates_found}
+        if perceptual:
+            summary["visual_groups"] = near_duplicates_found
+        report.write(summary)
+        return
 
     print("\n" + "="*50)
     print("Summary:")
@@ -199,4 +254,14 @@ def scan_root_directory(root):
     print(f" Folders with duplicates:        {total_folders_with_duplicates}")
     print(f" Folders with incomplete files:  {total_incomplete_folders}")
     print(f" Similar videos across folders:  {duplicates_found}")
+    if perceptual:
+        print(f" Visually similar across folders: {near_duplicates_found}")
     print("="*50)
+
+def run_analysis(root, inventory=None, perceptual=False, report_format="table", report_output=None):
+    """Analyze as a colorized table, or stream jsonl/csv records to report_output (default stdout)."""
+    if report_format == "table":
+        scan_root_directory(root, inventory, perceptual)
+        return
+    with ReportWriter(report_format, report_output) as report:
+        scan_root_directory(root, inventory, perceptual, report)
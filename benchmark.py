@@ -0,0 +1,334 @@
+# benchmark.py
+"""Time the main operations on a synthetic download tree.
+
+    python benchmark.py --folders 2000 --latency 0.005
+    python benchmark.py --save baseline.json
+    python benchmark.py --baseline baseline.json   # exits 1 on a regression
+
+The tree looks like a JDownloader output folder: one folder per package,
+dirty names, leftover .part files and duplicate copies. Videos are random
+bytes probed by a deterministic fake ffprobe/ffmpeg put first on PATH
+(--latency sleeps in each call to mimic a real probe), or with --real-clips
+tiny clips made by the real ffmpeg. Every operation runs on a fresh copy of
+the tree inside a scratch working directory, so config.json, probe_cache.db
+and tools_cache.json of the real setup are never touched.
+"""
+import io
+import os
+import sys
+import json
+import time
+import random
+import shutil
+import logging
+import argparse
+import tempfile
+import threading
+import subprocess
+from pathlib import Path
+from collections import Counter
+from contextlib import redirect_stdout
+from colorama import Fore, Style
+
+DEFAULT_FOLDERS = 500
+DEFAULT_VIDEOS = 3
+# Relative wall-time slowdown tolerated before --baseline reports a regression
+DEFAULT_TOLERANCE = 0.25
+
+DIRTY_NAMES = ["Show #4k #new", "Clip★Special__Edition", "Trip [1080p] (final)", "Talk--Recording__",
+               "Vlog #day#12 ~extended~", "Concert  Live!!", "Tutorial_part__3", "Holiday (Kopie)"]
+EXTENSIONS = [".mp4", ".mkv", ".mp4", ".webm", ".mov"]
+# (width, height, frame rate) picked per file by the fake ffprobe and by --real-clips
+VARIANTS = [(640, 360, "25/1"), (1280, 720, "30000/1001"), (1920, 1080, "30/1")]
+
+FAKE_FFPROBE = r'''
+import os, sys, json, time
+time.sleep(float(os.environ.get("DLVD_BENCH_LATENCY", "0")))
+if "-version" in sys.argv:
+    print("ffprobe version bench"); sys.exit(0)
+path = sys.argv[-1]
+try:
+    size = os.path.getsize(path)
+except OSError as e:
+    sys.stderr.write(str(e) + "\n"); sys.exit(1)
+if size == 0:
+    sys.stderr.write("Invalid data found when processing input\n"); sys.exit(1)
+width, height, rate = VARIANTS[size % len(VARIANTS)]
+duration = 60.0 + size % 600
+stream = {"codec_type": "video", "codec_name": ("h264", "hevc", "mpeg4")[size % 3], "width": width,
+          "height": height, "r_frame_rate": rate, "bit_rate": str(int(size * 8 / duration)),
+          "duration": "%.6f" % duration}
+print(json.dumps({"streams": [stream], "format": {"duration": stream["duration"], "size": str(size)}}))
+'''
+
+FAKE_FFMPEG = r'''
+import os, sys, time
+args = sys.argv
+if "-version" in args:
+    print("ffmpeg version bench"); sys.exit(0)
+if "-encoders" in args:
+    print(" ------\n V..... libx264 H.264\n V..... libx265 HEVC\n V..... libvpx-vp9 VP9\n V..... mpeg4 MPEG-4")
+    sys.exit(0)
+time.sleep(float(os.environ.get("DLVD_BENCH_LATENCY", "0")))
+if "null" in args:
+    sys.exit(0)
+source, target = args[args.index("-i") + 1], args[-1]
+if target == "-":
+    sys.stdout.buffer.write(b"\0" * 64); sys.exit(0)
+with open(target, "wb") as f:
+    f.write(b"\0" * (os.path.getsize(source) // 2))
+'''
+
+
+def install_fake_tools(bin_dir, latency=0.0):
+    """Write fake ffprobe/ffmpeg scripts to bin_dir and put it first on PATH."""
+    os.makedirs(bin_dir, exist_ok=True)
+    for name, body in (("ffprobe", FAKE_FFPROBE), ("ffmpeg", FAKE_FFMPEG)):
+        path = os.path.join(bin_dir, name)
+        with open(path, "w") as f:
+            f.write(f"#!{sys.executable}\nVARIANTS = {VARIANTS!r}\n{body}")
+        os.chmod(path, 0o755)
+    os.environ["PATH"] = bin_dir + os.pathsep + os.environ.get("PATH", "")
+    os.environ["DLVD_BENCH_LATENCY"] = str(latency)
+
+
+def make_real_clips(clip_dir):
+    """Encode one tiny clip per variant and container with the real ffmpeg."""
+    os.makedirs(clip_dir, exist_ok=True)
+    clips = []
+    for width, height, rate in VARIANTS:
+        for ext in (".mp4", ".mkv"):
+            path = os.path.join(clip_dir, f"{width}x{height}{ext}")
+            subprocess.run(['ffmpeg', '-v', 'error', '-y', '-f', 'lavfi',
+                            '-i', f'testsrc=size={width}x{height}:rate={rate}:duration=1',
+                            '-c:v', 'mpeg4', '-pix_fmt', 'yuv420p', path], check=True, timeout=60)
+            clips.append(path)
+    return clips
+
+
+def random_bytes(rng, count):
+    return rng.getrandbits(count * 8).to_bytes(count, "little")
+
+
+def generate_library(root, folders=DEFAULT_FOLDERS, videos=DEFAULT_VIDEOS, duplicate_ratio=0.3,
+                     part_ratio=0.1, seed=0, clips=None):
+    """Fill root with a synthetic download tree and return how many files it holds.
+
+    Everything is derived from `seed`, so the same arguments always give the
+    same names, sizes and duplicates. Without `clips` videos are 4-64 KiB of
+    random bytes for the fake ffprobe; with clips each video is a copy of one.
+    """
+    rng = random.Random(seed)
+    total = 0
+    for i in range(folders):
+        package = os.path.join(root, f"{rng.choice(DIRTY_NAMES)} {i:05d}")
+        os.makedirs(package)
+        names = []
+        for j in range(rng.randint(1, videos)):
+            name = f"{rng.choice(DIRTY_NAMES)} {j}{rng.choice(EXTENSIONS)}"
+            if name in names:
+                continue
+            names.append(name)
+            path = os.path.join(package, name)
+            if clips:
+                shutil.copyfile(rng.choice(clips), path)
+            else:
+                with open(path, "wb") as f:
+                    f.write(random_bytes(rng, rng.randint(4, 64) * 1024))
+            total += 1
+            if rng.random() < duplicate_ratio:
+                base, ext = os.path.splitext(name)
+                shutil.copyfile(path, os.path.join(package, f"{base} (1){ext}"))
+                total += 1
+        if rng.random() < part_ratio:
+            with open(os.path.join(package, names[0] + ".part"), "wb") as f:
+                f.write(random_bytes(rng, 1024))
+            total += 1
+    return total
+
+
+class AuditCounter:
+    """Count filesystem and subprocess audit events (PEP 578) while active.
+
+    CPython raises no audit event for stat(), so stat calls are not counted;
+    opens, directory listings, renames, removals and process spawns are.
+    Audit hooks can't be removed, so one counter is installed per process.
+    """
+
+    GROUPS = {"open": "opens", "os.scandir": "listings", "os.listdir": "listings", "os.rename": "renames",
+              "os.remove": "removes", "os.rmdir": "removes", "shutil.rmtree": "removes",
+              "subprocess.Popen": "subprocesses"}
+
+    def __init__(self):
+        self.active = False
+        self.counts = Counter()
+        self.tools = Counter()
+        self.lock = threading.Lock()
+        sys.addaudithook(self.hook)
+
+    def hook(self, event, args):
+        if not self.active:
+            return
+        group = self.GROUPS.get(event)
+        if group is None and event.startswith(("os.", "shutil.")):
+            group = "other"
+        if group is None:
+            return
+        with self.lock:
+            self.counts[group] += 1
+            if group == "subprocesses":
+                argv = args[1]
+                argv = [argv] if isinstance(argv, (str, bytes)) else argv
+                self.tools[os.path.basename(os.fsdecode(argv[0]))] += 1
+
+    def start(self):
+        with self.lock:
+            self.counts.clear()
+            self.tools.clear()
+        self.active = True
+
+    def stop(self):
+        self.active = False
+        return dict(self.counts), dict(self.tools)
+
+
+def operations(root, target):
+    """Name -> callable for each benchmarked operation, all imported lazily."""
+    from analyzer import scan_root_directory
+    from deduplicator import remove_duplicates
+    from sanitizer import rename_recursively
+    from file_mover import copy_all_contents
+    from codec_processor import VideoAnalyzer
+    return {
+        "analyze": lambda: scan_root_directory(root),
+        "duplicates": lambda: remove_duplicates(root),
+        "sanitize": lambda: rename_recursively(root),
+        "copy": lambda: copy_all_contents(target),
+        "codec scan": lambda: VideoAnalyzer().scan_directory(Path(root)),
+    }
+
+
+def run_benchmarks(library, workdir, names=None, repeat=1, cache=False):
+    """Run each operation `repeat` times on a fresh copy of library; keep the fastest run.
+
+    Counts come from the last run (they do not vary between runs). Without
+    `cache` the probe cache is off, so every operation pays for its probes.
+    """
+    import probe_cache
+    probe_cache.configure(enabled=cache)
+    counter = AuditCounter()
+    root = os.path.join(workdir, "downloads")
+    target = os.path.join(workdir, "target")
+    with open(os.path.join(workdir, "config.json"), "w") as f:
+        json.dump({"ROOT_DIR": root, "TGT_DIR": target}, f)
+
+    results = {}
+    for name, run in operations(root, target).items():
+        if names and name not in names:
+            continue
+        best = None
+        for _ in range(repeat):
+            for path in (root, target):
+                shutil.rmtree(path, ignore_errors=True)
+            shutil.copytree(library, root, symlinks=True)
+            output = io.StringIO()
+            counter.start()
+            started = time.perf_counter()
+            with redirect_stdout(output):
+                run()
+            seconds = time.perf_counter() - started
+            counts, tools = counter.stop()
+            best = seconds if best is None else min(best, seconds)
+        results[name] = {"seconds": round(best, 4), "counts": counts, "tools": tools}
+        print(f"  {name:<12} {best:8.3f}s", flush=True)
+    return results
+
+
+def print_results(results):
+    columns = ["opens", "listings", "renames", "removes", "other", "subprocesses"]
+    print(f"\n{'operation':<12} {'wall (s)':>9} " + " ".join(f"{c:>12}" for c in columns) + "  tools")
+    for name, result in results.items():
+        counts = result["counts"]
+        tools = ", ".join(f"{tool}×{n}" for tool, n in sorted(result["tools"].items())) or "-"
+        print(f"{name:<12} {result['seconds']:9.3f} " + " ".join(f"{counts.get(c, 0):12d}" for c in columns)
+              + f"  {tools}")
+
+
+def compare(results, baseline, tolerance=DEFAULT_TOLERANCE):
+    """Return a message for every operation slower than baseline by more than tolerance,
+    or making more syscalls/subprocesses than baseline did (those counts are exact)."""
+    regressions = []
+    for name, result in results.items():
+        before = baseline.get(name)
+        if before is None:
+            continue
+        if result["seconds"] > before["seconds"] * (1 + tolerance):
+            regressions.append(f"{name}: {before['seconds']:.3f}s → {result['seconds']:.3f}s")
+        for group, count in result["counts"].items():
+            if count > before["counts"].get(group, 0):
+                regressions.append(f"{name}: {group} {before['counts'].get(group, 0)} → {count}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark operations on a synthetic download tree")
+    parser.add_argument("--folders", type=int, default=DEFAULT_FOLDERS, help="Package folders to generate")
+    parser.add_argument("--videos", type=int, default=DEFAULT_VIDEOS, help="Most videos per folder")
+    parser.add_argument("--duplicates", type=float, default=0.3, help="Chance a video also has a duplicate copy")
+    parser.add_argument("--parts", type=float, default=0.1, help="Chance a folder holds a leftover .part file")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--latency", type=float, default=0.0, help="Seconds each fake ffprobe/ffmpeg call sleeps")
+    parser.add_argument("--real-clips", action="store_true", help="Use clips made by the real ffmpeg on PATH")
+    parser.add_argument("--ops", help="Comma-separated operations to run (default: all)")
+    parser.add_argument("--repeat", type=int, default=1, help="Runs per operation; the fastest is reported")
+    parser.add_argument("--cache", action="store_true", help="Leave the probe cache on (warm after the first op)")
+    parser.add_argument("--save", help="Write results as JSON to this file")
+    parser.add_argument("--baseline", help="Compare against results saved with --save; exit 1 on regression")
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE,
+                        help="Wall-time slowdown allowed against --baseline (0.25 = 25%%)")
+    parser.add_argument("--keep", action="store_true", help="Keep the scratch directory")
+    args = parser.parse_args()
+
+    logging.disable(logging.WARNING)
+    workdir = tempfile.mkdtemp(prefix="dlvd_bench_")
+    cwd = os.getcwd()
+    try:
+        clips = None
+        if args.real_clips:
+            clips = make_real_clips(os.path.join(workdir, "clips"))
+        else:
+            install_fake_tools(os.path.join(workdir, "bin"), args.latency)
+        library = os.path.join(workdir, "library")
+        total = generate_library(library, args.folders, args.videos, args.duplicates, args.parts, args.seed, clips)
+        print(Fore.CYAN + f"Generated {args.folders} folders with {total} files in {library}" + Style.RESET_ALL)
+
+        os.chdir(workdir)
+        names = set(args.ops.split(",")) if args.ops else None
+        results = run_benchmarks(library, workdir, names, max(1, args.repeat), args.cache)
+        print_results(results)
+
+        if args.save:
+            os.chdir(cwd)
+            with open(args.save, "w") as f:
+                json.dump({"options": vars(args), "results": results}, f, indent=2)
+            print(f"\nSaved results to {args.save}")
+        if args.baseline:
+            os.chdir(cwd)
+            with open(args.baseline) as f:
+                regressions = compare(results, json.load(f)["results"], args.tolerance)
+            if regressions:
+                print(Fore.RED + "\nRegressions against baseline:" + Style.RESET_ALL)
+                for line in regressions:
+                    print(Fore.RED + f"  {line}" + Style.RESET_ALL)
+                sys.exit(1)
+            print(Fore.GREEN + "\nNo regressions against baseline." + Style.RESET_ALL)
+    finally:
+        os.chdir(cwd)
+        if args.keep:
+            print(f"Scratch directory kept at {workdir}")
+        else:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
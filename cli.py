@@ -1,48 +1,168 @@
 # cli.py
+import time
 import argparse
+from datetime import datetime, timedelta
 from config_handler import get_root_dir, get_target_dir, set_config
-from analyzer import scan_root_directory, count_files
-from sanitizer import rename_recursively
-from deduplicator import remove_duplicates
+from analyzer import run_analysis, count_files
+from sanitizer import rename_recursively, undo_renames
+from deduplicator import remove_duplicates, remove_cross_folder_duplicates, remove_exact_duplicates
 from part_remover import remote_parts
 from codec_processor import perform
 from file_mover import copy_all_contents, move_all_contents
+from utils import set_probe_jobs
+from inventory import Inventory
+from watcher import watch, DEBOUNCE_SECONDS
+from plan import run_all
+import probe_cache
+import profiler
+from profiler import span
+
+# Flags that tune how operations run rather than selecting an operation
+OPTION_ARGS = {"no_cache", "rebuild_cache", "jobs", "perceptual", "encode_jobs", "resume",
+               "predict", "min_savings", "copy_jobs", "sync", "dry_run", "checksum",
+               "debounce", "poll", "encode", "format", "output", "profile", "profile_trace", "stream",
+               "time_budget", "until"}
+
+def requested_operations(args):
+    return {k: v for k, v in vars(args).items() if k not in OPTION_ARGS}
+
+def parse_duration(text):
+    """Seconds in "6h", "90m", "45s" or a bare number of hours (argparse type for --time-budget)."""
+    units = {"h": 3600, "m": 60, "s": 1}
+    text = text.strip().lower()
+    try:
+        seconds = float(text[:-1]) * units[text[-1]] if text and text[-1] in units else float(text) * 3600
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"invalid duration {text!r} (expected e.g. 6h, 90m, 45s)")
+    if seconds <= 0:
+        raise argparse.ArgumentTypeError(f"duration must be positive: {text!r}")
+    return seconds
+
+def parse_time_of_day(text):
+    """(hour, minute) from "HH:MM" (argparse type for --until)."""
+    try:
+        hour, minute = (int(part) for part in text.strip().split(":"))
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"invalid time {text!r} (expected HH:MM)")
+    if not (0 <= hour < 24 and 0 <= minute < 60):
+        raise argparse.ArgumentTypeError(f"invalid time {text!r} (expected HH:MM)")
+    return hour, minute
+
+def encode_deadline(time_budget=None, until=None):
+    """Epoch time by which codec save must be done: the earlier of now + budget and the next HH:MM."""
+    deadlines = []
+    if time_budget:
+        deadlines.append(time.time() + time_budget)
+    if until:
+        hour, minute = until
+        end = datetime.now().replace(hour=hour, minute=minute, second=0, microsecond=0)
+        if end <= datetime.now():
+            end += timedelta(days=1)
+        deadlines.append(end.timestamp())
+    return min(deadlines) if deadlines else None
 
 def run_cli():
     parser = argparse.ArgumentParser(description="Video Organizer CLI")
     parser.add_argument("-anl", "--analyze", action="store_true", help="Analyze packages")
     parser.add_argument("-san", "--sanitize", action="store_true", help="Sanitize package and file names")
+    parser.add_argument("-usn", "--undo-sanitize", action="store_true", help="Undo the renames of the last sanitize")
     parser.add_argument("-dup", "--duplicates", action="store_true", help="Remove lower-quality duplicates")
+    parser.add_argument("-xdp", "--crossdup", action="store_true", help="Remove similar duplicates across folders")
+    parser.add_argument("-exd", "--exact", action="store_true", help="Remove byte-identical copies across folders")
     parser.add_argument("-prt", "--parts", action="store_true", help="Remove Part files")
+    parser.add_argument("-cnt", "--count", action="store_true", help="Count video files")
     parser.add_argument("-all", "--all", action="store_true", help="Perform all operations")
     parser.add_argument("-cdr", "--codecdr", action="store_true", help="Codec Dry Run")
     parser.add_argument("-cds", "--codecsv", action="store_true", help="Codec Save")
     parser.add_argument("-mov", "--move", action="store_true", help="Move Files")
     parser.add_argument("-copy", "--copy", action="store_true", help="Copy Files")
+    parser.add_argument("-wch", "--watch", action="store_true",
+                        help="Keep running and process each package as soon as its downloads finish")
+    parser.add_argument("--no-cache", action="store_true", help="Always run ffprobe, ignoring the probe cache")
+    parser.add_argument("--rebuild-cache", action="store_true", help="Discard the probe cache and re-probe every file")
+    parser.add_argument("--jobs", type=int, default=None, help="Parallel ffprobe workers (default: CPU count)")
+    parser.add_argument("--perceptual", action="store_true",
+                        help="Also match cross-folder duplicates by keyframe fingerprints (uses ffmpeg)")
+    parser.add_argument("--encode-jobs", type=int, default=None,
+                        help="Parallel re-encodes for codec save (default: CPU count / 4)")
+    parser.add_argument("--resume", action="store_true",
+                        help="Codec save: continue the unfinished files of an interrupted run instead of rescanning")
+    parser.add_argument("--stream", action="store_true",
+                        help="Codec save: start encoding files as soon as they are scanned (confirm up front)")
+    parser.add_argument("--time-budget", type=parse_duration, default=None,
+                        help="Codec save: start no encode that wouldn't finish within this window (e.g. 6h, 90m)")
+    parser.add_argument("--until", type=parse_time_of_day, default=None,
+                        help="Codec save: start no encode that wouldn't finish by this time of day (HH:MM)")
+    parser.add_argument("--predict", action="store_true",
+                        help="Codec: predict sizes from short sample encodes and skip poor candidates")
+    parser.add_argument("--min-savings", type=float, default=0.1,
+                        help="Codec --predict: minimum predicted saving as a fraction (default 0.1)")
+    parser.add_argument("--copy-jobs", type=int, default=4,
+                        help="Parallel file copies for copy and cross-device move (default 4)")
+    parser.add_argument("--sync", action="store_true",
+                        help="Copy/move: skip videos unchanged since the last sync (manifest kept in the target)")
+    parser.add_argument("--dry-run", action="store_true",
+                        help="Copy/move/sanitize/-xdp/-exd: only report what would be done")
+    parser.add_argument("--checksum", action="store_true",
+                        help="Copy --sync: record a checksum of each copy, computed while copying")
+    parser.add_argument("--debounce", type=float, default=DEBOUNCE_SECONDS,
+                        help=f"Watch: seconds a package must stay quiet before processing (default {DEBOUNCE_SECONDS})")
+    parser.add_argument("--poll", action="store_true", help="Watch: poll the tree instead of using inotify")
+    parser.add_argument("--encode", action="store_true", help="Watch: re-encode each package before moving it")
+    parser.add_argument("--format", choices=["table", "jsonl", "csv"], default="table",
+                        help="Analyze: colorized table (default) or one streamed record per file/duplicate group")
+    parser.add_argument("--output", default=None, help="Analyze --format jsonl/csv: write records here instead of stdout")
+    parser.add_argument("--profile", action="store_true",
+                        help="Time each operation and the hot calls inside it; print a summary after each pass")
+    parser.add_argument("--profile-trace", default=None,
+                        help="With --profile, also write a Chrome trace-event JSON file (chrome://tracing, Perfetto)")
     args = parser.parse_args()
+    perceptual = args.perceptual
+    encode_jobs = args.encode_jobs
+    resume = args.resume
+    stream = args.stream
+    deadline = encode_deadline(args.time_budget, args.until)
+    copy_jobs = args.copy_jobs
+    transfer = {"sync": args.sync, "dry_run": args.dry_run}
+    checksum = args.checksum
+    watching = {"debounce": args.debounce, "poll": args.poll, "encode": args.encode,
+                "encode_jobs": encode_jobs, "sync": args.sync}
+    prediction = {"predict": args.predict, "min_savings": args.min_savings}
+    reporting = {"report_format": args.format, "report_output": args.output}
 
+    profile_trace = args.profile_trace
+    profiler.enable(args.profile or profile_trace is not None)
+    probe_cache.configure(enabled=not args.no_cache, rebuild=args.rebuild_cache)
+    set_probe_jobs(args.jobs)
     root_dir = get_root_dir()
 
-    if args.all or (not any(vars(args).values())):
-        if not any(vars(args).values()):
+    if args.all or (not any(requested_operations(args).values())):
+        if not any(requested_operations(args).values()):
             print("Choose an operation:")
             print("anal - Analyze packages")
             print("config - Set config directories")
             print("sani - Sanitize packages")
+            print("unsani - Undo last sanitize")
             print("remd - Remove Duplicates")
+            print("remx - Remove Cross-Folder Duplicates")
+            print("reme - Remove Exact Duplicates")
             print("remp - Remove part files")
             print("count - Count Files")
             print("codecdr - Codec Dry Run")
             print("codecsv - Codec Save")
             print("mov - Move Files")
             print("copy - Copy Files")
+            print("watch - Watch for finished downloads")
             print("all - Perform All")
             print("0 - Exit")
             choice = input("Enter choice: ").strip()
             args = {
                 "analyze": choice == "anal",
                 "sanitize": choice == "sani",
+                "undo_sanitize": choice == "unsani",
                 "duplicates": choice == "remd",
+                "crossdup": choice == "remx",
+                "exact": choice == "reme",
                 "parts": choice == "remp",
                 "all": choice == "all",
                 "count": choice == "count",
@@ -50,10 +170,13 @@ def run_cli():
                 "codecsv": choice == "codecsv",
                 "copy": choice == "copy",
                 "move": choice == "mov",
+                "watch": choice == "watch",
                 "group": choice == "group",
                 "config": choice == "config",
                 "exit": choice == "0"
             }
+        else:
+            args = requested_operations(args)
 
         if args.get("exit"):
             exit(0)
@@ -61,34 +184,107 @@ def run_cli():
         if args.get("config"):
             set_config()
 
-        if args.get("all") or args.get("sanitize"):
-            rename_recursively(root_dir)
-        if args.get("all") or args.get("analyze"):
-            scan_root_directory(root_dir)
-        if args.get("all") or args.get("duplicates"):
-            remove_duplicates(root_dir)
-        if args.get("all") or args.get("parts"):
-            remote_parts(root_dir)
+        if args.get("watch"):
+            watch(root_dir, **watching)
+            return
+
+        # One filesystem scan per pass, shared and kept current by every operation
+        with span("stage: inventory"):
+            inventory = Inventory(root_dir)
+
+        if args.get("all"):
+            with span("stage: all"):
+                run_all(root_dir, inventory, perceptual=perceptual, encode_jobs=encode_jobs, resume=resume,
+                        prediction=prediction, deadline=deadline, **reporting)
+        if args.get("sanitize"):
+            with span("stage: sanitize"):
+                rename_recursively(root_dir, inventory, dry_run=transfer["dry_run"])
+        if args.get("undo_sanitize"):
+            with span("stage: undo sanitize"):
+                undo_renames(inventory)
+        if args.get("analyze"):
+            with span("stage: analyze"):
+                run_analysis(root_dir, inventory, perceptual, **reporting)
+        if args.get("duplicates"):
+            with span("stage: duplicates"):
+                remove_duplicates(root_dir, inventory)
+        if args.get("crossdup"):
+            with span("stage: crossdup"):
+                remove_cross_folder_duplicates(root_dir, inventory, perceptual, dry_run=transfer["dry_run"])
+        if args.get("exact"):
+            with span("stage: exact"):
+                remove_exact_duplicates(root_dir, inventory, dry_run=transfer["dry_run"])
+        if args.get("parts"):
+            with span("stage: parts"):
+                remote_parts(root_dir, inventory)
 
-        if args.get("all") or args.get("codecdr"):
-            perform(dry_run=True)
-        if args.get("all") or args.get("codecsv"):
-            perform(dry_run=False)
+        if args.get("codecdr"):
+            with span("stage: codec dry run"):
+                perform(dry_run=True, inventory=inventory, **prediction)
+        if args.get("codecsv"):
+            with span("stage: codec save"):
+                perform(dry_run=False, inventory=inventory, jobs=encode_jobs, resume=resume, stream=stream,
+                        deadline=deadline, **prediction)
 
-        if args.get("all") or args.get("count"):
-            count_files(root_dir)
+        if args.get("count"):
+            with span("stage: count"):
+                count_files(root_dir, inventory)
 
         if args.get("copy"):
-            copy_all_contents(get_target_dir())
+            with span("stage: copy"):
+                copy_all_contents(get_target_dir(), inventory, copy_jobs, checksum=checksum, **transfer)
         if args.get("move"):
-            move_all_contents(get_target_dir())
+            with span("stage: move"):
+                move_all_contents(get_target_dir(), inventory, copy_jobs, **transfer)
 
     else:
+        if args.watch:
+            watch(root_dir, **watching)
+            return
+        with span("stage: inventory"):
+            inventory = Inventory(root_dir)
         if args.analyze:
-            scan_root_directory(root_dir)
+            with span("stage: analyze"):
+                run_analysis(root_dir, inventory, perceptual, **reporting)
         if args.sanitize:
-            rename_recursively(root_dir)
+            with span("stage: sanitize"):
+                rename_recursively(root_dir, inventory, dry_run=transfer["dry_run"])
+        if args.undo_sanitize:
+            with span("stage: undo sanitize"):
+                undo_renames(inventory)
         if args.duplicates:
-            remove_duplicates(root_dir)
+            with span("stage: duplicates"):
+                remove_duplicates(root_dir, inventory)
+        if args.crossdup:
+            with span("stage: crossdup"):
+                remove_cross_folder_duplicates(root_dir, inventory, perceptual, dry_run=transfer["dry_run"])
+        if args.exact:
+            with span("stage: exact"):
+                remove_exact_duplicates(root_dir, inventory, dry_run=transfer["dry_run"])
+        if args.parts:
+            with span("stage: parts"):
+                remote_parts(root_dir, inventory)
+        if args.codecdr:
+            with span("stage: codec dry run"):
+                perform(dry_run=True, inventory=inventory, **prediction)
+        if args.codecsv:
+            with span("stage: codec save"):
+                perform(dry_run=False, inventory=inventory, jobs=encode_jobs, resume=resume, stream=stream,
+                        deadline=deadline, **prediction)
+        if args.count:
+            with span("stage: count"):
+                count_files(root_dir, inventory)
+        if args.copy:
+            with span("stage: copy"):
+                copy_all_contents(get_target_dir(), inventory, copy_jobs, checksum=checksum, **transfer)
+        if args.move:
+            with span("stage: move"):
+                move_all_contents(get_target_dir(), inventory, copy_jobs, **transfer)
 
+    probe_cache.prune(root_dir, inventory.exists)
+    if profiler.enabled():
+        profiler.print_summary()
+        if profile_trace:
+            profiler.write_trace(profile_trace)
+        profiler.reset()
     run_cli()
@@ -10,18 +10,34 @@ import json
 import subprocess
 import argparse
 import platform
+import tempfile
+import threading
+import time
+import queue
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
 from pathlib import Path
-from typing import Dict, List, Tuple, Optional
+from typing import Dict, Iterable, Iterator, List, Tuple, Optional
 import logging
 
 from config_handler import get_root_dir
+from probe_cache import cached_probe
+from container_probe import probe_headers
+from inventory import get_inventory
+from download_tracker import active_packages, in_packages
+from utils import map_on_probe_pool
+from tool_cache import get_tool_version, get_usable_encoders
+from encode_progress import EncodeProgress, run_with_progress, aggregate as aggregate_progress
+from profiler import profiled
+from encode_journal import EncodeJournal, QUEUED, ENCODING, VERIFIED, SWAPPED, KEPT, FAILED
 
 # Configure logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
 # Video file extensions to scan
-VIDEO_EXTENSIONS = {'.mp4', '.avi', '.mkv', '.mov', '.wmv', '.flv', '.webm', '.m4v', '.3gp', '.mpg', '.mpeg'}
+VIDEO_EXTENSIONS = {'.mp4', '.avi', '.mkv', '.mov', '.wmv', '.flv', '.webm', '.m4v', '.3gp', '.mpg', '.mpeg',
+                    '.ts', '.m2ts'}
 
 # Codec priority (more efficient codecs have higher scores)
 CODEC_EFFICIENCY = {
@@ -39,19 +55,129 @@ CODEC_EFFICIENCY = {
     'mpeg1': 20,  # Least efficient
 }
 
+# Seconds between progress log lines for each running encode
+PROGRESS_LOG_INTERVAL = 30
+
+# Sample-encode prediction: clips per file, clip length and time limit per clip
+SAMPLE_SEGMENTS = 3
+SAMPLE_SECONDS = 4.0
+SAMPLE_TIMEOUT = 300
+# Default minimum predicted saving (fraction of original size) worth a full encode
+MIN_PREDICTED_SAVINGS = 0.1
+# Streaming mode: scanned files waiting for an encoder; scanning pauses while it is full.
+# Also how many probes may run ahead of the queue beyond the probe pool's own size.
+STREAM_QUEUE_SIZE = 8
+# Seconds an interrupted run waits for encoder threads to kill their ffmpeg before exiting
+STOP_GRACE_SECONDS = 5.0
+
+# Rough CPU-seconds to encode one second of 1080p video (software encoder, fast-ish
+# preset), plus the cost of decoding the source. Only the ratios matter for ordering;
+# encodes finished during the run rescale the absolute numbers for time budgets.
+ENCODE_CPU_COST = {'h264': 3.0, 'h265': 10.0, 'vp9': 12.0, 'av1': 30.0, 'mpeg4': 0.5}
+DECODE_CPU_COST = {'hevc': 0.6, 'h265': 0.6, 'av1': 1.0, 'vp9': 0.5}
+DEFAULT_DECODE_CPU_COST = 0.2
+
+
+def is_hardware_encoder(encoder: str) -> bool:
+    return 'nvenc' in encoder or 'v4l2m2m' in encoder
+
+
+def default_encode_jobs(encoder: str) -> int:
+    """Parallel encodes when not specified: hardware encoders have few sessions,
+    software encoders scale well to about four threads per job"""
+    if is_hardware_encoder(encoder):
+        return 1
+    return max(1, (os.cpu_count() or 1) // 4)
+
+
+class ThreadBudget:
+    """Counts encoder threads handed out so concurrent jobs don't oversubscribe the CPU"""
+
+    def __init__(self, capacity: int):
+        self.capacity = capacity
+        self.in_use = 0
+        self.condition = threading.Condition()
+
+    @contextmanager
+    def reserve(self, threads: int):
+        threads = min(threads, self.capacity)
+        with self.condition:
+            self.condition.wait_for(lambda: self.in_use + threads <= self.capacity)
+            self.in_use += threads
+        try:
+            yield
+        finally:
+            with self.condition:
+                self.in_use -= threads
+                self.condition.notify_all()
+
+
+class EncodeCancelled(Exception):
+    """Raised from the progress callback to abandon an encode once stop is set"""
+
+
+class ScanSummary:
+    """Running totals for print_summary, updated one scanned file at a time"""
+
+    def __init__(self, video_files: Iterable[Dict] = ()):
+        self.total_files = 0
+        self.to_process = 0
+        self.total_original = 0
+        self.total_estimated = 0
+        self.codec_counts: Dict[str, int] = {}
+        self.predicted = 0
+        self.predicted_original = 0
+        self.predicted_new = 0
+        self.predicted_seconds = 0.0
+        self.skipped = 0
+        self.skipped_size = 0
+        for file_data in video_files:
+            self.add(file_data)
+
+    def add(self, file_data: Dict):
+        self.total_files += 1
+        codec = file_data['codec'] or 'unknown'
+        self.codec_counts[codec] = self.codec_counts.get(codec, 0) + 1
+        if file_data.get('skipped_by_prediction'):
+            self.skipped += 1
+            self.skipped_size += file_data['size']
+        if not file_data['should_reencode']:
+            return
+        self.to_process += 1
+        self.total_original += file_data['size']
+        self.total_estimated += file_data['estimated_new_size']
+        if 'predicted_size' in file_data:
+            self.predicted += 1
+            self.predicted_original += file_data['size']
+            self.predicted_new += file_data['predicted_size']
+            self.predicted_seconds += file_data['predicted_seconds']
+
 
 class VideoAnalyzer:
-    def __init__(self, target_codec='h264', quality_preset='medium'):
+    def __init__(self, target_codec='h264', quality_preset='medium', inventory=None, journal=None):
         self.target_codec = target_codec
         self.quality_preset = quality_preset
+        self.inventory = inventory
+        self.journal = journal
+        self.progress: Dict[str, EncodeProgress] = {}
+        self.progress_lock = threading.Lock()
+        self.progress_callback = None
+        self.inventory_lock = threading.Lock()
         self.processed_files = []
+        # Wall-clock time (time.time()) after which no new encode may start if it wouldn't finish in time
+        self.deadline: Optional[float] = None
+        # Measured vs estimated CPU-seconds of the encodes finished so far
+        self.calibration = [0.0, 0.0]
+        self.calibration_lock = threading.Lock()
+        # Set on interrupt: running encodes are abandoned and nothing new starts
+        self.stop = threading.Event()
         self.total_original_size = 0
         self.estimated_new_size = 0
         self.is_windows = platform.system() == 'Windows'
         self.available_encoders = self.detect_available_encoders()
 
     def detect_available_encoders(self) -> Dict[str, str]:
-        """Detect available video encoders in ffmpeg"""
+        """Detect usable video encoders in ffmpeg"""
         encoder_map = {
             'h264': ['libx264', 'h264'],
             'h265': ['libx265', 'hevc_nvenc', 'h265_nvenc', 'libx265', 'hevc'],  # Added NVENC for Windows
@@ -60,41 +186,17 @@ class VideoAnalyzer:
             'mpeg4': ['libxvid', 'mpeg4']
         }
 
-        available = {}
-
         try:
-            # Get list of available encoders
-            cmd = ['ffmpeg', '-encoders']
-            if self.is_windows:
-                # On Windows, might need to handle different executable names
-                try:
-                    result = subprocess.run(cmd, capture_output=True, text=True, timeout=10)
-                except FileNotFoundError:
-                    # Try common Windows ffmpeg locations
-                    for ffmpeg_exe in ['ffmpeg.exe', r'C:\ffmpeg\bin\ffmpeg.exe']:
-                        try:
-                            cmd[0] = ffmpeg_exe
-                            result = subprocess.run(cmd, capture_output=True, text=True, timeout=10)
-                            break
-                        except FileNotFoundError:
-                            continue
-                    else:
-                        raise FileNotFoundError("ffmpeg not found")
-            else:
-                result = subprocess.run(cmd, capture_output=True, text=True, timeout=10)
-
-            if result.returncode == 0:
-                encoder_output = result.stdout.lower()
-
-                for codec, encoders in encoder_map.items():
-                    for encoder in encoders:
-                        if encoder in encoder_output:
-                            available[codec] = encoder
-                            logger.info(f"Found {codec} encoder: {encoder}")
-                            break
-
-                    if codec not in available:
-                        logger.warning(f"No {codec} encoder found")
+            # Probed once per ffmpeg build (1-frame test encodes) and cached on disk
+            available = get_usable_encoders(encoder_map)
+            if available is None:
+                raise FileNotFoundError("ffmpeg not found")
+
+            for codec in encoder_map:
+                if codec in available:
+                    logger.info(f"Found {codec} encoder: {available[codec]}")
+                else:
+                    logger.warning(f"No {codec} encoder found")
 
         except Exception as e:
             logger.error(f"Could not detect encoders: {e}")
@@ -103,40 +205,52 @@ class VideoAnalyzer:
 
         return available
 
-    def get_video_info(self, filepath: Path) -> Optional[Dict]:
-        """Get video information using ffprobe"""
-        try:
-            cmd = ['ffprobe', '-v', 'quiet', '-print_format', 'json',
-                   '-show_format', '-show_streams', str(filepath)]
+    @profiled("ffprobe")
+    def run_ffprobe(self, filepath: Path) -> Dict:
+        """Run ffprobe on filepath, returning its JSON output or an error entry"""
+        cmd = ['ffprobe', '-v', 'quiet', '-print_format', 'json',
+               '-show_format', '-show_streams', str(filepath)]
 
-            # Handle Windows executable names
-            if self.is_windows:
-                try:
-                    result = subprocess.run(cmd, capture_output=True, text=True, timeout=30)
-                except FileNotFoundError:
-                    # Try common Windows ffprobe locations
-                    for ffprobe_exe in ['ffprobe.exe', r'C:\ffmpeg\bin\ffprobe.exe']:
-                        try:
-                            cmd[0] = ffprobe_exe
-                            result = subprocess.run(cmd, capture_output=True, text=True, timeout=30)
-                            break
-                        except FileNotFoundError:
-                            continue
-                    else:
-                        raise FileNotFoundError("ffprobe not found")
-            else:
+        # Handle Windows executable names
+        if self.is_windows:
+            try:
                 result = subprocess.run(cmd, capture_output=True, text=True, timeout=30)
+            except FileNotFoundError:
+                # Try common Windows ffprobe locations
+                for ffprobe_exe in ['ffprobe.exe', r'C:\ffmpeg\bin\ffprobe.exe']:
+                    try:
+                        cmd[0] = ffprobe_exe
+                        result = subprocess.run(cmd, capture_output=True, text=True, timeout=30)
+                        break
+                    except FileNotFoundError:
+                        continue
+                else:
+                    raise FileNotFoundError("ffprobe not found")
+        else:
+            result = subprocess.run(cmd, capture_output=True, text=True, timeout=30)
 
-            if result.returncode == 0:
-                return json.loads(result.stdout)
-            else:
-                logger.warning(f"Could not analyze {filepath}: {result.stderr}")
-                return None
+        if result.returncode == 0:
+            return json.loads(result.stdout)
+        return {'error': result.stderr.strip() or f"ffprobe exited with {result.returncode}"}
+
+    def probe_video(self, filepath: Path) -> Dict:
+        """Native MP4/MKV header parse, falling back to ffprobe"""
+        return probe_headers(str(filepath)) or self.run_ffprobe(filepath)
 
+    @profiled("VideoAnalyzer.get_video_info")
+    def get_video_info(self, filepath: Path, stat_result: Optional[os.stat_result] = None) -> Optional[Dict]:
+        """Get video information from the headers or ffprobe, served from the probe cache when unchanged"""
+        try:
+            video_info = cached_probe(str(filepath), self.probe_video, stat_result)
         except (subprocess.TimeoutExpired, json.JSONDecodeError, FileNotFoundError) as e:
             logger.warning(f"Error analyzing {filepath}: {e}")
             return None
 
+        if 'error' in video_info:
+            logger.warning(f"Could not analyze {filepath}: {video_info['error']}")
+            return None
+        return video_info
+
     def validate_target_codec(self) -> bool:
         """Validate that target codec is available"""
         if self.target_codec not in self.available_encoders:
@@ -175,6 +289,22 @@ class VideoAnalyzer:
             logger.warning(f"Error extracting codec: {e}")
         return None
 
+    def get_video_stream(self, video_info: Dict) -> Dict:
+        """First video stream from ffprobe output, or an empty dict"""
+        for stream in video_info.get('streams', []):
+            if stream.get('codec_type') == 'video':
+                return stream
+        return {}
+
+    def get_duration(self, video_info: Dict) -> Optional[float]:
+        """Duration in seconds from the container, falling back to the video stream"""
+        for source in (video_info.get('format', {}), self.get_video_stream(video_info)):
+            try:
+                return float(source['duration'])
+            except (KeyError, TypeError, ValueError):
+                continue
+        return None
+
     def should_reencode(self, current_codec: str) -> bool:
         """Determine if video should be re-encoded based on codec efficiency"""
         if not current_codec:
@@ -202,42 +332,174 @@ class VideoAnalyzer:
 
         return original_size
 
-    def scan_directory(self, directory: Path, recursive: bool = True) -> List[Dict]:
-        """Scan directory for video files and analyze them"""
-        video_files = []
-
-        if recursive:
-            pattern = "**/*"
-        else:
-            pattern = "*"
-
-        for filepath in directory.glob(pattern):
-            if filepath.is_file() and filepath.suffix.lower() in VIDEO_EXTENSIONS:
-                logger.info(f"Analyzing: {filepath}")
-
-                video_info = self.get_video_info(filepath)
-                if not video_info:
-                    continue
+    @profiled("predict_encode")
+    def predict_encode(self, file_data: Dict, segments: int = SAMPLE_SEGMENTS,
+                       seconds: float = SAMPLE_SECONDS) -> Optional[Dict]:
+        """Predict output size and encode time by encoding a few short samples
+
+        Encodes `segments` clips of `seconds` each, spread evenly through the
+        file, with the real encoder settings, then scales bytes written and
+        time taken up to the full duration. Returns None if the file is too
+        short to sample or a sample encode fails.
+        """
+        encoder = self.available_encoders.get(self.target_codec)
+        duration = file_data.get('duration')
+        if not encoder or not duration or duration < segments * seconds * 2:
+            return None
 
-                codec = self.get_video_codec(video_info)
-                file_size = filepath.stat().st_size
+        input_path = file_data['path']
+        fd, sample_path = tempfile.mkstemp(suffix=input_path.suffix)
+        os.close(fd)
+        sample_path = Path(sample_path)
+        sampled_bytes = 0
+        elapsed = 0.0
+        try:
+            for i in range(segments):
+                start = duration * (i + 1) / (segments + 1) - seconds / 2
+                cmd = self.build_encode_command(input_path, sample_path, encoder,
+                                                input_args=['-ss', f"{start:.2f}", '-t', f"{seconds:.2f}"])
+                cmd[1:1] = ['-v', 'error']
+                began = time.monotonic()
+                result = subprocess.run(cmd, capture_output=True, text=True, timeout=SAMPLE_TIMEOUT)
+                elapsed += time.monotonic() - began
+                if result.returncode != 0:
+                    logger.warning(f"Sample encode failed for {input_path}: {result.stderr.strip()}")
+                    return None
+                sampled_bytes += sample_path.stat().st_size
+        except (subprocess.TimeoutExpired, OSError) as e:
+            logger.warning(f"Sample encode failed for {input_path}: {e}")
+            return None
+        finally:
+            if sample_path.exists():
+                sample_path.unlink()
+
+        scale = duration / (segments * seconds)
+        return {
+            'predicted_size': int(sampled_bytes * scale),
+            'predicted_seconds': elapsed * scale,
+        }
 
-                file_data = {
-                    'path': filepath,
-                    'size': file_size,
-                    'codec': codec,
-                    'should_reencode': self.should_reencode(codec),
-                    'estimated_new_size': self.estimate_size_reduction(file_size, codec) if codec else file_size
-                }
+    def apply_predictions(self, video_files: List[Dict], min_savings: float = MIN_PREDICTED_SAVINGS):
+        """Replace the codec-table estimate with sample-encode predictions
+
+        Files predicted to shrink by less than `min_savings` (a fraction of
+        their size) are no longer marked for re-encoding.
+        """
+        candidates = [f for f in video_files if f['should_reencode']]
+        for i, file_data in enumerate(candidates, 1):
+            logger.info(f"Predicting [{i}/{len(candidates)}]: {file_data['path']}")
+            prediction = self.predict_encode(file_data)
+            if prediction is None:
+                continue
+            file_data.update(prediction)
+            file_data['estimated_new_size'] = min(prediction['predicted_size'], file_data['size'])
+            saving = 1 - prediction['predicted_size'] / file_data['size'] if file_data['size'] else 0
+            if saving < min_savings:
+                file_data['should_reencode'] = False
+                file_data['skipped_by_prediction'] = True
+                logger.info(f"  Predicted saving {saving * 100:.1f}% is below {min_savings * 100:.0f}%, skipping")
+
+    def iter_scan(self, directory: Path, recursive: bool = True, ahead: Optional[int] = None) -> Iterator[Dict]:
+        """Yield scan results one file at a time, probing ahead on the shared pool
+
+        With `ahead`, probing stays at most that many files (beyond the pool
+        size) ahead of the consumer; by default every file is submitted at once.
+        """
+        self.inventory = get_inventory(str(directory), self.inventory)
+        downloading = active_packages(str(directory), self.inventory)
+        candidates = []
+        for dirpath, dirnames, filenames in self.inventory.walk(str(directory)):
+            if in_packages(dirpath, downloading):
+                dirnames.clear()
+                continue
+            if not recursive:
+                dirnames.clear()
+            for name in filenames:
+                if os.path.splitext(name)[1].lower() in VIDEO_EXTENSIONS:
+                    candidates.append(Path(dirpath) / name)
+
+        for file_data in map_on_probe_pool(self.scan_file, candidates, ahead):
+            if file_data is not None:
+                yield file_data
+
+    def scan_file(self, filepath: Path) -> Optional[Dict]:
+        """Probe one video and work out whether it should be re-encoded"""
+        logger.info(f"Analyzing: {filepath}")
+
+        stat_result = self.inventory.stat(str(filepath))
+        video_info = self.get_video_info(filepath, stat_result)
+        if not video_info:
+            return None
 
-                video_files.append(file_data)
-                logger.info(f"  Codec: {codec}, Size: {self.format_size(file_size)}, "
-                            f"Re-encode: {file_data['should_reencode']}")
+        codec = self.get_video_codec(video_info)
+        stream = self.get_video_stream(video_info)
+        file_size = stat_result.st_size
+
+        file_data = {
+            'path': filepath,
+            'size': file_size,
+            'codec': codec,
+            'width': stream.get('width'),
+            'height': stream.get('height'),
+            'duration': self.get_duration(video_info),
+            'should_reencode': self.should_reencode(codec),
+            'estimated_new_size': self.estimate_size_reduction(file_size, codec) if codec else file_size
+        }
 
-        return video_files
+        logger.info(f"  Codec: {codec}, Size: {self.format_size(file_size)}, "
+                    f"Re-encode: {file_data['should_reencode']}")
+        return file_data
 
-    def reencode_video(self, input_path: Path, output_path: Path) -> bool:
-        """Re-encode video with target codec"""
+    def scan_directory(self, directory: Path, recursive: bool = True) -> List[Dict]:
+        """Scan directory for video files and analyze them"""
+        return list(self.iter_scan(directory, recursive))
+
+    def build_encode_command(self, input_path: Path, output_path: Path, encoder: str,
+                             threads: Optional[int] = None, input_args: Optional[List[str]] = None) -> List[str]:
+        """Build the ffmpeg command line used to re-encode input_path"""
+        # Base command (input_args, e.g. -ss/-t for sample encodes, must precede -i)
+        cmd = ['ffmpeg'] + (input_args or []) + ['-i', str(input_path)]
+
+        # Add hardware acceleration hints for different platforms
+        if self.is_windows and 'nvenc' in encoder:
+            # NVIDIA hardware acceleration on Windows
+            cmd.extend(['-hwaccel', 'cuda'])
+        elif not self.is_windows and encoder == 'h264_v4l2m2m':
+            # Raspberry Pi hardware acceleration
+            cmd.extend(['-hwaccel', 'v4l2m2m'])
+
+        # Video encoding parameters
+        cmd.extend(['-c:v', encoder])
+
+        # Codec-specific parameters
+        if 'nvenc' in encoder:
+            # NVIDIA encoder settings
+            cmd.extend(['-preset', 'medium', '-cq', '23'])
+        elif self.target_codec in ['h264', 'h265']:
+            cmd.extend(['-preset', self.quality_preset, '-crf', '23'])
+        elif self.target_codec == 'vp9':
+            cmd.extend(['-b:v', '0', '-crf', '30'])  # VP9 uses different quality scale
+        else:
+            cmd.extend(['-q:v', '3'])  # Generic quality setting
+
+        # Per-job thread budget from the scheduler (software encoders only)
+        if threads and not is_hardware_encoder(encoder):
+            cmd.extend(['-threads', str(threads)])
+            if encoder == 'libx265':
+                # x265 sizes its own thread pool and ignores -threads
+                cmd.extend(['-x265-params', f'pools={threads}'])
+
+        # Audio encoding
+        cmd.extend(['-c:a', 'aac', '-b:a', '128k'])
+
+        # Output options
+        cmd.extend(['-y', str(output_path)])
+        return cmd
+
+    @profiled("reencode_video")
+    def reencode_video(self, input_path: Path, output_path: Path, threads: Optional[int] = None,
+                       duration: Optional[float] = None) -> bool:
+        """Re-encode video with target codec, streaming progress into self.progress"""
         try:
             # Get the actual encoder name
             encoder = self.available_encoders.get(self.target_codec)
@@ -245,69 +507,67 @@ class VideoAnalyzer:
                 logger.error(f"Encoder for {self.target_codec} not available")
                 return False
 
-            # Base command
-            cmd = ['ffmpeg', '-i', str(input_path)]
-
-            # Add hardware acceleration hints for different platforms
-            if self.is_windows and 'nvenc' in encoder:
-                # NVIDIA hardware acceleration on Windows
-                cmd.extend(['-hwaccel', 'cuda'])
-            elif not self.is_windows and encoder == 'h264_v4l2m2m':
-                # Raspberry Pi hardware acceleration
-                cmd.extend(['-hwaccel', 'v4l2m2m'])
-
-            # Video encoding parameters
-            cmd.extend(['-c:v', encoder])
-
-            # Codec-specific parameters
-            if 'nvenc' in encoder:
-                # NVIDIA encoder settings
-                cmd.extend(['-preset', 'medium', '-cq', '23'])
-            elif self.target_codec in ['h264', 'h265']:
-                cmd.extend(['-preset', self.quality_preset, '-crf', '23'])
-            elif self.target_codec == 'vp9':
-                cmd.extend(['-b:v', '0', '-crf', '30'])  # VP9 uses different quality scale
-            else:
-                cmd.extend(['-q:v', '3'])  # Generic quality setting
-
-            # Audio encoding
-            cmd.extend(['-c:a', 'aac', '-b:a', '128k'])
+            cmd = self.build_encode_command(input_path, output_path, encoder, threads)
+            progress = EncodeProgress(input_path.name, duration)
+            with self.progress_lock:
+                self.progress[str(input_path)] = progress
 
-            # Output options
-            cmd.extend(['-y', str(output_path)])
+            logger.info(f"Re-encoding: {input_path} -> {output_path}")
+            logger.debug(f"Command: {' '.join(cmd)}")
 
             # Handle Windows executable names
             if self.is_windows:
                 try:
-                    result = subprocess.run(cmd, capture_output=True, text=True)
+                    returncode, stderr_tail = run_with_progress(cmd, progress, self.report_progress)
                 except FileNotFoundError:
                     # Try common Windows ffmpeg locations
                     for ffmpeg_exe in ['ffmpeg.exe', r'C:\ffmpeg\bin\ffmpeg.exe']:
                         try:
                             cmd[0] = ffmpeg_exe
-                            result = subprocess.run(cmd, capture_output=True, text=True)
+                            returncode, stderr_tail = run_with_progress(cmd, progress, self.report_progress)
                             break
                         except FileNotFoundError:
                             continue
                     else:
                         raise FileNotFoundError("ffmpeg not found")
             else:
-                result = subprocess.run(cmd, capture_output=True, text=True)
+                returncode, stderr_tail = run_with_progress(cmd, progress, self.report_progress)
 
-            logger.info(f"Re-encoding: {input_path} -> {output_path}")
-            logger.debug(f"Command: {' '.join(cmd)}")
-
-            if result.returncode == 0:
-                logger.info(f"Successfully re-encoded: {output_path}")
+            if returncode == 0:
+                logger.info(f"Successfully re-encoded: {output_path} "
+                            f"({progress.elapsed:.0f}s, {progress.fps:.1f} fps, {progress.speed:.2f}x)")
                 return True
             else:
-                logger.error(f"Failed to re-encode {input_path}: {result.stderr}")
+                logger.error(f"Failed to re-encode {input_path}: {stderr_tail}")
                 return False
 
+        except EncodeCancelled:
+            logger.info(f"Stopped re-encoding {input_path}")
+            return False
         except Exception as e:
             logger.error(f"Error re-encoding {input_path}: {e}")
             return False
 
+    def report_progress(self, progress: EncodeProgress):
+        """Log a job's progress at most every PROGRESS_LOG_INTERVAL seconds and notify any listener
+
+        Raises EncodeCancelled once stop is set, which kills the running ffmpeg.
+        """
+        if self.stop.is_set():
+            raise EncodeCancelled(progress.name)
+        now = time.monotonic()
+        if now - progress.reported_at >= PROGRESS_LOG_INTERVAL:
+            progress.reported_at = now
+            logger.info(f"  {progress.name}: {progress.describe()}")
+        if self.progress_callback is not None:
+            self.progress_callback(progress)
+
+    def progress_snapshot(self) -> Dict:
+        """Per-job and aggregate encode progress, for monitoring batch runs"""
+        with self.progress_lock:
+            jobs = list(self.progress.values())
+        return {'jobs': [p.as_dict() for p in jobs], 'total': aggregate_progress(jobs)}
+
     def format_size(self, size_bytes: int) -> str:
         """Format file size in human readable format"""
         for unit in ['B', 'KB', 'MB', 'GB', 'TB']:
@@ -316,19 +576,18 @@ class VideoAnalyzer:
             size_bytes /= 1024.0
         return f"{size_bytes:.1f} PB"
 
-    def print_summary(self, video_files: List[Dict], dry_run: bool = True):
-        """Print analysis summary"""
-        files_to_process = [f for f in video_files if f['should_reencode']]
-        total_original = sum(f['size'] for f in files_to_process)
-        total_estimated = sum(f['estimated_new_size'] for f in files_to_process)
-        estimated_savings = total_original - total_estimated
+    def print_summary(self, video_files, dry_run: bool = True):
+        """Print analysis summary of a list of scan results or of a ScanSummary built while streaming"""
+        summary = video_files if isinstance(video_files, ScanSummary) else ScanSummary(video_files)
+        total_original = summary.total_original
+        estimated_savings = total_original - summary.total_estimated
 
         print(f"\n{'=' * 60}")
         print(f"VIDEO ANALYSIS SUMMARY {'(DRY RUN)' if dry_run else '(PROCESSING)'}")
         print(f"{'=' * 60}")
         print(f"Platform: {platform.system()} {platform.release()}")
-        print(f"Total video files found: {len(video_files)}")
-        print(f"Files needing re-encoding: {len(files_to_process)}")
+        print(f"Total video files found: {summary.total_files}")
+        print(f"Files needing re-encoding: {summary.to_process}")
         print(
             f"Target codec: {self.target_codec.upper()} ({self.available_encoders.get(self.target_codec, 'NOT AVAILABLE')})")
         print(f"Quality preset: {self.quality_preset}")
@@ -339,103 +598,358 @@ class VideoAnalyzer:
             hw_accel = " (Hardware)" if 'nvenc' in encoder or 'v4l2m2m' in encoder else ""
             print(f"  {status} {codec.upper()}: {encoder}{hw_accel}")
 
-        if files_to_process:
+        if summary.to_process:
             print(f"\nSize Analysis:")
             print(f"  Current total size: {self.format_size(total_original)}")
-            print(f"  Estimated new size: {self.format_size(total_estimated)}")
+            print(f"  Estimated new size: {self.format_size(summary.total_estimated)}")
             print(f"  Estimated savings: {self.format_size(estimated_savings)} "
                   f"({(estimated_savings / total_original) * 100:.1f}%)")
 
             print(f"\nCodec Distribution:")
-            codec_counts = {}
-            for f in video_files:
-                codec = f['codec'] or 'unknown'
-                codec_counts[codec] = codec_counts.get(codec, 0) + 1
-
-            for codec, count in sorted(codec_counts.items()):
+            for codec, count in sorted(summary.codec_counts.items()):
                 marker = "→ CONVERT" if CODEC_EFFICIENCY.get(codec, 0) < CODEC_EFFICIENCY.get(self.target_codec,
                                                                                               0) else "✓ KEEP"
                 print(f"  {codec.upper()}: {count} files {marker}")
 
+        if summary.predicted or summary.skipped:
+            print(f"\nSample-Encode Predictions:")
+            print(f"  Files predicted: {summary.predicted} of {summary.to_process} to re-encode")
+            if summary.predicted:
+                print(f"  Predicted savings: {self.format_size(summary.predicted_original - summary.predicted_new)} "
+                      f"({(1 - summary.predicted_new / summary.predicted_original) * 100:.1f}%)")
+                print(f"  Predicted encode time: {summary.predicted_seconds / 3600:.1f} h")
+            if summary.skipped:
+                print(f"  Skipped (saving below threshold): {summary.skipped} files, "
+                      f"{self.format_size(summary.skipped_size)}")
+
         print(f"{'=' * 60}")
 
-    def process_files(self, video_files: List[Dict], backup_originals: bool = True):
-        """Process files for re-encoding"""
-        files_to_process = [f for f in video_files if f['should_reencode']]
+    def record_rename(self, old_path: Path, new_path: Path):
+        """Keep the shared inventory in step with a rename done on disk"""
+        if self.inventory is not None:
+            with self.inventory_lock:
+                self.inventory.rename(str(old_path), str(new_path))
+
+    def record_removal(self, path: Path):
+        if self.inventory is not None:
+            with self.inventory_lock:
+                self.inventory.remove(str(path))
+
+    def thread_budget(self, file_data: Dict, cores: int, jobs: int) -> int:
+        """Encoder threads for one job: a fair share of the cores, scaled by resolution
+
+        A 1080p file gets cores/jobs threads; smaller files get proportionally
+        fewer (they can't keep more busy) and 4K files up to every core.
+        """
+        share = max(1, cores // jobs)
+        width = file_data.get('width') or 1920
+        height = file_data.get('height') or 1080
+        scale = (width * height) / (1920 * 1080)
+        return max(1, min(cores, round(share * scale)))
+
+    def model_cpu_seconds(self, file_data: Dict) -> float:
+        """Uncalibrated CPU-seconds for a full re-encode, from duration, resolution and both codecs
+
+        A sample-encode prediction (--predict) is used when there is one.
+        """
+        if 'predicted_seconds' in file_data:
+            return file_data['predicted_seconds'] * (os.cpu_count() or 1)
+        duration = file_data.get('duration') or 0
+        pixels = (file_data.get('width') or 1920) * (file_data.get('height') or 1080)
+        per_second = (ENCODE_CPU_COST.get(self.target_codec, ENCODE_CPU_COST['h265'])
+                      + DECODE_CPU_COST.get(file_data.get('codec'), DEFAULT_DECODE_CPU_COST))
+        return duration * pixels / (1920 * 1080) * per_second
+
+    def estimate_cpu_seconds(self, file_data: Dict) -> float:
+        """model_cpu_seconds scaled by how far off the model was for the encodes finished so far"""
+        with self.calibration_lock:
+            measured, modelled = self.calibration
+        scale = measured / modelled if modelled else 1.0
+        return max(1.0, self.model_cpu_seconds(file_data) * scale)
+
+    def encode_priority(self, file_data: Dict) -> float:
+        """Expected bytes saved per CPU-second of encoding; higher goes first"""
+        saving = file_data['size'] - file_data['estimated_new_size']
+        return saving / self.estimate_cpu_seconds(file_data)
+
+    def fits_deadline(self, file_data: Dict, threads: Optional[int]) -> bool:
+        """True if the encode is expected to finish before the deadline (always, without one)"""
+        if self.deadline is None:
+            return True
+        wall_seconds = self.estimate_cpu_seconds(file_data) / (threads or os.cpu_count() or 1)
+        return time.time() + wall_seconds <= self.deadline
+
+    def timed_process_file(self, file_data: Dict, label: str, backup_originals: bool,
+                           threads: Optional[int] = None) -> bool:
+        """process_file behind the deadline check, feeding its run time back into the estimates"""
+        if self.stop.is_set():
+            return False
+        if not self.fits_deadline(file_data, threads):
+            # Stays queued in the journal, so --resume picks it up in the next window
+            print(f"{label} Skipping {file_data['path'].name}: would not finish before the deadline")
+            return False
+        started = time.monotonic()
+        state = self.process_file(file_data, label, backup_originals, threads)
+        elapsed = time.monotonic() - started
+        if state in (SWAPPED, KEPT):  # both ran the full encode; failed ones end early and say nothing about speed
+            with self.calibration_lock:
+                self.calibration[0] += elapsed * (threads or os.cpu_count() or 1)
+                self.calibration[1] += self.model_cpu_seconds(file_data)
+        return state == SWAPPED
+
+    def journal_record(self, path: Path, state: str, **fields):
+        if self.journal is not None:
+            self.journal.record(path, state, **fields)
+
+    def swap_in(self, input_path: Path, output_path: Path, backup_path: Optional[Path], label: str = ""):
+        """Replace input_path with the re-encoded output, backing up or deleting the original
+
+        Safe to call again after a crash part way through: an original that is
+        already gone is not touched again.
+        """
+        if input_path.exists():
+            if backup_path is not None:
+                input_path.rename(backup_path)
+                self.record_rename(input_path, backup_path)
+                print(f"{label}   Original backed up as: {backup_path.name}")
+            else:
+                input_path.unlink()
+                self.record_removal(input_path)
+                print(f"{label}   Original file deleted")
+
+        # Rename new file to original name
+        output_path.rename(input_path)
+        self.record_rename(output_path, input_path)
+
+    def process_file(self, file_data: Dict, label: str, backup_originals: bool,
+                     threads: Optional[int] = None) -> str:
+        """Re-encode one file and swap it in if the result is smaller; returns the final journal state"""
+        input_path = file_data['path']
+
+        # Create output path
+        output_path = input_path.with_suffix(f'.{self.target_codec}{input_path.suffix}')
+
+        print(f"\n{label} Processing: {input_path.name}"
+              + (f" ({threads} threads)" if threads else ""))
+
+        # Re-encode the file
+        self.journal_record(input_path, ENCODING, output=output_path)
+        if not self.reencode_video(input_path, output_path, threads, file_data.get('duration')):
+            if output_path.exists():
+                output_path.unlink()
+            if self.stop.is_set():
+                print(f"{label}   Stopped, left queued for --resume")
+                self.journal_record(input_path, QUEUED)
+                return QUEUED
+            print(f"{label}   Failed to re-encode")
+            self.journal_record(input_path, FAILED)
+            return FAILED
+
+        # Check if new file is actually smaller
+        new_size = output_path.stat().st_size
+        original_size = input_path.stat().st_size
+
+        if new_size >= original_size:
+            print(f"{label}   New file not smaller, keeping original")
+            output_path.unlink()  # Delete the larger re-encoded file
+            self.journal_record(input_path, KEPT)
+            return KEPT
+
+        savings = original_size - new_size
+        print(f"{label}   Success! Saved {self.format_size(savings)} "
+              f"({(savings / original_size) * 100:.1f}%)")
+
+        backup_path = input_path.with_suffix(f'{input_path.suffix}.bak') if backup_originals else None
+        self.journal_record(input_path, VERIFIED, output=output_path, backup=backup_path)
+        self.swap_in(input_path, output_path, backup_path, label)
+        self.journal_record(input_path, SWAPPED)
+        return SWAPPED
+
+    def recover_journal(self) -> int:
+        """Finish or roll back whatever an interrupted batch left behind
+
+        Partial outputs of encodes that were running are deleted and their
+        files re-queued; swaps that were verified but not completed are
+        finished. Returns the number of entries repaired.
+        """
+        if self.journal is None:
+            return 0
+
+        repaired = 0
+        for entry in self.journal.unfinished(ENCODING):
+            output_path = Path(entry['output'])
+            if output_path.exists():
+                output_path.unlink()
+                self.record_removal(output_path)
+                print(f"Removed partial output: {output_path}")
+            self.journal.record(entry['path'], QUEUED)
+            repaired += 1
+
+        for entry in self.journal.unfinished(VERIFIED):
+            input_path = Path(entry['path'])
+            output_path = Path(entry['output'])
+            backup_path = Path(entry['backup']) if entry.get('backup') else None
+            if output_path.exists():
+                print(f"Completing interrupted swap: {input_path}")
+                self.swap_in(input_path, output_path, backup_path)
+            self.journal.record(entry['path'], SWAPPED)
+            repaired += 1
+
+        return repaired
+
+    def queued_files(self) -> List[Dict]:
+        """Scan data of files an interrupted batch had not finished"""
+        if self.journal is None:
+            return []
+        files = []
+        for entry in self.journal.unfinished(QUEUED):
+            file_data = dict(entry['file'])
+            file_data['path'] = Path(file_data['path'])
+            if file_data['path'].exists():
+                files.append(file_data)
+        return files
+
+    def process_files(self, video_files: List[Dict], backup_originals: bool = True, jobs: Optional[int] = None):
+        """Process files for re-encoding, running up to `jobs` encodes at once
+
+        Each job is given a thread budget and only starts while the budgets of
+        the running jobs fit in the available cores, so small files run side by
+        side and a 4K file gets the machine to itself. Files go in order of
+        expected bytes saved per CPU-second; with a deadline, a file that
+        wouldn't finish in time is skipped and the next one tried.
+        """
+        files_to_process = sorted((f for f in video_files if f['should_reencode']),
+                                  key=self.encode_priority, reverse=True)
 
         if not files_to_process:
             print("No files need re-encoding!")
             return
 
-        print(f"\nProcessing {len(files_to_process)} files...")
+        encoder = self.available_encoders.get(self.target_codec, '')
+        cores = os.cpu_count() or 1
+        if jobs is None:
+            jobs = default_encode_jobs(encoder)
+        jobs = max(1, min(jobs, len(files_to_process)))
+        total = len(files_to_process)
 
-        for i, file_data in enumerate(files_to_process, 1):
-            input_path = file_data['path']
+        print(f"\nProcessing {total} files ({jobs} at a time)...")
 
-            # Create output path
-            output_path = input_path.with_suffix(f'.{self.target_codec}{input_path.suffix}')
+        for file_data in files_to_process:
+            self.journal_record(file_data['path'], QUEUED, file=file_data)
 
-            print(f"\n[{i}/{len(files_to_process)}] Processing: {input_path.name}")
-
-            # Re-encode the file
-            if self.reencode_video(input_path, output_path):
-                # Check if new file is actually smaller
-                new_size = output_path.stat().st_size
-                original_size = input_path.stat().st_size
-
-                if new_size < original_size:
-                    savings = original_size - new_size
-                    print(f"  Success! Saved {self.format_size(savings)} "
-                          f"({(savings / original_size) * 100:.1f}%)")
-
-                    if backup_originals:
-                        backup_path = input_path.with_suffix(f'{input_path.suffix}.bak')
-                        input_path.rename(backup_path)
-                        print(f"  Original backed up as: {backup_path.name}")
-                    else:
-                        input_path.unlink()
-                        print(f"  Original file deleted")
+        if jobs == 1:
+            for i, file_data in enumerate(files_to_process, 1):
+                self.timed_process_file(file_data, f"[{i}/{total}]", backup_originals)
+            return
 
-                    # Rename new file to original name
-                    output_path.rename(input_path)
-                else:
-                    print(f"  New file not smaller, keeping original")
-                    output_path.unlink()  # Delete the larger re-encoded file
-            else:
-                print(f"  Failed to re-encode")
+        budget = ThreadBudget(cores)
+
+        def run(i, file_data):
+            threads = None
+            if not is_hardware_encoder(encoder):
+                threads = self.thread_budget(file_data, cores, jobs)
+            with budget.reserve(threads or 1):
+                return self.timed_process_file(file_data, f"[{i}/{total}]", backup_originals, threads)
+
+        with ThreadPoolExecutor(max_workers=jobs, thread_name_prefix="encode") as executor:
+            futures = [executor.submit(run, i, file_data) for i, file_data in enumerate(files_to_process, 1)]
+            try:
+                for future in futures:
+                    future.result()
+            except KeyboardInterrupt:
+                # Kill the running encodes so shutting the pool down doesn't wait for them
+                self.stop.set()
+                raise
+
+    def process_stream(self, scanned: Iterable[Dict], backup_originals: bool = True, jobs: Optional[int] = None,
+                       predict: bool = False, min_savings: float = MIN_PREDICTED_SAVINGS) -> ScanSummary:
+        """Re-encode files while the scan that finds them is still running
+
+        Scan results pass through a bounded queue to `jobs` encoder threads,
+        so the first encode starts as soon as the first eligible file has been
+        probed; when the encoders fall behind the queue fills up and scanning
+        waits. The queue hands out the best savings per CPU-second among the
+        files waiting. Returns the summary, built up as files were scanned.
+        """
+        encoder = self.available_encoders.get(self.target_codec, '')
+        cores = os.cpu_count() or 1
+        if jobs is None:
+            jobs = default_encode_jobs(encoder)
+        jobs = max(1, jobs)
+        budget = ThreadBudget(cores)
+        pending = queue.PriorityQueue(maxsize=max(STREAM_QUEUE_SIZE, jobs))
+        summary = ScanSummary()
+
+        def worker():
+            while True:
+                _, i, file_data = pending.get()
+                if file_data is None or self.stop.is_set():
+                    return
+                threads = None
+                if not is_hardware_encoder(encoder) and jobs > 1:
+                    threads = self.thread_budget(file_data, cores, jobs)
+                try:
+                    with budget.reserve(threads or 1):
+                        self.timed_process_file(file_data, f"[{i}]", backup_originals, threads)
+                except Exception as e:
+                    # Keep consuming: a dead worker would leave the scan blocked on a full queue
+                    logger.error(f"Re-encoding {file_data['path']} failed: {e}")
+                    self.journal_record(file_data['path'], FAILED)
+
+        print(f"\nEncoding up to {jobs} files at a time while scanning continues...")
+        workers = [threading.Thread(target=worker, name=f"encode-{n}", daemon=True) for n in range(jobs)]
+        for thread in workers:
+            thread.start()
+        queued = 0
+        try:
+            for file_data in scanned:
+                if predict and file_data['should_reencode']:
+                    self.apply_predictions([file_data], min_savings)
+                summary.add(file_data)
+                if file_data['should_reencode']:
+                    queued += 1
+                    self.journal_record(file_data['path'], QUEUED, file=file_data)
+                    pending.put((-self.encode_priority(file_data), queued, file_data))
+            for n, _ in enumerate(workers, queued + 1):
+                pending.put((float('inf'), n, None))
+            for thread in workers:
+                thread.join()
+        except BaseException:
+            # Interrupted: kill the running encodes and drop what hasn't started (the journal
+            # keeps both queued for --resume). The workers are daemons; they only get a moment
+            # to stop their ffmpeg, not the time to finish its encode.
+            self.stop.set()
+            while True:
+                try:
+                    pending.get_nowait()
+                except queue.Empty:
+                    break
+            for n, _ in enumerate(workers, queued + 1):
+                pending.put_nowait((float('inf'), n, None))
+            give_up = time.monotonic() + STOP_GRACE_SECONDS
+            for thread in workers:
+                thread.join(max(0.0, give_up - time.monotonic()))
+            raise
+
+        if not queued:
+            print("No files need re-encoding!")
+        return summary
 
 
-def perform(recursive=True, dry_run=False, codec="h265", preset='fast', backup_orig=False):
+def perform(recursive=True, dry_run=False, codec="h265", preset='fast', backup_orig=False, inventory=None,
+            jobs=None, resume=False, predict=False, min_savings=MIN_PREDICTED_SAVINGS, directory=None, confirm=True,
+            stream=False, deadline=None):
 
-    # Validate directory
-    directory = Path(get_root_dir())
+    # Validate directory (the whole root unless a single folder is given, e.g. by watch mode)
+    directory = Path(directory or get_root_dir())
     if not directory.exists():
         print(f"Error: Directory '{directory}' does not exist!")
         return 1
 
-    # Check for required tools
+    # Check for required tools (versions are cached until the binaries change)
     required_tools = ['ffmpeg', 'ffprobe']
     for tool in required_tools:
-        try:
-            # Handle Windows executable names
-            cmd = [tool, '-version']
-            if platform.system() == 'Windows':
-                try:
-                    subprocess.run(cmd, capture_output=True, check=True, timeout=5)
-                except FileNotFoundError:
-                    # Try with .exe extension and common paths
-                    for exe_path in [f'{tool}.exe', f'C:\\ffmpeg\\bin\\{tool}.exe']:
-                        try:
-                            subprocess.run([exe_path, '-version'], capture_output=True, check=True, timeout=5)
-                            break
-                        except (FileNotFoundError, subprocess.CalledProcessError):
-                            continue
-                    else:
-                        raise FileNotFoundError(f"{tool} not found")
-            else:
-                subprocess.run(cmd, capture_output=True, check=True, timeout=5)
-
-        except (subprocess.CalledProcessError, FileNotFoundError, subprocess.TimeoutExpired):
+        if get_tool_version(tool) is None:
             print(f"Error: {tool} not found!")
             if platform.system() == 'Windows':
                 print(f"Please install ffmpeg for Windows:")
@@ -446,8 +960,13 @@ def perform(recursive=True, dry_run=False, codec="h265", preset='fast', backup_o
                 print(f"Please install ffmpeg: sudo apt install ffmpeg")
             return 1
 
-    # Initialize analyzer
-    analyzer = VideoAnalyzer(target_codec=codec, quality_preset=preset)
+    # Initialize analyzer; only real runs touch files, so only they keep a journal
+    journal = None if dry_run else EncodeJournal()
+    analyzer = VideoAnalyzer(target_codec=codec, quality_preset=preset, inventory=inventory, journal=journal)
+    analyzer.deadline = deadline
+    if deadline is not None and not dry_run:
+        print(f"Time budget: no encode starts unless it should finish by "
+              f"{time.strftime('%Y-%m-%d %H:%M', time.localtime(deadline))}")
 
     # Validate target codec is available
     if not analyzer.validate_target_codec():
@@ -460,23 +979,57 @@ def perform(recursive=True, dry_run=False, codec="h265", preset='fast', backup_o
             print(f"  --codec mpeg4 (basic)")
         return 1
 
-    # Scan directory
-    print(f"Scanning {'recursively' if recursive else 'non-recursively'}: {directory}")
-    video_files = analyzer.scan_directory(directory, recursive)
+    # Clean up after an interrupted run before looking at the tree
+    repaired = analyzer.recover_journal()
+    if repaired:
+        print(f"Recovered {repaired} file(s) from an interrupted re-encode run")
+
+    if stream and not dry_run and not resume:
+        # Nothing to review before encoding starts, so confirm up front
+        response = input("\nRe-encode files as they are found? (y/N): ") if confirm else "y"
+        if response.lower() not in ['y', 'yes']:
+            print("Operation cancelled.")
+            return 0
+        journal.reset()
+        print(f"Scanning {'recursively' if recursive else 'non-recursively'} and encoding as files are found: "
+              f"{directory}")
+        summary = analyzer.process_stream(analyzer.iter_scan(directory, recursive, ahead=STREAM_QUEUE_SIZE),
+                                          backup_orig, jobs, predict, min_savings)
+        if not summary.total_files:
+            print("No video files found!")
+            return 0
+        analyzer.print_summary(summary, dry_run=False)
+        return 0
+
+    if resume and not dry_run:
+        video_files = analyzer.queued_files()
+        if not video_files:
+            print("Nothing to resume.")
+            return 0
+        print(f"Resuming {len(video_files)} unfinished file(s) from {journal.path}")
+    else:
+        # Scan directory
+        print(f"Scanning {'recursively' if recursive else 'non-recursively'}: {directory}")
+        video_files = analyzer.scan_directory(directory, recursive)
 
     if not video_files:
         print("No video files found!")
         return 0
 
+    if predict:
+        analyzer.apply_predictions(video_files, min_savings)
+
     # Print summary
     analyzer.print_summary(video_files, dry_run=dry_run)
 
     # Process files if not dry run
     if not dry_run:
-        response = input("\nProceed with re-encoding? (y/N): ")
+        response = input("\nProceed with re-encoding? (y/N): ") if confirm else "y"
         if response.lower() in ['y', 'yes']:
-            analyzer.process_files(video_files, backup_originals=backup_orig)
+            if not resume:
+                journal.reset()
+            analyzer.process_files(video_files, backup_originals=backup_orig, jobs=jobs)
         else:
             print("Operation cancelled.")
 
-    return 0
\ No newline at end of file
+    return 0
@@ -0,0 +1,362 @@
+# container_probe.py
+import os
+import sys
+import math
+import struct
+from array import array
+from sniffer import SNIFF_BYTES, sniff_header
+from profiler import profiled
+
+# Headers bigger than this (huge moov boxes, odd files) are left to ffprobe
+MAX_HEADER_BYTES = 64 * 1024 * 1024
+# Top-level boxes / Segment children to look at before giving up on finding the headers
+MAX_HEADER_ELEMENTS = 256
+
+# Sample entry / CodecID -> ffprobe codec_name; anything else falls back to ffprobe
+MP4_CODECS = {
+    b'avc1': 'h264', b'avc3': 'h264',
+    b'hvc1': 'hevc', b'hev1': 'hevc',
+    b'av01': 'av1', b'vp09': 'vp9', b'vp08': 'vp8',
+    b'mp4v': 'mpeg4', b'jpeg': 'mjpeg', b'mjpa': 'mjpeg',
+}
+MKV_CODECS = {
+    'V_MPEG4/ISO/AVC': 'h264', 'V_MPEGH/ISO/HEVC': 'hevc',
+    'V_AV1': 'av1', 'V_VP9': 'vp9', 'V_VP8': 'vp8',
+    'V_MPEG4/ISO/SP': 'mpeg4', 'V_MPEG4/ISO/ASP': 'mpeg4', 'V_MPEG4/ISO/AP': 'mpeg4',
+    'V_MPEG2': 'mpeg2video', 'V_MPEG1': 'mpeg1video', 'V_THEORA': 'theora', 'V_MJPEG': 'mjpeg',
+}
+
+# Matroska element IDs (marker bits kept, as written in the spec)
+EBML_HEADER = 0x1A45DFA3
+SEGMENT = 0x18538067
+INFO = 0x1549A966
+TRACKS = 0x1654AE6B
+CLUSTER = 0x1F43B675
+TIMESTAMP_SCALE = 0x2AD7B1
+DURATION = 0x4489
+TRACK_ENTRY = 0xAE
+TRACK_TYPE = 0x83
+CODEC_ID = 0x86
+DEFAULT_DURATION = 0x23E383
+VIDEO = 0xE0
+PIXEL_WIDTH = 0xB0
+PIXEL_HEIGHT = 0xBA
+
+
+class HeaderError(Exception):
+    """The headers are missing, truncated or use something this parser doesn't handle."""
+
+
+def _read_at(fd, offset, length):
+    if hasattr(os, "pread"):
+        data = os.pread(fd, length, offset)
+    else:
+        os.lseek(fd, offset, os.SEEK_SET)
+        data = os.read(fd, length)
+    if len(data) < length:
+        raise HeaderError("truncated header")
+    return data
+
+
+def _fraction(num, den):
+    divisor = math.gcd(num, den) or 1
+    return f"{num // divisor}/{den // divisor}"
+
+
+def _frame_rate(frame_ns):
+    """r_frame_rate for a Matroska DefaultDuration, snapped to N/1 or N/1001 the way ffprobe reports it."""
+    rate = 1_000_000_000 / frame_ns
+    for den in (1, 1001):
+        num = round(rate * den)
+        if num and abs(num / den - rate) < rate * 1e-4:
+            return _fraction(num, den)
+    return _fraction(1_000_000_000, frame_ns)
+
+
+def _result(format_name, size, duration, stream):
+    """Shape the parsed values like `ffprobe -show_format -show_streams` JSON."""
+    stream["codec_type"] = "video"
+    stream["index"] = 0
+    fmt = {"format_name": format_name, "size": str(size), "probe": "native"}
+    if duration:
+        fmt["duration"] = f"{duration:.6f}"
+        fmt["bit_rate"] = str(int(size * 8 / duration))
+    return {"streams": [stream], "format": fmt}
+
+
+# --- ISO BMFF (MP4 / MOV) ---
+
+def _boxes(data, start, end):
+    """Yield (type, body_start, body_end) for the boxes laid out in data[start:end]."""
+    pos = start
+    while pos + 8 <= end:
+        size, box_type = struct.unpack_from(">I4s", data, pos)
+        header = 8
+        if size == 1:
+            size = struct.unpack_from(">Q", data, pos + 8)[0]
+            header = 16
+        elif size == 0:
+            size = end - pos
+        if size < header or pos + size > end:
+            raise HeaderError(f"bad {box_type!r} box")
+        yield box_type, pos + header, pos + size
+        pos += size
+
+
+def _child(data, start, end, box_type):
+    for found, body_start, body_end in _boxes(data, start, end):
+        if found == box_type:
+            return body_start, body_end
+    return None
+
+
+def _path(data, start, end, *types):
+    span = (start, end)
+    for box_type in types:
+        span = _child(data, span[0], span[1], box_type)
+        if span is None:
+            return None
+    return span
+
+
+def _timescale_duration(data, body):
+    """(timescale, duration) from an mvhd or mdhd body."""
+    if data[body] == 1:
+        return struct.unpack_from(">IQ", data, body + 20)
+    return struct.unpack_from(">II", data, body + 12)
+
+
+def _find_moov(fd, file_size):
+    offset = 0
+    for _ in range(MAX_HEADER_ELEMENTS):
+        if offset + 8 > file_size:
+            break
+        size, box_type = struct.unpack(">I4s", _read_at(fd, offset, 8))
+        header = 8
+        if size == 1:
+            size = struct.unpack(">Q", _read_at(fd, offset + 8, 8))[0]
+            header = 16
+        elif size == 0:
+            size = file_size - offset
+        if size < header:
+            raise HeaderError("bad top-level box")
+        if box_type == b'moov':
+            if size > MAX_HEADER_BYTES:
+                raise HeaderError("moov too large")
+            return _read_at(fd, offset, size), header
+        offset += size
+    raise HeaderError("no moov box")
+
+
+def _mp4_video_stream(moov, start, end):
+    for box_type, trak_start, trak_end in _boxes(moov, start, end):
+        if box_type != b'trak':
+            continue
+        hdlr = _path(moov, trak_start, trak_end, b'mdia', b'hdlr')
+        if hdlr is None or moov[hdlr[0] + 8:hdlr[0] + 12] != b'vide':
+            continue
+        mdhd = _path(moov, trak_start, trak_end, b'mdia', b'mdhd')
+        stbl = _path(moov, trak_start, trak_end, b'mdia', b'minf', b'stbl')
+        if mdhd is None or stbl is None:
+            raise HeaderError("incomplete video track")
+        stsd = _child(moov, stbl[0], stbl[1], b'stsd')
+        stts = _child(moov, stbl[0], stbl[1], b'stts')
+        stsz = _child(moov, stbl[0], stbl[1], b'stsz')
+        if stsd is None or stts is None or stsz is None:
+            raise HeaderError("fragmented or incomplete sample tables")
+
+        entry = stsd[0] + 8
+        codec = MP4_CODECS.get(moov[entry + 4:entry + 8])
+        if codec is None:
+            raise HeaderError(f"unsupported sample entry {moov[entry + 4:entry + 8]!r}")
+        width, height = struct.unpack_from(">HH", moov, entry + 32)
+
+        timescale, duration = _timescale_duration(moov, mdhd[0])
+        if not timescale or not duration:
+            raise HeaderError("track has no duration (fragmented file?)")
+        seconds = duration / timescale
+
+        # Most common sample delta gives ffprobe's r_frame_rate
+        entries = struct.unpack_from(">I", moov, stts[0] + 4)[0]
+        deltas = struct.unpack_from(f">{entries * 2}I", moov, stts[0] + 8)
+        frames = sum(deltas[0::2])
+        counts = {}
+        for count, delta in zip(deltas[0::2], deltas[1::2]):
+            counts[delta] = counts.get(delta, 0) + count
+        common_delta = max(counts, key=counts.get) if counts else 0
+        if not common_delta or not frames:
+            raise HeaderError("no samples")
+
+        sample_size, sample_count = struct.unpack_from(">II", moov, stsz[0] + 4)
+        if sample_size:
+            total_bytes = sample_size * sample_count
+        else:
+            sizes = array("I", moov[stsz[0] + 12:stsz[0] + 12 + 4 * sample_count])
+            if sys.byteorder == "little":
+                sizes.byteswap()
+            total_bytes = sum(sizes)
+
+        return {
+            "codec_name": codec,
+            "codec_tag_string": moov[entry + 4:entry + 8].decode("latin-1"),
+            "width": width,
+            "height": height,
+            "r_frame_rate": _fraction(timescale, common_delta),
+            "avg_frame_rate": _fraction(frames * timescale, duration),
+            "duration": f"{seconds:.6f}",
+            "bit_rate": str(int(total_bytes * 8 / seconds)),
+            "nb_frames": str(frames),
+        }
+    raise HeaderError("no video track")
+
+
+def probe_mp4(fd, file_size):
+    moov, header = _find_moov(fd, file_size)
+    mvhd = _child(moov, header, len(moov), b'mvhd')
+    if mvhd is None:
+        raise HeaderError("no mvhd box")
+    timescale, duration = _timescale_duration(moov, mvhd[0])
+    stream = _mp4_video_stream(moov, header, len(moov))
+    seconds = duration / timescale if timescale else float(stream["duration"])
+    return _result("mov,mp4,m4a,3gp,3g2,mj2", file_size, seconds, stream)
+
+
+# --- Matroska / WebM (EBML) ---
+
+def _vint(data, pos, keep_marker=False):
+    """Decode an EBML variable-length integer; returns (value, next_pos), value None for unknown size."""
+    first = data[pos]
+    if not first:
+        raise HeaderError("invalid EBML length")
+    length = 9 - first.bit_length()
+    if pos + length > len(data):
+        raise HeaderError("truncated EBML element")
+    value = first if keep_marker else first & ((1 << (8 - length)) - 1)
+    for byte in data[pos + 1:pos + length]:
+        value = (value << 8) | byte
+    if not keep_marker and value == (1 << (7 * length)) - 1:
+        value = None
+    return value, pos + length
+
+
+def _elements(data, start, end):
+    """Yield (id, body_start, body_end) for the EBML elements in data[start:end]."""
+    pos = start
+    while pos < end:
+        element_id, pos = _vint(data, pos, keep_marker=True)
+        size, pos = _vint(data, pos)
+        body_end = end if size is None else pos + size
+        if body_end > end:
+            raise HeaderError("EBML element overruns its parent")
+        yield element_id, pos, body_end
+        pos = body_end
+
+
+def _uint(data, start, end):
+    return int.from_bytes(data[start:end], "big")
+
+
+def _float(data, start, end):
+    if end - start == 4:
+        return struct.unpack_from(">f", data, start)[0]
+    if end - start == 8:
+        return struct.unpack_from(">d", data, start)[0]
+    raise HeaderError("bad EBML float")
+
+
+def _element_at(fd, offset, file_size):
+    """(id, body_start, body_end) of the element starting at offset, reading only its header."""
+    head = _read_at(fd, offset, min(12, file_size - offset))
+    element_id, pos = _vint(head, 0, keep_marker=True)
+    size, pos = _vint(head, pos)
+    body_start = offset + pos
+    return element_id, body_start, file_size if size is None else body_start + size
+
+
+def _mkv_video_stream(tracks):
+    for element_id, start, end in _elements(tracks, 0, len(tracks)):
+        if element_id != TRACK_ENTRY:
+            continue
+        fields = {}
+        for child_id, child_start, child_end in _elements(tracks, start, end):
+            fields[child_id] = (child_start, child_end)
+        if TRACK_TYPE not in fields or _uint(tracks, *fields[TRACK_TYPE]) != 1:
+            continue
+        codec_id = tracks[slice(*fields.get(CODEC_ID, (0, 0)))].decode("ascii", "replace").rstrip("\0")
+        codec = MKV_CODECS.get(codec_id)
+        if codec is None or VIDEO not in fields:
+            raise HeaderError(f"unsupported video track {codec_id!r}")
+        video = {child_id: span for child_id, *span in _elements(tracks, *fields[VIDEO])}
+        if PIXEL_WIDTH not in video or PIXEL_HEIGHT not in video:
+            raise HeaderError("video track without dimensions")
+        stream = {
+            "codec_name": codec,
+            "width": _uint(tracks, *video[PIXEL_WIDTH]),
+            "height": _uint(tracks, *video[PIXEL_HEIGHT]),
+        }
+        if DEFAULT_DURATION in fields:
+            stream["r_frame_rate"] = _frame_rate(_uint(tracks, *fields[DEFAULT_DURATION]))
+        return stream
+    raise HeaderError("no video track")
+
+
+def probe_mkv(fd, file_size):
+    element_id, _, offset = _element_at(fd, 0, file_size)
+    if element_id != EBML_HEADER:
+        raise HeaderError("no EBML header")
+    element_id, segment_start, segment_end = _element_at(fd, offset, file_size)
+    if element_id != SEGMENT:
+        raise HeaderError("no Segment")
+
+    info = tracks = None
+    offset = segment_start
+    for _ in range(MAX_HEADER_ELEMENTS):
+        if info is not None and tracks is not None or offset >= min(segment_end, file_size):
+            break
+        element_id, body_start, body_end = _element_at(fd, offset, file_size)
+        if element_id == CLUSTER:
+            break  # media data starts; headers written after it are left to ffprobe
+        if element_id in (INFO, TRACKS):
+            if body_end - body_start > MAX_HEADER_BYTES:
+                raise HeaderError("header element too large")
+            body = _read_at(fd, body_start, body_end - body_start)
+            if element_id == INFO:
+                info = body
+            else:
+                tracks = body
+        offset = body_end
+    if info is None or tracks is None:
+        raise HeaderError("Info/Tracks not found before the first Cluster")
+
+    timestamp_scale = 1_000_000
+    duration = None
+    for element_id, start, end in _elements(info, 0, len(info)):
+        if element_id == TIMESTAMP_SCALE:
+            timestamp_scale = _uint(info, start, end)
+        elif element_id == DURATION:
+            duration = _float(info, start, end)
+    seconds = duration * timestamp_scale / 1_000_000_000 if duration else None
+    # Like ffprobe, Matroska streams carry no duration or bit_rate of their own
+    return _result("matroska,webm", file_size, seconds, _mkv_video_stream(tracks))
+
+
+PARSERS = {'.mp4': probe_mp4, '.mov': probe_mp4, '.mkv': probe_mkv, '.webm': probe_mkv}
+
+
+@profiled("native probe")
+def probe_headers(filepath):
+    """ffprobe-shaped info read straight from MP4/MKV headers, or None to fall back to ffprobe."""
+    try:
+        fd = os.open(filepath, os.O_RDONLY | getattr(os, "O_BINARY", 0))
+    except OSError:
+        return None
+    try:
+        file_size = os.fstat(fd).st_size
+        parser = PARSERS.get(sniff_header(_read_at(fd, 0, min(SNIFF_BYTES, file_size))))
+        if parser is None:
+            return None
+        return parser(fd, file_size)
+    except (HeaderError, struct.error, IndexError, ValueError, ZeroDivisionError, OSError):
+        return None
+    finally:
+        os.close(fd)
@@ -0,0 +1,161 @@
+# copy_engine.py
+import os
+import time
+import errno
+import shutil
+import hashlib
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from fingerprint import full_hash
+from profiler import profiled, count
+
+COPY_WORKERS = 4
+# Bytes per kernel copy call; large chunks keep syscalls rare on multi-GB files
+COPY_CHUNK = 64 * 1024 * 1024
+# Buffer for the userspace fallback
+FALLBACK_BUFFER = 8 * 1024 * 1024
+
+# errnos meaning "this kernel path can't do this pair of files", not a real I/O error
+_UNSUPPORTED = {errno.EXDEV, errno.ENOSYS, errno.EINVAL, errno.EOPNOTSUPP, errno.EBADF, errno.ETXTBSY}
+
+
+def _copy_file_range(src_fd, dst_fd, size, chunk):
+    copied = 0
+    while copied < size:
+        n = os.copy_file_range(src_fd, dst_fd, min(chunk, size - copied))
+        if n == 0:
+            break
+        copied += n
+    return copied
+
+
+def _sendfile(src_fd, dst_fd, size, chunk):
+    copied = 0
+    while copied < size:
+        n = os.sendfile(dst_fd, src_fd, copied, min(chunk, size - copied))
+        if n == 0:
+            break
+        copied += n
+    return copied
+
+
+def _userspace_copy(fsrc, fdst, digest=None):
+    buffer = bytearray(FALLBACK_BUFFER)
+    view = memoryview(buffer)
+    copied = 0
+    while True:
+        n = fsrc.readinto(buffer)
+        if not n:
+            break
+        fdst.write(view[:n])
+        if digest is not None:
+            digest.update(view[:n])
+        copied += n
+    return copied
+
+
+@profiled("copy")
+def copy_file(src, dst, chunk=COPY_CHUNK, digest=None):
+    """Copy src to dst with data and metadata (like shutil.copy2), kernel-side when possible
+
+    Tries copy_file_range (in-kernel, reflinks/server-side copy on supporting
+    filesystems), then sendfile, then a large-buffer read/write loop.
+    With a hashlib `digest`, the data has to pass through userspace anyway,
+    so the read/write loop is used and feeds it on the way.
+    Returns the number of bytes copied.
+    """
+    with open(src, 'rb', buffering=0) as fsrc, open(dst, 'wb', buffering=0) as fdst:
+        copied = None
+        size = os.fstat(fsrc.fileno()).st_size
+        for kernel_copy, available in ((_copy_file_range, hasattr(os, 'copy_file_range')),
+                                       (_sendfile, hasattr(os, 'sendfile') and os.name == 'posix')):
+            if not available or digest is not None:
+                continue
+            try:
+                copied = kernel_copy(fsrc.fileno(), fdst.fileno(), size, chunk)
+                break
+            except OSError as e:
+                if e.errno not in _UNSUPPORTED:
+                    raise
+                # Nothing was written if the very first call was refused; start over cleanly
+                fsrc.seek(0)
+                fdst.seek(0)
+                fdst.truncate()
+        if copied is None or copied < size:
+            fsrc.seek(0)
+            fdst.seek(0)
+            fdst.truncate()
+            copied = _userspace_copy(fsrc, fdst, digest)
+    shutil.copystat(src, dst)
+    count("bytes copied", copied)
+    return copied
+
+
+@profiled("move")
+def move_file(src, dst, chunk=COPY_CHUNK):
+    """Move src to another filesystem: copy, verify size and full checksum, then unlink src
+
+    The source is hashed as it streams through the copy and the copy is then
+    read back and hashed whole, so damage anywhere in it is caught. On a
+    mismatch the copy is removed and the source is left alone.
+    Returns the number of bytes copied.
+    """
+    digest = hashlib.blake2b(digest_size=32)
+    copied = copy_file(src, dst, chunk, digest=digest)
+    if os.path.getsize(dst) != os.path.getsize(src) or full_hash(dst) != digest.hexdigest():
+        os.remove(dst)
+        raise OSError(errno.EIO, "copy does not match source, source kept", src)
+    os.remove(src)
+    return copied
+
+
+class CopyStats:
+    """Totals for one copy run, safe to update from worker threads"""
+
+    def __init__(self):
+        self.files = 0
+        self.bytes = 0
+        self.failed = 0
+        self.started = time.monotonic()
+        self.finished = None
+        self.lock = threading.Lock()
+
+    def add(self, nbytes):
+        with self.lock:
+            self.files += 1
+            self.bytes += nbytes
+
+    @property
+    def seconds(self):
+        return (self.finished or time.monotonic()) - self.started
+
+    def summary(self):
+        seconds = max(self.seconds, 1e-6)
+        mb = self.bytes / (1024 * 1024)
+        return f"{self.files} files, {mb:.1f} MB in {seconds:.1f}s ({mb / seconds:.1f} MB/s)"
+
+
+def copy_files(jobs, workers=COPY_WORKERS, on_done=None, on_error=None, copy=copy_file):
+    """Copy (src, dst, size) jobs on a bounded pool, largest first to keep the pipe full
+
+    on_done(src, dst, nbytes) and on_error(src, dst, exc) are called from the
+    caller's thread as jobs finish. Returns CopyStats.
+    """
+    stats = CopyStats()
+    jobs = sorted(jobs, key=lambda job: job[2], reverse=True)
+    with ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix="copy") as executor:
+        futures = {executor.submit(copy, src, dst): (src, dst) for src, dst, _ in jobs}
+        for future in as_completed(futures):
+            src, dst = futures[future]
+            try:
+                nbytes = future.result()
+            except Exception as e:
+                stats.failed += 1
+                if on_error is not None:
+                    on_error(src, dst, e)
+                continue
+            stats.add(nbytes)
+            if on_done is not None:
+                on_done(src, dst, nbytes)
+    stats.finished = time.monotonic()
+    return stats
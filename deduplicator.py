@@ -1,16 +1,29 @@
 # deduplicator.py
 import os
-from utils import is_video_file, get_video_info, find_best_quality_video
+from utils import is_video_file, get_video_infos, iter_video_infos, find_best_quality_video
+from duplicate_index import find_duplicate_groups
+from inventory import get_inventory
+from download_tracker import active_packages, in_packages
+from fingerprint import find_exact_duplicates
+from perceptual import get_fingerprints, find_near_duplicate_groups
 from colorama import Fore, Style
 
-def remove_duplicates(root_dir):
+def remove_duplicates(root_dir, inventory=None):
+    inventory = get_inventory(root_dir, inventory)
     removed_count = 0
-    for root, _, files in os.walk(root_dir):
-        video_files = [os.path.join(root, f) for f in files if is_video_file(f)]
-        if len(video_files) <= 1:
+    groups = []
+    downloading = active_packages(root_dir, inventory)
+    for root, dirs, files in inventory.walk(root_dir):
+        if in_packages(root, downloading):
+            dirs[:] = []
             continue
+        video_files = [os.path.join(root, f) for f in files if is_video_file(f)]
+        if len(video_files) > 1:
+            groups.append(video_files)
 
-        infos = [get_video_info(f) for f in video_files]
+    all_infos = iter_video_infos((f for video_files in groups for f in video_files), inventory)
+    for video_files in groups:
+        infos = [next(all_infos) for _ in video_files]
         best_index = find_best_quality_video(video_files, infos)
         if best_index is None:
             continue
@@ -19,9 +32,112 @@ def remove_duplicates(root_dir):
             if i != best_index:
                 try:
                     os.remove(path)
+                    inventory.remove(path)
                     print(Fore.RED + f"🗑️ Deleted lower quality: {path}" + Style.RESET_ALL)
                     removed_count += 1
                 except Exception as e:
                     print(Fore.YELLOW + f"⚠️ Error deleting {path}: {e}" + Style.RESET_ALL)
 
     print(f"\n{Fore.GREEN}Done. Removed {removed_count} duplicates.{Style.RESET_ALL}")
+
+def remove_cross_folder_duplicates(root_dir, inventory=None, perceptual=False, dry_run=False, confirm=True):
+    """Keep only the best copy of each group of similar videos spread across folders.
+
+    By default videos are grouped by duration and resolution; with perceptual,
+    groups come from frame fingerprints instead, which also catches re-encodes
+    and trimmed copies and avoids matching unrelated clips of equal length.
+    Either way the match is a guess, so the groups are listed first and
+    nothing is deleted without confirmation (or at all with dry_run).
+    """
+    inventory = get_inventory(root_dir, inventory)
+    downloading = active_packages(root_dir, inventory)
+    video_files = [f for f in inventory.files(root_dir)
+                   if is_video_file(os.path.basename(f)) and not in_packages(f, downloading)]
+
+    removed_count = 0
+    video_infos = get_video_infos(video_files, inventory)
+    if perceptual:
+        usable = [(f, info) for f, info in zip(video_files, video_infos) if "error" not in info]
+        video_files = [f for f, _ in usable]
+        video_infos = [info for _, info in usable]
+        infos_by_path = dict(usable)
+        fingerprints = get_fingerprints(video_files, video_infos, inventory)
+        groups = [[(path, infos_by_path[path]) for path in group]
+                  for group in find_near_duplicate_groups(video_files, fingerprints)]
+    else:
+        groups = find_duplicate_groups(video_files, video_infos)
+
+    doomed = []
+    for group in groups:
+        paths = [path for path, _ in group]
+        best_index = find_best_quality_video(paths, [info for _, info in group])
+        print(Fore.CYAN + f"Keeping {paths[best_index]}" + Style.RESET_ALL)
+        for i, path in enumerate(paths):
+            if i != best_index:
+                print(Fore.YELLOW + f"   would delete: {path}" + Style.RESET_ALL)
+                doomed.append(path)
+
+    if not doomed:
+        print(f"\n{Fore.GREEN}No cross-folder duplicates found.{Style.RESET_ALL}")
+        return
+    if dry_run:
+        print(f"\n{Fore.GREEN}Dry run: would remove {len(doomed)} cross-folder duplicates "
+              f"from {len(groups)} groups.{Style.RESET_ALL}")
+        return
+    response = input(f"\nDelete {len(doomed)} files? (y/N): ") if confirm else "y"
+    if response.lower() not in ['y', 'yes']:
+        print("Operation cancelled.")
+        return
+
+    for path in doomed:
+        try:
+            os.remove(path)
+            inventory.remove(path)
+            print(Fore.RED + f"🗑️ Deleted cross-folder duplicate: {path}" + Style.RESET_ALL)
+            removed_count += 1
+        except Exception as e:
+            print(Fore.YELLOW + f"⚠️ Error deleting {path}: {e}" + Style.RESET_ALL)
+
+    print(f"\n{Fore.GREEN}Done. Removed {removed_count} cross-folder duplicates from {len(groups)} groups.{Style.RESET_ALL}")
+
+def remove_exact_duplicates(root_dir, inventory=None, dry_run=False, confirm=True):
+    """Delete byte-identical copies anywhere under root_dir, keeping the first path of each set.
+
+    The sets are listed first; nothing is deleted without confirmation (or at all with dry_run).
+    """
+    inventory = get_inventory(root_dir, inventory)
+    downloading = active_packages(root_dir, inventory)
+    video_files = [f for f in inventory.files(root_dir)
+                   if is_video_file(os.path.basename(f)) and not in_packages(f, downloading)]
+
+    removed_count = 0
+    groups = find_exact_duplicates(video_files, inventory.stat)
+    doomed = []
+    for keep, *copies in groups:
+        print(Fore.CYAN + f"Keeping {keep}" + Style.RESET_ALL)
+        for path in copies:
+            print(Fore.YELLOW + f"   would delete: {path}" + Style.RESET_ALL)
+            doomed.append(path)
+
+    if not doomed:
+        print(f"\n{Fore.GREEN}No identical copies found.{Style.RESET_ALL}")
+        return
+    if dry_run:
+        print(f"\n{Fore.GREEN}Dry run: would remove {len(doomed)} identical copies "
+              f"from {len(groups)} groups.{Style.RESET_ALL}")
+        return
+    response = input(f"\nDelete {len(doomed)} files? (y/N): ") if confirm else "y"
+    if response.lower() not in ['y', 'yes']:
+        print("Operation cancelled.")
+        return
+
+    for path in doomed:
+        try:
+            os.remove(path)
+            inventory.remove(path)
+            print(Fore.RED + f"🗑️ Deleted identical copy: {path}" + Style.RESET_ALL)
+            removed_count += 1
+        except Exception as e:
+            print(Fore.YELLOW + f"⚠️ Error deleting {path}: {e}" + Style.RESET_ALL)
+
+    print(f"\n{Fore.GREEN}Done. Removed {removed_count} identical copies from {len(groups)} groups.{Style.RESET_ALL}")
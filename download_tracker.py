@@ -0,0 +1,135 @@
+# download_tracker.py
+import os
+import json
+import time
+from colorama import Fore, Style
+from utils import is_part_file
+from inventory import get_inventory
+
+SNAPSHOT_FILE = "part_snapshots.json"
+# A .part file untouched for this long is taken to be an abandoned download
+STALE_SECONDS = 15 * 60
+# The watcher waits on a package's parts, however long they have been paused,
+# until none of them has been written to for this long
+ABANDONED_SECONDS = 24 * 60 * 60
+# Before deleting parts that look stale, watch them this long for any growth
+SAMPLE_SECONDS = 2.0
+
+
+class DownloadTracker:
+    """Tell .part files that are still being written from abandoned ones.
+
+    Each .part file's size and mtime are stat'ed fresh (they change under
+    us, so the inventory's cached stat won't do) and compared with the
+    snapshot kept in part_snapshots.json from earlier runs. A part is active
+    if it was written to within STALE_SECONDS, going by whichever is later
+    of its mtime and the run that last saw it change size or mtime; a
+    part seen for the first time is judged by its mtime alone.
+    """
+
+    def __init__(self, root, inventory=None, stale_after=STALE_SECONDS, path=SNAPSHOT_FILE):
+        self.root = root
+        self.inventory = get_inventory(root, inventory)
+        self.stale_after = stale_after
+        self.path = path
+        self.snapshots = self.load()
+        self.states = {}
+
+    def load(self):
+        if not os.path.exists(self.path):
+            return {}
+        try:
+            with open(self.path, "r") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def save(self):
+        """Keep snapshots of the parts seen in this run; ones that vanished are dropped."""
+        seen = {os.path.abspath(path) for path in self.states}
+        prefix = os.path.join(os.path.abspath(self.root), "")
+        snapshots = {path: snapshot for path, snapshot in self.snapshots.items()
+                     if path in seen or not path.startswith(prefix)}
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(snapshots, f)
+        os.replace(tmp_path, self.path)
+
+    def part_files(self, top=None):
+        return [path for path in self.inventory.files(top or self.root) if is_part_file(os.path.basename(path))]
+
+    def _observe(self, path, now):
+        key = os.path.abspath(path)
+        st = os.stat(path)
+        previous = self.snapshots.get(key)
+        current = [st.st_size, st.st_mtime_ns]
+        if previous is None:
+            changed_at = st.st_mtime
+        elif previous[:2] != current:
+            changed_at = now  # seen to change between runs, even if the mtime says otherwise
+        else:
+            changed_at = previous[2]
+        self.snapshots[key] = current + [changed_at]
+        return max(st.st_mtime, changed_at)
+
+    def classify(self, paths=None):
+        """Return {part path: "active" | "stale"} for the given parts (default: all under root)."""
+        now = time.time()
+        states = {}
+        for path in self.part_files() if paths is None else paths:
+            try:
+                last_write = self._observe(path, now)
+            except OSError:
+                continue  # finished or removed since the scan
+            states[path] = "active" if now - last_write < self.stale_after else "stale"
+        self.states.update(states)
+        return states
+
+    def sample(self, paths, seconds=SAMPLE_SECONDS):
+        """Re-stat paths after `seconds` and mark any that grew or were touched as active."""
+        before = {}
+        for path in paths:
+            try:
+                st = os.stat(path)
+            except OSError:
+                continue
+            before[path] = (st.st_size, st.st_mtime_ns)
+        if not before:
+            return
+        time.sleep(seconds)
+        now = time.time()
+        for path, state in before.items():
+            try:
+                st = os.stat(path)
+            except OSError:
+                self.states.pop(path, None)
+                continue
+            if (st.st_size, st.st_mtime_ns) != state:
+                self.states[path] = "active"
+                self.snapshots[os.path.abspath(path)] = [st.st_size, st.st_mtime_ns, now]
+
+    def active_packages(self):
+        """Top-level folders under root that hold a part still being downloaded."""
+        if not self.states:
+            self.classify()
+        packages = set()
+        for path, state in self.states.items():
+            rel = os.path.relpath(path, self.root)
+            if state == "active" and os.sep in rel:
+                packages.add(os.path.join(self.root, rel.split(os.sep)[0]))
+        return packages
+
+
+def in_packages(path, packages):
+    """True if path is one of packages or lies inside one."""
+    return any(path == package or path.startswith(package + os.sep) for package in packages)
+
+
+def active_packages(root, inventory=None, announce=True):
+    """Classify root's .part files, save the snapshots and return the packages still downloading."""
+    tracker = DownloadTracker(root, inventory)
+    packages = tracker.active_packages()
+    tracker.save()
+    for package in sorted(packages) if announce else ():
+        print(Fore.YELLOW + f"⏳ Still downloading, left alone: {package}" + Style.RESET_ALL)
+    return packages
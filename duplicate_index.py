@@ -0,0 +1,112 @@
+# duplicate_index.py
+import os
+from bisect import bisect_left, bisect_right
+
+THRESHOLD_SECONDS = 2
+THRESHOLD_RESOLUTION = 32
+
+
+def match_groups(count, pairs):
+    """Groups of two or more item indices in which every item matches every other.
+
+    Items are taken in index order: each one not yet grouped anchors a new
+    group and takes in those of its matches that also match every member so
+    far. A chain of near-matches (a~b, b~c, but not a~c) therefore never puts
+    a and c together, however long the chain.
+    """
+    neighbours = {}
+    for i, j in pairs:
+        neighbours.setdefault(i, set()).add(j)
+        neighbours.setdefault(j, set()).add(i)
+
+    grouped = set()
+    groups = []
+    for anchor in sorted(neighbours):
+        if anchor in grouped:
+            continue
+        group = [anchor]
+        for other in sorted(neighbours[anchor] - grouped):
+            if all(other in neighbours[member] for member in group[1:]):
+                group.append(other)
+        if len(group) > 1:
+            grouped.update(group)
+            groups.append(group)
+    return groups
+
+
+class DuplicateIndex:
+    """Finds videos with near-equal duration and resolution without comparing every pair.
+
+    Videos are bucketed into a grid of `threshold_resolution`-sized resolution
+    cells, so only the 3x3 neighbouring cells can hold a match, and each cell is
+    kept sorted by duration so a match is a bisect over a `threshold_seconds`
+    window. Candidate pairs therefore cost O(n log n) plus the matches found.
+    """
+
+    def __init__(self, threshold_seconds=THRESHOLD_SECONDS, threshold_resolution=THRESHOLD_RESOLUTION):
+        self.threshold_seconds = threshold_seconds
+        self.threshold_resolution = threshold_resolution
+        self.keys = []
+        self.infos = []
+        self._cells = {}
+
+    def add(self, key, info):
+        """Index a video; returns False if its info lacks a usable duration/resolution."""
+        try:
+            duration = float(info["Duration"])
+            width = int(info["Width"])
+            height = int(info["Height"])
+        except (KeyError, TypeError, ValueError):
+            return False
+        item = len(self.keys)
+        self.keys.append(key)
+        self.infos.append(info)
+        cell = (width // self.threshold_resolution, height // self.threshold_resolution)
+        self._cells.setdefault(cell, []).append((duration, width, height, item))
+        return True
+
+    def candidate_pairs(self):
+        """Yield (i, j) item indices, i < j, that are within both thresholds."""
+        cells = {cell: sorted(entries) for cell, entries in self._cells.items()}
+        durations = {cell: [e[0] for e in entries] for cell, entries in cells.items()}
+
+        for (cx, cy), entries in cells.items():
+            neighbours = [(cx + dx, cy + dy) for dx in (-1, 0, 1) for dy in (-1, 0, 1)
+                          if (cx + dx, cy + dy) in cells]
+            for duration, width, height, item in entries:
+                for cell in neighbours:
+                    lo = bisect_right(durations[cell], duration - self.threshold_seconds)
+                    hi = bisect_left(durations[cell], duration + self.threshold_seconds)
+                    for other_duration, other_width, other_height, other in cells[cell][lo:hi]:
+                        if other <= item:
+                            continue
+                        if (abs(width - other_width) < self.threshold_resolution
+                                and abs(height - other_height) < self.threshold_resolution):
+                            yield item, other
+
+    def groups(self, cross_folder_only=True):
+        """Return lists of keys that are all within the thresholds of each other, largest groups first.
+
+        With cross_folder_only, groups whose members all share one directory are
+        dropped, since same-folder duplicates are handled per folder.
+        """
+        members = match_groups(len(self.keys), self.candidate_pairs())
+
+        groups = []
+        for items in members:
+            if cross_folder_only and len({os.path.dirname(str(self.keys[i])) for i in items}) < 2:
+                continue
+            groups.append(items)
+        groups.sort(key=lambda items: (-len(items), items[0]))
+        return [[self.keys[i] for i in items] for items in groups]
+
+
+def find_duplicate_groups(video_files, video_infos, cross_folder_only=True,
+                          threshold_seconds=THRESHOLD_SECONDS, threshold_resolution=THRESHOLD_RESOLUTION):
+    """Group similar videos; returns lists of (path, info) tuples."""
+    index = DuplicateIndex(threshold_seconds, threshold_resolution)
+    lookup = {}
+    for path, info in zip(video_files, video_infos):
+        if "error" not in info and index.add(path, info):
+            lookup[path] = info
+    return [[(path, lookup[path]) for path in group] for group in index.groups(cross_folder_only)]
@@ -0,0 +1,79 @@
+# encode_journal.py
+import os
+import json
+import threading
+
+JOURNAL_FILE = "encode_journal.jsonl"
+
+# Lifecycle of a file in a re-encode batch
+QUEUED = "queued"        # scanned and waiting for an encoder
+ENCODING = "encoding"    # ffmpeg is writing the temp output
+VERIFIED = "verified"    # temp output complete and smaller; swap may be half done
+SWAPPED = "swapped"      # temp output now lives under the original name
+KEPT = "kept"            # re-encode was not smaller, original kept
+FAILED = "failed"        # ffmpeg failed
+FINISHED_STATES = {SWAPPED, KEPT, FAILED}
+
+
+class EncodeJournal:
+    """Append-only, fsync'd record of every state change in a re-encode batch.
+
+    Each line is a JSON object with the file's path, new state and any fields
+    needed to recover (temp output path, backup path, scan data). The latest
+    line for a path wins, so after a crash load() tells exactly where each
+    file stopped.
+    """
+
+    def __init__(self, path=JOURNAL_FILE):
+        self.path = path
+        self.lock = threading.Lock()
+        self.entries = self.load()
+
+    def load(self):
+        entries = {}
+        if not os.path.exists(self.path):
+            return entries
+        valid_bytes = 0
+        terminated = True
+        with open(self.path, "rb") as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    break  # torn final write from a crash; everything before it is intact
+                entries.setdefault(record["path"], {}).update(record)
+                valid_bytes += len(line)
+                terminated = line.endswith(b"\n")
+        if valid_bytes < os.path.getsize(self.path) or not terminated:
+            # Drop the torn tail, and end a complete last record that lost only its newline,
+            # so new records don't get appended onto it
+            with open(self.path, "r+b") as f:
+                f.truncate(valid_bytes)
+                if not terminated:
+                    f.seek(valid_bytes)
+                    f.write(b"\n")
+        return entries
+
+    def record(self, path, state, **fields):
+        record = {"path": str(path), "state": state}
+        record.update(fields)
+        line = json.dumps(record, default=str) + "\n"
+        with self.lock:
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(line)
+                f.flush()
+                os.fsync(f.fileno())
+            self.entries.setdefault(record["path"], {}).update(record)
+
+    def unfinished(self, state=None):
+        """Entries not yet in a finished state (optionally only those in `state`)."""
+        with self.lock:
+            return [dict(e) for e in self.entries.values()
+                    if e["state"] not in FINISHED_STATES and (state is None or e["state"] == state)]
+
+    def reset(self):
+        """Start a new batch, discarding the previous batch's history."""
+        with self.lock:
+            self.entries = {}
+            if os.path.exists(self.path):
+                os.remove(self.path)
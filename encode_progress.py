@@ -0,0 +1,138 @@
+# encode_progress.py
+import time
+import threading
+import subprocess
+from collections import deque
+from typing import Callable, Dict, List, Optional, Tuple
+
+# Lines of ffmpeg stderr kept for error reporting
+STDERR_TAIL_LINES = 40
+
+
+class EncodeProgress:
+    """Live numbers for one ffmpeg job, fed from its `-progress` key=value stream"""
+
+    def __init__(self, name: str, duration: Optional[float] = None):
+        self.name = name
+        self.duration = duration
+        self.started = time.monotonic()
+        self.finished = None
+        self.out_seconds = 0.0
+        self.frames = 0
+        self.fps = 0.0
+        self.speed = 0.0
+        self.bytes_written = 0
+        self.returncode = None
+        self.reported_at = 0.0
+
+    def update(self, fields: Dict[str, str]):
+        """Apply one completed progress block (everything up to a `progress=` line)"""
+        out_time_us = fields.get('out_time_us') or fields.get('out_time_ms')  # both are microseconds
+        if out_time_us and out_time_us != 'N/A':
+            self.out_seconds = int(out_time_us) / 1_000_000
+        if fields.get('frame', '').isdigit():
+            self.frames = int(fields['frame'])
+        if fields.get('total_size', '').isdigit():
+            self.bytes_written = int(fields['total_size'])
+        try:
+            self.fps = float(fields.get('fps', self.fps))
+        except ValueError:
+            pass
+        speed = fields.get('speed', '').rstrip('x')
+        try:
+            self.speed = float(speed)
+        except ValueError:
+            pass
+
+    @property
+    def elapsed(self) -> float:
+        return (self.finished or time.monotonic()) - self.started
+
+    @property
+    def fraction(self) -> Optional[float]:
+        if not self.duration:
+            return None
+        return min(1.0, self.out_seconds / self.duration)
+
+    @property
+    def eta_seconds(self) -> Optional[float]:
+        if self.finished:
+            return 0.0
+        if not self.duration or self.speed <= 0:
+            return None
+        return max(0.0, (self.duration - self.out_seconds) / self.speed)
+
+    def as_dict(self) -> Dict:
+        return {
+            'name': self.name,
+            'fraction': self.fraction,
+            'fps': self.fps,
+            'speed': self.speed,
+            'bytes_written': self.bytes_written,
+            'elapsed': self.elapsed,
+            'eta_seconds': self.eta_seconds,
+            'done': self.finished is not None,
+        }
+
+    def describe(self) -> str:
+        parts = []
+        if self.fraction is not None:
+            parts.append(f"{self.fraction * 100:5.1f}%")
+        parts.append(f"{self.fps:.1f} fps")
+        parts.append(f"{self.speed:.2f}x")
+        parts.append(f"{self.bytes_written / (1024 * 1024):.1f} MB")
+        if self.eta_seconds is not None:
+            parts.append(f"ETA {int(self.eta_seconds // 60)}m{int(self.eta_seconds % 60):02d}s")
+        return ", ".join(parts)
+
+
+def aggregate(progresses: List[EncodeProgress]) -> Dict:
+    """Batch totals across jobs: combined fps/bytes of running jobs and counts"""
+    running = [p for p in progresses if p.finished is None]
+    return {
+        'jobs_running': len(running),
+        'jobs_done': len(progresses) - len(running),
+        'fps': sum(p.fps for p in running),
+        'bytes_written': sum(p.bytes_written for p in progresses),
+        'longest_eta_seconds': max((p.eta_seconds or 0.0 for p in running), default=0.0),
+    }
+
+
+def run_with_progress(cmd: List[str], progress: EncodeProgress,
+                      on_update: Optional[Callable[[EncodeProgress], None]] = None) -> Tuple[int, str]:
+    """Run ffmpeg with `-progress pipe:1`, streaming updates into `progress`
+
+    stderr is drained on a helper thread into a bounded deque, so a
+    multi-hour encode never buffers more than the last STDERR_TAIL_LINES
+    lines. Returns (returncode, stderr tail).
+    """
+    cmd = cmd[:1] + ['-nostats', '-progress', 'pipe:1'] + cmd[1:]
+    stderr_tail = deque(maxlen=STDERR_TAIL_LINES)
+    process = subprocess.Popen(cmd, stdin=subprocess.DEVNULL, stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+                               text=True, errors='replace')
+
+    def drain_stderr():
+        for line in process.stderr:
+            stderr_tail.append(line.rstrip())
+
+    drainer = threading.Thread(target=drain_stderr, daemon=True)
+    drainer.start()
+    try:
+        fields = {}
+        for line in process.stdout:
+            key, _, value = line.strip().partition('=')
+            fields[key] = value
+            if key == 'progress':
+                progress.update(fields)
+                if on_update is not None:
+                    on_update(progress)
+                fields = {}
+        process.wait()
+    finally:
+        if process.poll() is None:
+            process.kill()
+            process.wait()
+        drainer.join(timeout=5)
+        progress.finished = time.monotonic()
+        progress.returncode = process.returncode
+    return process.returncode, "\n".join(stderr_tail)
@@ -1,9 +1,15 @@
 # file_mover.py
 
 import os
-import shutil
+import errno
+import hashlib
 from colorama import Fore, Style
 from config_handler import get_root_dir, get_target_dir
+from inventory import get_inventory
+from copy_engine import COPY_WORKERS, copy_file, copy_files, move_file
+from sync_manifest import SyncManifest
+from download_tracker import active_packages, in_packages
+from profiler import span
 
 # Define common video file extensions
 VIDEO_EXTENSIONS = {
@@ -21,75 +27,241 @@ def is_video_file(filename):
     return ext in VIDEO_EXTENSIONS
 
 
-def copy_all_contents(dst_dir):
+def _format_mb(nbytes):
+    return f"{nbytes / (1024 * 1024):.1f} MB"
+
+
+def copy_all_contents(dst_dir, inventory=None, workers=COPY_WORKERS, sync=False, dry_run=False, checksum=False):
+    """Copy every video under the root into dst_dir, keeping the folder layout
+
+    With sync, a manifest in dst_dir remembers what was copied, and videos
+    whose copy is still current are skipped. checksum adds a hash of each
+    copy, computed while copying. dry_run only reports what would transfer.
+    """
     src_dir = get_root_dir()
     if not os.path.exists(src_dir):
         print(Fore.RED + f"Source directory does not exist: {src_dir}" + Style.RESET_ALL)
         return
+    inventory = get_inventory(src_dir, inventory)
 
-    if not os.path.exists(dst_dir):
+    if not os.path.exists(dst_dir) and not dry_run:
         os.makedirs(dst_dir)
         print(Fore.YELLOW + f"Created destination directory: {dst_dir}" + Style.RESET_ALL)
 
-    copied_files = 0
+    manifest = SyncManifest(dst_dir) if sync else None
     skipped_files = 0
+    unchanged_files = 0
+    jobs = []
 
-    for root, dirs, files in os.walk(src_dir):
+    for root, dirs, files in inventory.walk(src_dir):
         rel_path = os.path.relpath(root, src_dir)
         target_root = os.path.join(dst_dir, rel_path)
-
-        # Only create directory if we have video files to copy
-        video_files = [f for f in files if is_video_file(f)]
-        if video_files:
-            os.makedirs(target_root, exist_ok=True)
+        created = False
 
         for file in files:
             if is_video_file(file):
                 src_file = os.path.join(root, file)
                 dst_file = os.path.join(target_root, file)
-
-                shutil.copy2(src_file, dst_file)
-                print(Fore.CYAN + f"📄 Copied: {src_file} -> {dst_file}" + Style.RESET_ALL)
-                copied_files += 1
+                st = inventory.stat(src_file)
+                if manifest is not None and manifest.unchanged(os.path.relpath(dst_file, dst_dir), st, dst_file):
+                    unchanged_files += 1
+                    continue
+                # Only create directory if we have video files to copy
+                if not created and not dry_run:
+                    os.makedirs(target_root, exist_ok=True)
+                    created = True
+                jobs.append((src_file, dst_file, st.st_size))
             else:
                 skipped_files += 1
                 if file.lower().endswith('.part'):
                     print(Fore.YELLOW + f"⏸️  Skipped .part file: {os.path.join(root, file)}" + Style.RESET_ALL)
                 else:
-                    print(Fore.GRAY + f"⏭️  Skipped non-video: {os.path.join(root, file)}" + Style.RESET_ALL)
+                    print(Fore.LIGHTBLACK_EX + f"⏭️  Skipped non-video: {os.path.join(root, file)}" + Style.RESET_ALL)
 
-    print(f"\n{Fore.GREEN}Done. Copied {copied_files} video files to {dst_dir}.{Style.RESET_ALL}")
+    if dry_run:
+        for src_file, dst_file, size in jobs:
+            print(Fore.CYAN + f"📄 Would copy: {src_file} -> {dst_file} ({_format_mb(size)})" + Style.RESET_ALL)
+        total = sum(size for _, _, size in jobs)
+        print(f"\n{Fore.GREEN}Dry run: would copy {len(jobs)} video files ({_format_mb(total)}) to {dst_dir}.{Style.RESET_ALL}")
+        if manifest is not None:
+            print(f"{Fore.CYAN}{unchanged_files} video files are unchanged since the last sync.{Style.RESET_ALL}")
+        return
+
+    checksums = {}
+
+    def copy(src_file, dst_file):
+        if not checksum or manifest is None:
+            return copy_file(src_file, dst_file)
+        digest = hashlib.blake2b(digest_size=32)
+        copied = copy_file(src_file, dst_file, digest=digest)
+        checksums[src_file] = digest.hexdigest()
+        return copied
+
+    def on_done(src_file, dst_file, nbytes):
+        if manifest is not None:
+            manifest.record(os.path.relpath(dst_file, dst_dir), inventory.stat(src_file), dst_file,
+                            checksums.pop(src_file, None))
+        print(Fore.CYAN + f"📄 Copied: {src_file} -> {dst_file}" + Style.RESET_ALL)
+
+    def on_error(src_file, dst_file, error):
+        if manifest is not None:
+            manifest.forget(os.path.relpath(dst_file, dst_dir))
+        print(Fore.RED + f"⚠️  Failed to copy {src_file}: {error}" + Style.RESET_ALL)
+
+    try:
+        stats = copy_files(jobs, workers, on_done=on_done, on_error=on_error, copy=copy)
+    finally:
+        # Save whatever finished, so an interrupted sync resumes where it stopped
+        if manifest is not None:
+            manifest.save()
+
+    print(f"\n{Fore.GREEN}Done. Copied {stats.files} video files to {dst_dir}.{Style.RESET_ALL}")
+    print(f"{Fore.CYAN}Throughput: {stats.summary()}{Style.RESET_ALL}")
+    if manifest is not None:
+        print(f"{Fore.CYAN}Skipped {unchanged_files} video files unchanged since the last sync.{Style.RESET_ALL}")
+    if stats.failed:
+        print(f"{Fore.RED}Failed to copy {stats.failed} files.{Style.RESET_ALL}")
     print(f"{Fore.YELLOW}Skipped {skipped_files} non-video files.{Style.RESET_ALL}")
 
 
-def move_all_contents(dst_dir):
+def _plan_folder_moves(inventory, src_dir, dst_dev):
+    """Bottom-up pass over the known tree: (movable, file count) per folder
+
+    A folder is movable as a whole when everything in it is a video already
+    on the destination's device, so one rename replaces a move per file.
+    """
+    folders = {}
+    for root, dirs, files in inventory.walk(src_dir, topdown=False):
+        movable = True
+        count = len(files)
+        for file in files:
+            try:
+                same_device = inventory.stat(os.path.join(root, file)).st_dev == dst_dev
+            except (KeyError, OSError):
+                same_device = False
+            if not (is_video_file(file) and same_device):
+                movable = False
+        for d in dirs:
+            # Symlinked folders are never walked, so they never qualify
+            child_movable, child_count = folders.get(os.path.join(root, d), (False, 0))
+            movable = movable and child_movable
+            count += child_count
+        folders[root] = (movable, count)
+    return folders
+
+
+def _device(path):
+    """st_dev of path, or of its nearest existing parent if it doesn't exist yet"""
+    while not os.path.exists(path):
+        parent = os.path.dirname(path)
+        if parent == path:
+            break
+        path = parent
+    return os.stat(path).st_dev
+
+
+def move_all_contents(dst_dir, inventory=None, workers=COPY_WORKERS, sync=False, dry_run=False, top=None):
+    """Move every video under the root into dst_dir, keeping the folder layout
+
+    top limits the move to one folder under the root (removed once emptied);
+    the inventory then only needs to cover that folder. With sync, videos whose copy in dst_dir is unchanged since the last sync
+    are not transferred again; only the source is removed. dry_run only
+    reports what would be moved.
+    """
     src_dir = get_root_dir()
     if not os.path.exists(src_dir):
         print(Fore.RED + f"Source directory does not exist: {src_dir}" + Style.RESET_ALL)
         return
+    top = top or src_dir
+    inventory = get_inventory(top, inventory)
 
-    if not os.path.exists(dst_dir):
+    if not os.path.exists(dst_dir) and not dry_run:
         os.makedirs(dst_dir)
         print(Fore.YELLOW + f"Created destination directory: {dst_dir}" + Style.RESET_ALL)
 
+    manifest = SyncManifest(dst_dir) if sync else None
     moved_files = 0
     skipped_files = 0
+    unchanged_files = 0
+    dst_dev = _device(dst_dir)
+    folders = _plan_folder_moves(inventory, top, dst_dev)
+    # A single package (watch mode) is only moved once it has no .part files left
+    downloading = active_packages(src_dir, inventory) if top == src_dir else set()
+    cross_device = []
+
+    def record(src_file, st, dst_file):
+        if manifest is not None:
+            manifest.record(os.path.relpath(dst_file, dst_dir), st, dst_file)
 
-    for root, dirs, files in os.walk(src_dir, topdown=False):
+    for root, dirs, files in inventory.walk(top):
+        if in_packages(root, downloading):
+            dirs[:] = []
+            continue
         rel_path = os.path.relpath(root, src_dir)
         target_root = os.path.join(dst_dir, rel_path)
 
+        movable, count = folders.get(root, (False, 0))
+        if root != top and movable and count and not os.path.exists(target_root):
+            if dry_run:
+                print(Fore.MAGENTA + f"🚚 Would move folder ({count} files): {root} -> {target_root}" + Style.RESET_ALL)
+                dirs[:] = []
+                moved_files += count
+                continue
+            # Stats before the rename; the moved files leave the inventory with the folder
+            contents = [(os.path.join(walk_root, f), inventory.stat(os.path.join(walk_root, f)))
+                        for walk_root, _, walk_files in inventory.walk(root) for f in walk_files]
+            os.makedirs(os.path.dirname(target_root), exist_ok=True)
+            try:
+                with span("rename", folder=True):
+                    os.rename(root, target_root)
+            except OSError:
+                pass  # fall back to moving file by file
+            else:
+                inventory.rename(root, target_root)
+                for src_file, st in contents:
+                    record(src_file, st, os.path.join(target_root, os.path.relpath(src_file, root)))
+                dirs[:] = []
+                print(Fore.MAGENTA + f"🚚 Moved folder ({count} files): {root} -> {target_root}" + Style.RESET_ALL)
+                moved_files += count
+                continue
+
         # Only create directory if we have video files to move
         video_files = [f for f in files if is_video_file(f)]
-        if video_files:
+        if video_files and not dry_run:
             os.makedirs(target_root, exist_ok=True)
 
         for file in files:
             if is_video_file(file):
                 src_file = os.path.join(root, file)
                 dst_file = os.path.join(target_root, file)
+                st = inventory.stat(src_file)
 
-                shutil.move(src_file, dst_file)
+                if manifest is not None and manifest.unchanged(os.path.relpath(dst_file, dst_dir), st, dst_file):
+                    unchanged_files += 1
+                    if dry_run:
+                        print(Fore.CYAN + f"🗑️  Would remove source, already at target: {src_file}" + Style.RESET_ALL)
+                        continue
+                    os.remove(src_file)
+                    inventory.remove(src_file)
+                    print(Fore.CYAN + f"🗑️  Removed source, already at target: {src_file}" + Style.RESET_ALL)
+                    continue
+                if dry_run:
+                    print(Fore.MAGENTA + f"🚚 Would move: {src_file} -> {dst_file} ({_format_mb(st.st_size)})" + Style.RESET_ALL)
+                    moved_files += 1
+                    continue
+                if st.st_dev != dst_dev:
+                    cross_device.append((src_file, dst_file, st.st_size))
+                    continue
+                try:
+                    with span("rename"):
+                        os.replace(src_file, dst_file)
+                except OSError as e:
+                    if e.errno != errno.EXDEV:
+                        raise
+                    cross_device.append((src_file, dst_file, st.st_size))
+                    continue
+                inventory.rename(src_file, dst_file)
+                record(src_file, st, dst_file)
                 print(Fore.MAGENTA + f"🚚 Moved: {src_file} -> {dst_file}" + Style.RESET_ALL)
                 moved_files += 1
             else:
@@ -97,15 +269,58 @@ def move_all_contents(dst_dir):
                 if file.lower().endswith('.part'):
                     print(Fore.YELLOW + f"⏸️  Skipped .part file: {os.path.join(root, file)}" + Style.RESET_ALL)
                 else:
-                    print(Fore.GRAY + f"⏭️  Skipped non-video: {os.path.join(root, file)}" + Style.RESET_ALL)
+                    print(Fore.LIGHTBLACK_EX + f"⏭️  Skipped non-video: {os.path.join(root, file)}" + Style.RESET_ALL)
+
+    if cross_device:
+        # Different filesystem: parallel copy, verify, then unlink the source
+        def on_done(src_file, dst_file, nbytes):
+            record(src_file, inventory.stat(src_file), dst_file)
+            inventory.remove(src_file)
+            print(Fore.MAGENTA + f"🚚 Moved: {src_file} -> {dst_file}" + Style.RESET_ALL)
+
+        def on_error(src_file, dst_file, error):
+            print(Fore.RED + f"⚠️  Failed to move {src_file}: {error}" + Style.RESET_ALL)
+
+        try:
+            stats = copy_files(cross_device, workers, on_done=on_done, on_error=on_error, copy=move_file)
+        finally:
+            if manifest is not None:
+                manifest.save()
+        moved_files += stats.files
+        print(f"{Fore.CYAN}Cross-device throughput: {stats.summary()}{Style.RESET_ALL}")
+        if stats.failed:
+            print(f"{Fore.RED}Failed to move {stats.failed} files; their sources were kept.{Style.RESET_ALL}")
+
+    if dry_run:
+        print(f"\n{Fore.GREEN}Dry run: would move {moved_files} video files to {dst_dir}.{Style.RESET_ALL}")
+        if manifest is not None:
+            print(f"{Fore.CYAN}{unchanged_files} video files are already at the target unchanged.{Style.RESET_ALL}")
+        return
+    if manifest is not None:
+        manifest.save()
 
     # Only remove empty folders in source after move (but leave folders with .part files)
-    for root, dirs, remaining_files in os.walk(src_dir, topdown=False):
+    # The inventory already knows what is left, so no second walk of the source is needed
+    for root, dirs, remaining_files in inventory.walk(top, topdown=False):
         for d in dirs:
             dir_path = os.path.join(root, d)
-            if not os.listdir(dir_path):  # completely empty
-                os.rmdir(dir_path)
+            if not inventory.isdir(dir_path) or inventory.islink(dir_path):
+                continue
+            if not inventory.listdir(dir_path):  # completely empty
+                try:
+                    os.rmdir(dir_path)
+                except OSError:
+                    continue  # something appeared since the inventory was taken
+                inventory.remove(dir_path)
                 print(Fore.YELLOW + f"🧹 Removed empty folder: {dir_path}" + Style.RESET_ALL)
+    if top != src_dir and not inventory.listdir(top):
+        try:
+            os.rmdir(top)
+            print(Fore.YELLOW + f"🧹 Removed empty folder: {top}" + Style.RESET_ALL)
+        except OSError:
+            pass
 
     print(f"\n{Fore.GREEN}Done. Moved {moved_files} video files to {dst_dir}.{Style.RESET_ALL}")
-    print(f"{Fore.YELLOW}Skipped {skipped_files} non-video files (including .part files).{Style.RESET_ALL}")
\ No newline at end of file
+    if manifest is not None:
+        print(f"{Fore.CYAN}Removed {unchanged_files} sources already at the target unchanged.{Style.RESET_ALL}")
+    print(f"{Fore.YELLOW}Skipped {skipped_files} non-video files (including .part files).{Style.RESET_ALL}")
@@ -0,0 +1,104 @@
+# fingerprint.py
+import os
+import hashlib
+from profiler import profiled
+
+SAMPLE_CHUNK = 64 * 1024
+FULL_HASH_BUFFER = 8 * 1024 * 1024
+
+
+def _read_at(fd, f, length, offset):
+    if hasattr(os, "pread"):
+        return os.pread(fd, length, offset)
+    # Windows has no pread; fall back to seek + read on the same handle
+    f.seek(offset)
+    return f.read(length)
+
+
+@profiled("sample hash")
+def sample_hash(filepath, size):
+    """Hash the head, middle and tail chunks of a file (plus its size).
+
+    Files no larger than three chunks are read whole, so for them the sample
+    hash is already a full-content hash.
+    """
+    digest = hashlib.blake2b(str(size).encode(), digest_size=16)
+    with open(filepath, "rb", buffering=0) as f:
+        fd = f.fileno()
+        if size <= 3 * SAMPLE_CHUNK:
+            digest.update(_read_at(fd, f, size, 0))
+        else:
+            for offset in (0, (size - SAMPLE_CHUNK) // 2, size - SAMPLE_CHUNK):
+                digest.update(_read_at(fd, f, SAMPLE_CHUNK, offset))
+    return digest.hexdigest()
+
+
+@profiled("full hash")
+def full_hash(filepath):
+    """Streaming hash of the whole file using a single reusable buffer."""
+    digest = hashlib.blake2b(digest_size=32)
+    buffer = bytearray(FULL_HASH_BUFFER)
+    view = memoryview(buffer)
+    with open(filepath, "rb", buffering=0) as f:
+        while True:
+            n = f.readinto(buffer)
+            if not n:
+                break
+            digest.update(view[:n])
+    return digest.hexdigest()
+
+
+def _regroup(groups, key_fn):
+    """Split each group by key_fn, keeping only sub-groups that still collide."""
+    result = []
+    for group in groups:
+        by_key = {}
+        for item in group:
+            try:
+                key = key_fn(item)
+            except OSError as e:
+                print(f"⚠️  Could not read {item[0]}: {e}")
+                continue
+            by_key.setdefault(key, []).append(item)
+        result.extend(g for g in by_key.values() if len(g) > 1)
+    return result
+
+
+def _full_key(item):
+    path, size = item
+    if size <= 3 * SAMPLE_CHUNK:
+        return None  # the sample hash already covered the whole file
+    return full_hash(path)
+
+
+def find_exact_duplicates(filepaths, stat=os.stat):
+    """Group byte-identical files, reading as little as possible.
+
+    Stage 1 groups by size (no reads), stage 2 by a sampled head/middle/tail
+    hash, and only files that still collide get a full streaming hash.
+    Symlinks are skipped and hard links of one file count once (the first
+    path seen), since neither is a second copy: deleting one of them frees
+    nothing, or, for a symlink's target, deletes the real file.
+    Returns lists of paths, each sorted, largest files first.
+    """
+    by_size = {}
+    seen = set()
+    for path in filepaths:
+        try:
+            if os.path.islink(path):
+                continue
+            st = stat(path)
+        except OSError:
+            continue
+        if (st.st_dev, st.st_ino) in seen:
+            continue
+        seen.add((st.st_dev, st.st_ino))
+        if st.st_size > 0:
+            by_size.setdefault(st.st_size, []).append((path, st.st_size))
+
+    groups = [g for g in by_size.values() if len(g) > 1]
+    groups = _regroup(groups, lambda item: sample_hash(*item))
+    groups = _regroup(groups, _full_key)
+
+    groups.sort(key=lambda g: -g[0][1])
+    return [sorted(path for path, _ in group) for group in groups]
@@ -0,0 +1,236 @@
+# inventory.py
+import os
+import threading
+from profiler import profiled
+
+
+class _Dir:
+    """One directory in the inventory: child directories and files by name.
+
+    File values are the cached os.stat_result, or None until first requested,
+    so operations that only need names never pay for a stat call.
+    """
+    __slots__ = ("name", "parent", "dirs", "files", "is_link")
+
+    def __init__(self, name, parent, is_link=False):
+        self.name = name
+        self.parent = parent
+        self.dirs = {}
+        self.files = {}
+        self.is_link = is_link
+
+
+class Inventory:
+    """Single os.scandir pass over a tree, shared by every operation in a run.
+
+    The tree is held in memory and kept up to date through rename(), remove()
+    and add(), so later operations see earlier renames and deletions without
+    walking the filesystem again. walk() mirrors os.walk's (dirpath, dirnames,
+    filenames) triples, including in-place pruning of dirnames when topdown.
+    Updates and directory listings take a lock, so stages of a plan can run
+    side by side on one inventory.
+    """
+
+    def __init__(self, root):
+        self.root = root
+        self.lock = threading.RLock()
+        self._top = _Dir(root, None)
+        self._scan(self._top, root)
+
+    @profiled("walk")
+    def _scan(self, top, top_path):
+        pending = [(top, top_path)]
+        while pending:
+            node, path = pending.pop()
+            try:
+                with os.scandir(path) as it:
+                    for entry in it:
+                        try:
+                            is_dir = entry.is_dir()
+                        except OSError:
+                            is_dir = False
+                        if is_dir:
+                            is_link = entry.is_symlink()
+                            child = _Dir(entry.name, node, is_link)
+                            node.dirs[entry.name] = child
+                            # Like os.walk, list symlinked directories but don't descend
+                            if not is_link:
+                                pending.append((child, entry.path))
+                        else:
+                            node.files[entry.name] = None
+            except OSError:
+                continue
+
+    def _split(self, path):
+        try:
+            rel = os.path.relpath(path, self.root)
+        except ValueError:
+            # Different drive on Windows
+            raise KeyError(path)
+        if rel == os.curdir:
+            return []
+        parts = rel.split(os.sep)
+        if parts[0] == os.pardir:
+            raise KeyError(path)
+        return parts
+
+    def _node(self, path):
+        node = self._top
+        for part in self._split(path):
+            node = node.dirs[part]
+        return node
+
+    def _parent(self, path):
+        parts = self._split(path)
+        if not parts:
+            raise KeyError(path)
+        node = self._top
+        for part in parts[:-1]:
+            node = node.dirs[part]
+        return node, parts[-1]
+
+    def covers(self, path):
+        """True if path lies inside this inventory's root."""
+        try:
+            self._split(path)
+            return True
+        except KeyError:
+            return False
+
+    def exists(self, path):
+        try:
+            parts = self._split(path)
+        except KeyError:
+            return os.path.exists(path)
+        node = self._top
+        for part in parts[:-1]:
+            node = node.dirs.get(part)
+            if node is None:
+                return False
+        return not parts or parts[-1] in node.dirs or parts[-1] in node.files
+
+    def isdir(self, path):
+        try:
+            self._node(path)
+            return True
+        except KeyError:
+            return False
+
+    def islink(self, path):
+        """True for a symlinked directory (listed, but never descended into)."""
+        try:
+            return self._node(path).is_link
+        except KeyError:
+            return False
+
+    def listdir(self, path):
+        node = self._node(path)
+        with self.lock:
+            return list(node.dirs) + list(node.files)
+
+    def subdirs(self, path):
+        """Full paths of the directories directly inside path."""
+        return [os.path.join(path, name) for name in self._node(path).dirs]
+
+    def stat(self, path):
+        """Cached os.stat_result for a file, fetched on first use."""
+        node, name = self._parent(path)
+        st = node.files[name]
+        if st is None:
+            st = os.stat(path)
+            node.files[name] = st
+        return st
+
+    def walk(self, top=None, topdown=True):
+        top = self.root if top is None else top
+        try:
+            node = self._node(top)
+        except KeyError:
+            return
+        yield from self._walk(node, top, topdown)
+
+    def _walk(self, node, path, topdown):
+        with self.lock:
+            dirnames = list(node.dirs)
+            filenames = list(node.files)
+        if topdown:
+            yield path, dirnames, filenames
+        for name in dirnames:
+            child = node.dirs.get(name)
+            if child is not None and not child.is_link:
+                yield from self._walk(child, os.path.join(path, name), topdown)
+        if not topdown:
+            yield path, dirnames, filenames
+
+    def files(self, top=None):
+        """Every file path under top (default: the whole tree)."""
+        for dirpath, _, filenames in self.walk(top):
+            for name in filenames:
+                yield os.path.join(dirpath, name)
+
+    def rename(self, old_path, new_path):
+        """Record a rename/move already performed on disk."""
+        with self.lock:
+            self._rename(old_path, new_path)
+
+    def _rename(self, old_path, new_path):
+        try:
+            old_parent, old_name = self._parent(old_path)
+        except KeyError:
+            self.add(new_path)
+            return
+        if not self.covers(new_path):
+            self.remove(old_path)
+            return
+        self.add_dir(os.path.dirname(new_path))
+        new_parent, new_name = self._parent(new_path)
+        if old_name in old_parent.dirs:
+            node = old_parent.dirs.pop(old_name)
+            node.name = new_name
+            node.parent = new_parent
+            new_parent.dirs[new_name] = node
+        elif old_name in old_parent.files:
+            new_parent.files[new_name] = old_parent.files.pop(old_name)
+        else:
+            # Created after the scan (e.g. an encoder's temp output)
+            new_parent.files[new_name] = None
+
+    def remove(self, path):
+        """Record that a file or directory tree was deleted."""
+        with self.lock:
+            try:
+                node, name = self._parent(path)
+            except KeyError:
+                return
+            node.dirs.pop(name, None)
+            node.files.pop(name, None)
+
+    def add(self, path, stat_result=None):
+        """Record a new or replaced file, creating parent directories as needed."""
+        if not self.covers(path):
+            return
+        parts = self._split(path)
+        with self.lock:
+            node = self._top
+            for part in parts[:-1]:
+                if part not in node.dirs:
+                    node.dirs[part] = _Dir(part, node)
+                node = node.dirs[part]
+            node.files[parts[-1]] = stat_result
+
+    def add_dir(self, path):
+        if not self.covers(path):
+            return
+        with self.lock:
+            node = self._top
+            for part in self._split(path):
+                if part not in node.dirs:
+                    node.dirs[part] = _Dir(part, node)
+                node = node.dirs[part]
+
+
+def get_inventory(root, inventory=None):
+    """Reuse the run's inventory when it covers root, otherwise scan root now."""
+    if inventory is not None and inventory.isdir(root):
+        return inventory
+    return Inventory(root)
@@ -1,18 +1,36 @@
 # part_remover.py
 import os
 from utils import is_part_file
+from inventory import get_inventory
+from download_tracker import DownloadTracker
 from colorama import Fore, Style
 
-def remote_parts(root_dir):
+def remote_parts(root_dir, inventory=None):
+    """Delete .part files of abandoned downloads; parts still being written are left alone."""
+    inventory = get_inventory(root_dir, inventory)
+    tracker = DownloadTracker(root_dir, inventory)
+    states = tracker.classify()
+    # Last check before deleting anything: did any "stale" part grow in the meantime?
+    tracker.sample([path for path, state in states.items() if state == "stale"])
     removed_count = 0
-    for root, _, files in os.walk(root_dir):
+    active_count = 0
+    for root, _, files in inventory.walk(root_dir):
         part_files = [os.path.join(root, f) for f in files if is_part_file(f)]
         if len(part_files) < 1:
             continue
 
         for i, path in enumerate(part_files):
+            state = tracker.states.get(path)
+            if state is None:
+                continue  # finished or removed since the scan
+            if state == "active":
+                active_count += 1
+                print(Fore.YELLOW + f"⏳ Still downloading, kept: {path}" + Style.RESET_ALL)
+                continue
             os.remove(path)
+            inventory.remove(path)
             print(Fore.RED + f"🗑️ Deleted part: {path}" + Style.RESET_ALL)
             removed_count += 1
 
-    print(f"\n{Fore.GREEN}Done. Removed {removed_count} duplicates.{Style.RESET_ALL}")
+    tracker.save()
+    print(f"\n{Fore.GREEN}Done. Removed {removed_count} stale part files, kept {active_count} active.{Style.RESET_ALL}")
@@ -0,0 +1,160 @@
+# perceptual.py
+import os
+import subprocess
+from probe_cache import cached_probe
+from duplicate_index import match_groups
+from utils import map_on_probe_pool
+
+FRAME_COUNT = 8
+HASH_WIDTH = 9
+HASH_HEIGHT = 8
+FRAME_TIMEOUT = 30
+# Max differing bits for two frame hashes to count as the same picture
+MAX_FRAME_DISTANCE = 10
+# Fraction of the shorter video's frames that must find a match in the other
+MIN_MATCH_RATIO = 0.5
+# Flat frames (black screens, fades) hash to almost no set bits and would match everything
+MIN_DETAIL_BITS = 4
+
+
+def hamming(a, b):
+    return bin(a ^ b).count("1")
+
+
+def dhash(pixels):
+    """64-bit difference hash of a 9x8 grayscale frame: one bit per horizontal gradient."""
+    value = 0
+    for row in range(HASH_HEIGHT):
+        offset = row * HASH_WIDTH
+        for col in range(HASH_WIDTH - 1):
+            value = (value << 1) | (pixels[offset + col] > pixels[offset + col + 1])
+    return value
+
+
+def extract_frame_hash(filepath, timestamp):
+    """Decode one frame near timestamp, scaled to 9x8 gray by ffmpeg, and dHash it."""
+    cmd = ['ffmpeg', '-v', 'error', '-ss', f"{timestamp:.2f}", '-i', filepath,
+           '-frames:v', '1', '-vf', f"scale={HASH_WIDTH}:{HASH_HEIGHT},format=gray",
+           '-f', 'rawvideo', '-']
+    result = subprocess.run(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE, timeout=FRAME_TIMEOUT)
+    if result.returncode != 0 or len(result.stdout) < HASH_WIDTH * HASH_HEIGHT:
+        return None
+    return dhash(result.stdout[:HASH_WIDTH * HASH_HEIGHT])
+
+
+def compute_fingerprint(filepath, duration):
+    """dHashes of FRAME_COUNT frames spread evenly through the video, skipping the ends."""
+    hashes = []
+    for i in range(FRAME_COUNT):
+        frame_hash = extract_frame_hash(filepath, duration * (i + 1) / (FRAME_COUNT + 1))
+        if frame_hash is not None and MIN_DETAIL_BITS <= hamming(frame_hash, 0) <= 64 - MIN_DETAIL_BITS:
+            hashes.append(frame_hash)
+    if not hashes:
+        return {"error": "no usable frames decoded"}
+    # JSON can't hold 64-bit ints portably in every reader; store as hex
+    return {"hashes": [f"{h:016x}" for h in hashes]}
+
+
+def get_fingerprint(filepath, duration, stat_result=None):
+    """Frame hashes for a video, stored in the probe cache next to its ffprobe data."""
+    try:
+        duration = float(duration)
+        data = cached_probe(filepath, lambda path: compute_fingerprint(path, duration),
+                            stat_result, table="fingerprints")
+    except (TypeError, ValueError, OSError, subprocess.TimeoutExpired):
+        return []
+    return [int(h, 16) for h in data.get("hashes", [])]
+
+
+def get_fingerprints(video_files, video_infos, inventory=None):
+    """Fingerprint many videos on the shared subprocess pool, in input order."""
+    def fingerprint(item):
+        path, info = item
+        stat_result = None
+        if inventory is not None:
+            try:
+                stat_result = inventory.stat(path)
+            except (KeyError, OSError):
+                pass
+        return get_fingerprint(path, info.get("Duration"), stat_result)
+
+    return list(map_on_probe_pool(fingerprint, zip(video_files, video_infos)))
+
+
+class BKTree:
+    """Burkhard-Keller tree over 64-bit hashes with Hamming distance.
+
+    Radius searches only descend into children whose edge distance is within
+    the radius of the query's distance to the node, so lookups touch a small
+    part of the tree instead of every stored hash.
+    """
+
+    def __init__(self):
+        self.root = None
+
+    def add(self, value, item):
+        if self.root is None:
+            self.root = (value, [item], {})
+            return
+        node = self.root
+        while True:
+            node_value, items, children = node
+            distance = hamming(value, node_value)
+            if distance == 0:
+                items.append(item)
+                return
+            child = children.get(distance)
+            if child is None:
+                children[distance] = (value, [item], {})
+                return
+            node = child
+
+    def search(self, value, radius):
+        """Yield (distance, item) for every stored hash within radius of value."""
+        if self.root is None:
+            return
+        pending = [self.root]
+        while pending:
+            node_value, items, children = pending.pop()
+            distance = hamming(value, node_value)
+            if distance <= radius:
+                for item in items:
+                    yield distance, item
+            for edge, child in children.items():
+                if distance - radius <= edge <= distance + radius:
+                    pending.append(child)
+
+
+def find_near_duplicate_groups(video_files, fingerprints, cross_folder_only=True,
+                               max_distance=MAX_FRAME_DISTANCE, min_match_ratio=MIN_MATCH_RATIO):
+    """Group videos whose frames look alike, even after re-encoding or trimming.
+
+    Every frame hash goes into one BK-tree; each video then looks up its own
+    frames, and a pair is a match when enough of the shorter fingerprint's
+    frames have a neighbour in the other video. Returns lists of paths.
+    """
+    tree = BKTree()
+    for index, hashes in enumerate(fingerprints):
+        for frame_hash in hashes:
+            tree.add(frame_hash, index)
+
+    pairs = []
+    for index, hashes in enumerate(fingerprints):
+        matched_frames = {}
+        for frame_hash in hashes:
+            for other in {item for _, item in tree.search(frame_hash, max_distance)}:
+                if other > index:
+                    matched_frames[other] = matched_frames.get(other, 0) + 1
+        for other, count in matched_frames.items():
+            shorter = min(len(hashes), len(fingerprints[other]))
+            if count >= max(1, shorter * min_match_ratio):
+                pairs.append((index, other))
+
+    groups = []
+    for items in match_groups(len(video_files), pairs):
+        paths = [video_files[i] for i in items]
+        if cross_folder_only and len({os.path.dirname(p) for p in paths}) < 2:
+            continue
+        groups.append(paths)
+    groups.sort(key=lambda paths: (-len(paths), paths[0]))
+    return groups
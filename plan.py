@@ -0,0 +1,128 @@
+# plan.py
+import os
+import sys
+import time
+from contextlib import redirect_stdout
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from colorama import Fore, Style
+import probe_cache
+from profiler import span
+from utils import is_video_file, get_video_infos
+from sanitizer import rename_recursively
+from analyzer import run_analysis, count_files
+from deduplicator import remove_duplicates
+from download_tracker import active_packages, in_packages
+from part_remover import remote_parts
+from codec_processor import perform
+
+
+class Stage:
+    """One step of a plan: what it needs before it can run and what it leaves behind."""
+
+    def __init__(self, name, run, needs=(), produces=()):
+        self.name = name
+        self.run = run
+        self.needs = frozenset(needs)
+        self.produces = frozenset(produces)
+
+
+def check_plan(stages, facts=()):
+    """Raise ValueError if some stage needs a fact nothing in the plan produces."""
+    available = set(facts)
+    for stage in stages:
+        available |= stage.produces
+    for stage in stages:
+        missing = stage.needs - available
+        if missing:
+            raise ValueError(f"stage '{stage.name}' needs {', '.join(sorted(missing))}, which no stage produces")
+
+
+def run_plan(stages, facts=(), workers=2):
+    """Run stages as soon as their needs are met, independent ones side by side.
+
+    A stage becomes ready when every fact it needs has been produced by a
+    finished stage (or was given in `facts`). Ready stages run on a small
+    pool; the first failure stops anything new from starting and is re-raised
+    once the running stages finish.
+    """
+    check_plan(stages, facts)
+    available = set(facts)
+    pending = list(stages)
+    running = {}
+    with ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix="stage") as executor:
+        while pending or running:
+            for stage in [s for s in pending if s.needs <= available]:
+                pending.remove(stage)
+                print(Fore.CYAN + f"\n▶ {stage.name}" + Style.RESET_ALL)
+                running[executor.submit(_timed, stage)] = stage
+            if not running:
+                raise ValueError(f"stages {', '.join(s.name for s in pending)} wait on each other")
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                stage = running.pop(future)
+                seconds = future.result()  # re-raises; the with-block waits for the rest
+                print(Fore.CYAN + f"✔ {stage.name} ({seconds:.1f}s)" + Style.RESET_ALL)
+                available |= stage.produces
+
+
+def _timed(stage):
+    started = time.monotonic()
+    with span(f"stage: {stage.name}"):
+        stage.run()
+    return time.monotonic() - started
+
+
+def probe_all(root_dir, inventory):
+    """Probe every video under root once, filling the shared in-memory results.
+
+    Packages still downloading are left out, as every later stage skips them too.
+    """
+    downloading = active_packages(root_dir, inventory, announce=False)
+    videos = [path for path in inventory.files(root_dir)
+              if is_video_file(os.path.basename(path)) and not in_packages(path, downloading)]
+    infos = get_video_infos(videos, inventory)
+    failed = sum(1 for info in infos if "error" in info)
+    print(f"Probed {len(videos)} videos ({failed} unreadable).")
+
+
+def all_stages(root_dir, inventory, perceptual=False, encode_jobs=None, resume=False, prediction=None,
+               report_format="table", report_output=None, deadline=None):
+    """The -all pipeline as a plan.
+
+    Names are fixed first, so every later stage sees final paths. Part
+    removal then runs alongside the one probing pass; analysis and
+    deduplication read those probes from memory, and the codec stages only
+    look at what deduplication left behind. Duplicates can't be removed
+    before the probe: which copy goes is decided from the probes of all of
+    them, so the losing copies are probed either way (once, shared in memory),
+    and only the codec stages, the expensive part, skip them.
+    """
+    prediction = prediction or {}
+    return [
+        Stage("sanitize", lambda: rename_recursively(root_dir, inventory), produces={"names"}),
+        Stage("remove parts", lambda: remote_parts(root_dir, inventory), needs={"names"}, produces={"no parts"}),
+        Stage("probe", lambda: probe_all(root_dir, inventory), needs={"names"}, produces={"probes"}),
+        Stage("analyze", lambda: run_analysis(root_dir, inventory, perceptual, report_format, report_output),
+              needs={"probes"}, produces={"report"}),
+        Stage("remove duplicates", lambda: remove_duplicates(root_dir, inventory),
+              needs={"probes", "report"}, produces={"deduplicated"}),
+        Stage("codec dry run", lambda: perform(dry_run=True, inventory=inventory, **prediction),
+              needs={"deduplicated"}, produces={"codec plan"}),
+        # Prompts for confirmation, so it waits until nothing else is printing
+        Stage("codec save", lambda: perform(dry_run=False, inventory=inventory, jobs=encode_jobs, resume=resume,
+                                            deadline=deadline, **prediction),
+              needs={"codec plan", "no parts"}, produces={"encoded"}),
+        Stage("count", lambda: count_files(root_dir, inventory), needs={"encoded"}),
+    ]
+
+
+def run_all(root_dir, inventory, **options):
+    """Run the -all plan with probe results shared in memory between its stages.
+
+    When a jsonl/csv report goes to stdout, everything else the stages print
+    (banners, progress, prompts) goes to stderr so the report stays parseable.
+    """
+    report_on_stdout = (options.get("report_format", "table") != "table"
+                        and options.get("report_output") in (None, "-"))
+    with probe_cache.shared_results(), redirect_stdout(sys.stderr if report_on_stdout else sys.stdout):
+        run_plan(all_stages(root_dir, inventory, **options))
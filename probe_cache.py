@@ -0,0 +1,175 @@
+# probe_cache.py
+import os
+import json
+import sqlite3
+import threading
+from contextlib import contextmanager
+
+CACHE_FILE = "probe_cache.db"
+# ffprobe output, and perceptual fingerprints (see perceptual.py), share one key scheme
+TABLES = ("probes", "fingerprints")
+
+_settings = {"enabled": True, "rebuild": False, "rebuilt": False}
+_cache = None
+_cache_lock = threading.Lock()
+# (table, file key) -> result, while shared_results() is active
+_shared = {"results": None}
+
+
+def configure(enabled=True, rebuild=False):
+    """Set cache behaviour for this run (driven by --no-cache / --rebuild-cache)."""
+    global _cache
+    if (_settings["enabled"], _settings["rebuild"]) == (enabled, rebuild):
+        return
+    _settings["enabled"] = enabled
+    _settings["rebuild"] = rebuild
+    with _cache_lock:
+        if _cache is not None:
+            _cache.close()
+            _cache = None
+
+
+def file_key(filepath, stat_result=None):
+    """Identity of a file's current contents: path, size, mtime and inode."""
+    st = stat_result if stat_result is not None else os.stat(filepath)
+    return (os.path.abspath(filepath), st.st_size, st.st_mtime_ns, st.st_ino)
+
+
+class ProbeCache:
+    """SQLite store of ffprobe output keyed by path + size + mtime + inode."""
+
+    def __init__(self, db_path=CACHE_FILE):
+        self.db_path = db_path
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(db_path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        for table in TABLES:
+            self.conn.execute(
+                f"CREATE TABLE IF NOT EXISTS {table} ("
+                " path TEXT PRIMARY KEY,"
+                " size INTEGER NOT NULL,"
+                " mtime_ns INTEGER NOT NULL,"
+                " inode INTEGER NOT NULL,"
+                " data TEXT NOT NULL)"
+            )
+        self.conn.commit()
+
+    def get(self, key, table="probes"):
+        path, size, mtime_ns, inode = key
+        with self.lock:
+            row = self.conn.execute(
+                f"SELECT size, mtime_ns, inode, data FROM {table} WHERE path = ?", (path,)
+            ).fetchone()
+        if row is None or tuple(row[:3]) != (size, mtime_ns, inode):
+            return None
+        return json.loads(row[3])
+
+    def put(self, key, data, table="probes"):
+        path, size, mtime_ns, inode = key
+        with self.lock:
+            self.conn.execute(
+                f"INSERT OR REPLACE INTO {table} (path, size, mtime_ns, inode, data) VALUES (?, ?, ?, ?, ?)",
+                (path, size, mtime_ns, inode, json.dumps(data)),
+            )
+            self.conn.commit()
+
+    def clear(self):
+        with self.lock:
+            for table in TABLES:
+                self.conn.execute(f"DELETE FROM {table}")
+            self.conn.commit()
+
+    def prune(self, root=None, exists=os.path.exists):
+        """Drop entries whose files no longer exist (optionally only under root).
+
+        Pass an Inventory's exists() to check against the in-memory tree
+        instead of stat-ing every cached path.
+        """
+        removed = 0
+        with self.lock:
+            for table in TABLES:
+                if root is None:
+                    rows = self.conn.execute(f"SELECT path FROM {table}").fetchall()
+                else:
+                    prefix = os.path.join(os.path.abspath(root), "")
+                    rows = self.conn.execute(
+                        f"SELECT path FROM {table} WHERE substr(path, 1, ?) = ?", (len(prefix), prefix)
+                    ).fetchall()
+                vanished = [(path,) for (path,) in rows if not exists(path)]
+                if vanished:
+                    self.conn.executemany(f"DELETE FROM {table} WHERE path = ?", vanished)
+                    self.conn.commit()
+                removed += len(vanished)
+        return removed
+
+    def close(self):
+        with self.lock:
+            self.conn.close()
+
+
+def get_cache():
+    """Return the shared cache for this run, or None when caching is disabled."""
+    global _cache
+    if not _settings["enabled"]:
+        return None
+    with _cache_lock:
+        if _cache is None:
+            _cache = ProbeCache()
+            # Rebuild once per process, not on every pass of the interactive loop
+            if _settings["rebuild"] and not _settings["rebuilt"]:
+                _cache.clear()
+                _settings["rebuilt"] = True
+        return _cache
+
+
+@contextmanager
+def shared_results():
+    """Keep every probe result made inside the block in memory.
+
+    Later stages of the same plan then get a file's result straight from
+    memory instead of from SQLite or another ffprobe run; with --no-cache
+    each file is still probed only once.
+    """
+    outer = _shared["results"]
+    if outer is None:
+        _shared["results"] = {}
+    try:
+        yield
+    finally:
+        if outer is None:
+            _shared["results"] = None
+
+
+def cached_probe(filepath, probe, stat_result=None, table="probes"):
+    """Return probe(filepath), reusing the stored result while the file is unchanged.
+
+    `probe` runs ffprobe and returns its parsed JSON, or a dict with an "error"
+    key for files ffprobe rejects. Errors are cached too so broken files are not
+    re-probed every run; exceptions (missing ffprobe, timeouts) are not cached.
+    """
+    cache = get_cache()
+    memory = _shared["results"]
+    if cache is None and memory is None:
+        return probe(filepath)
+    try:
+        key = file_key(filepath, stat_result)
+    except OSError:
+        return probe(filepath)
+    if memory is not None and (table, key) in memory:
+        return memory[(table, key)]
+    data = cache.get(key, table) if cache is not None else None
+    if data is None:
+        data = probe(filepath)
+        if cache is not None:
+            cache.put(key, data, table)
+    if memory is not None:
+        memory[(table, key)] = data
+    return data
+
+
+def prune(root=None, exists=os.path.exists):
+    cache = get_cache()
+    if cache is None:
+        return 0
+    return cache.prune(root, exists)
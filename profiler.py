@@ -0,0 +1,134 @@
+# profiler.py
+import os
+import json
+import time
+import threading
+import functools
+from contextlib import contextmanager
+from colorama import Fore, Style
+
+# Histogram bucket upper bounds in milliseconds; one more bucket holds anything slower
+BUCKETS_MS = (1, 4, 16, 64, 256, 1024, 4096)
+# Spans kept for the trace file; past this only the summary statistics keep counting
+MAX_TRACE_EVENTS = 500000
+
+_state = {"enabled": False, "origin": time.perf_counter(), "dropped": 0}
+_lock = threading.Lock()
+_stats = {}
+_counters = {}
+_events = []
+_threads = {}
+
+
+def enable(enabled=True):
+    """Turn instrumentation on for this process (driven by --profile)."""
+    _state["enabled"] = enabled
+
+
+def enabled():
+    return _state["enabled"]
+
+
+def reset():
+    with _lock:
+        _stats.clear()
+        _counters.clear()
+        _events.clear()
+        _state["dropped"] = 0
+        _state["origin"] = time.perf_counter()
+
+
+def _record(name, start, seconds, args):
+    thread = threading.current_thread()
+    bucket = len(BUCKETS_MS)
+    for i, bound in enumerate(BUCKETS_MS):
+        if seconds * 1000 <= bound:
+            bucket = i
+            break
+    with _lock:
+        stat = _stats.get(name)
+        if stat is None:
+            stat = _stats[name] = {"count": 0, "total": 0.0, "max": 0.0, "buckets": [0] * (len(BUCKETS_MS) + 1)}
+        stat["count"] += 1
+        stat["total"] += seconds
+        stat["max"] = max(stat["max"], seconds)
+        stat["buckets"][bucket] += 1
+        if len(_events) >= MAX_TRACE_EVENTS:
+            _state["dropped"] += 1
+            return
+        _threads[thread.ident] = thread.name
+        event = {"name": name, "ph": "X", "ts": round((start - _state["origin"]) * 1e6, 1),
+                 "dur": round(seconds * 1e6, 1), "pid": os.getpid(), "tid": thread.ident}
+        if args:
+            event["args"] = {key: str(value) for key, value in args.items()}
+        _events.append(event)
+
+
+@contextmanager
+def span(name, **args):
+    """Time the block as one call of `name`; free apart from the check when profiling is off."""
+    if not _state["enabled"]:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        _record(name, start, time.perf_counter() - start, args)
+
+
+def profiled(name):
+    """Decorator form of span() for hot functions."""
+    def decorate(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            if not _state["enabled"]:
+                return fn(*args, **kwargs)
+            start = time.perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                _record(name, start, time.perf_counter() - start, None)
+        return wrapper
+    return decorate
+
+
+def count(name, value=1):
+    """Add to a plain counter (bytes copied, files renamed, ...)."""
+    if not _state["enabled"]:
+        return
+    with _lock:
+        _counters[name] = _counters.get(name, 0) + value
+
+
+def print_summary():
+    """Print calls, time and a latency histogram per instrumented name, slowest total first."""
+    with _lock:
+        stats = sorted(_stats.items(), key=lambda item: item[1]["total"], reverse=True)
+        counters = sorted(_counters.items())
+    if not stats and not counters:
+        return
+    labels = [f"≤{b}ms" if b < 1000 else f"≤{b // 1000}s" for b in BUCKETS_MS] + [f">{BUCKETS_MS[-1] // 1000}s"]
+    print(Fore.CYAN + "\n⏱️  Profile" + Style.RESET_ALL)
+    print(f"{'name':<28} {'calls':>7} {'total s':>9} {'mean ms':>9} {'max ms':>9}  "
+          + " ".join(f"{label:>6}" for label in labels))
+    for name, stat in stats:
+        mean = stat["total"] / stat["count"] * 1000
+        print(f"{name:<28} {stat['count']:>7} {stat['total']:>9.3f} {mean:>9.2f} {stat['max'] * 1000:>9.1f}  "
+              + " ".join(f"{n or '':>6}" for n in stat["buckets"]))
+    for name, value in counters:
+        print(f"{name:<28} {value:>7}")
+    if _state["dropped"]:
+        print(Fore.YELLOW + f"{_state['dropped']} spans left out of the trace (limit {MAX_TRACE_EVENTS})"
+              + Style.RESET_ALL)
+
+
+def write_trace(path):
+    """Write the recorded spans as Chrome trace-event JSON (chrome://tracing, Perfetto, speedscope)."""
+    with _lock:
+        metadata = [{"name": "thread_name", "ph": "M", "pid": os.getpid(), "tid": tid, "args": {"name": name}}
+                    for tid, name in _threads.items()]
+        events = metadata + list(_events)
+    with open(path, "w") as f:
+        json.dump({"traceEvents": events, "displayTimeUnit": "ms"}, f)
+    print(f"Trace written to {path} ({len(events) - len(metadata)} spans)")
@@ -0,0 +1,77 @@
+# report_writer.py
+import csv
+import sys
+import json
+
+REPORT_FORMATS = ("jsonl", "csv")
+# Records are handed to the OS in chunks of this size rather than line by line
+WRITE_BUFFER = 1024 * 1024
+
+# Info dict label -> record key
+INFO_KEYS = {
+    "Frame Rate": "frame_rate",
+    "Width": "width",
+    "Height": "height",
+    "Bitrate": "bitrate",
+    "Duration": "duration",
+    "Size (MB)": "size_mb",
+}
+CSV_COLUMNS = ["record", "path", "folder", "group", "kind", "best", "quality_score"] + list(INFO_KEYS.values()) \
+    + ["videos", "parts", "downloading", "error"]
+
+
+class ReportWriter:
+    """Stream analysis records as JSON lines or CSV rows.
+
+    Nothing is colourised or aligned: each record is formatted once and goes
+    straight into a large write buffer. A duplicate group is one JSON line,
+    or one CSV row per member sharing a group number; the summary record is
+    JSONL-only since it has no per-file columns.
+    """
+
+    def __init__(self, fmt, output=None):
+        if fmt not in REPORT_FORMATS:
+            raise ValueError(f"unknown report format '{fmt}' (expected one of {', '.join(REPORT_FORMATS)})")
+        self.format = fmt
+        if output in (None, "-"):
+            # The process's real stdout, even while progress messages are redirected to stderr
+            sys.__stdout__.flush()
+            self.stream = open(sys.__stdout__.fileno(), "w", buffering=WRITE_BUFFER, encoding="utf-8",
+                               newline="", closefd=False)
+        else:
+            self.stream = open(output, "w", buffering=WRITE_BUFFER, encoding="utf-8", newline="")
+        self.csv = None
+        if fmt == "csv":
+            # Unknown keys raise rather than vanish: a new record field needs a column here
+            self.csv = csv.DictWriter(self.stream, CSV_COLUMNS)
+            self.csv.writeheader()
+
+    def write(self, record):
+        if self.csv is None:
+            self.stream.write(json.dumps(record, separators=(",", ":")) + "\n")
+        elif record["record"] == "duplicate_group":
+            row = {key: value for key, value in record.items() if key != "files"}
+            for path in record["files"]:
+                self.csv.writerow(dict(row, path=path))
+        elif record["record"] != "summary":
+            self.csv.writerow(record)
+
+    def close(self):
+        self.stream.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def file_record(path, folder, info, best=False, quality_score=None):
+    record = {"record": "file", "path": path, "folder": folder, "best": best}
+    if "error" in info:
+        record["error"] = info["error"]
+        return record
+    record["quality_score"] = quality_score
+    for label, key in INFO_KEYS.items():
+        record[key] = info.get(label)
+    return record
@@ -1,34 +1,21 @@
 # sanitizer.py
 import os
 import re
+import json
+from inventory import get_inventory
+from profiler import span
+from sniffer import sniff_file, sniff_files
 
 HASHTAG_PATTERN = re.compile(r'\s*#\S+')
-VIDEO_EXTENSIONS = {".mp4", ".mkv", ".avi", ".mov", ".webm", ".flv"}
+VIDEO_EXTENSIONS = {".mp4", ".mkv", ".avi", ".mov", ".webm", ".flv", ".ts", ".m2ts"}
 WHITELIST_PATTERN = re.compile(r'[^A-Za-z0-9 _\-\(\)\.]+')
+# Renames of the last sanitize run, one JSON object per line, for undo_renames()
+JOURNAL_FILE = "rename_journal.jsonl"
 
 
 def detect_video_type(filepath):
-    """Detect if a file is MP4 or MKV by reading its magic bytes."""
-    try:
-        with open(filepath, 'rb') as f:
-            header = f.read(12)
-
-            # MP4 signature: starts with ftyp at bytes 4-8
-            if len(header) >= 12 and header[4:8] == b'ftyp':
-                return '.mp4'
-
-            # MKV signature: starts with EBML header (0x1A45DFA3)
-            if len(header) >= 4 and header[0:4] == b'\x1A\x45\xDF\xA3':
-                return '.mkv'
-
-            # AVI signature: starts with RIFF
-            if len(header) >= 4 and header[0:4] == b'RIFF':
-                return '.avi'
-
-    except Exception as e:
-        print(f"⚠️  Could not detect file type for {filepath}: {e}")
-
-    return None
+    """Detect a file's container (MP4, MOV, MKV, WebM, AVI, FLV, TS) from its first bytes."""
+    return sniff_file(filepath)
 
 
 def sanitize_name(filename):
@@ -50,46 +37,164 @@ def sanitize_name(filename):
     return name.strip() + ext
 
 
-def rename_recursively(root_dir):
-    """Recursively rename files and directories with sanitized names."""
-    for dirpath, dirnames, filenames in os.walk(root_dir, topdown=False):
-        # Rename directories
-        for dirname in dirnames:
-            old_path = os.path.join(dirpath, dirname)
-            new_name = sanitize_name(dirname)
-            new_path = os.path.join(dirpath, new_name)
-
-            if new_name and new_name != dirname and not os.path.exists(new_path):
-                try:
-                    os.rename(old_path, new_path)
-                    print(f"✅ Renamed folder: {old_path} → {new_path}")
-                except Exception as e:
-                    print(f"❌ Error renaming folder {old_path}: {e}")
-
-        # Rename files
-        for filename in filenames:
-            old_path = os.path.join(dirpath, filename)
-
-            # Sanitize the full filename (with extension)
-            new_filename = sanitize_name(filename)
-
-            # Check if file is missing extension
-            name, ext = os.path.splitext(new_filename)
-            if not ext:
-                # Try to detect the video type
-                detected_ext = detect_video_type(old_path)
-                if detected_ext:
-                    new_filename = name + detected_ext
-                    print(f"🔍 Detected {detected_ext} for: {filename}")
-                else:
-                    print(f"⚠️  No extension detected for: {filename} - skipping")
-                    continue
-
-            new_path = os.path.join(dirpath, new_filename)
-
-            if new_filename and new_filename != filename and not os.path.exists(new_path):
-                try:
+def _target_name(filepath, name, is_dir, sniffed):
+    """Sanitized name for one entry, or None to leave it as is."""
+    new_name = sanitize_name(name)
+    if not is_dir:
+        # Check if file is missing extension
+        base, ext = os.path.splitext(new_name)
+        if not ext:
+            # Try to detect the video type
+            detected_ext = sniffed.get(filepath)
+            if not detected_ext:
+                print(f"⚠️  No extension detected for: {name} - skipping")
+                return None
+            new_name = base + detected_ext
+            print(f"🔍 Detected {detected_ext} for: {name}")
+    if not new_name or new_name == name:
+        return None
+    return new_name
+
+
+def _with_suffix(name, n, is_dir):
+    base, ext = (name, "") if is_dir else os.path.splitext(name)
+    return f"{base} ({n}){ext}"
+
+
+def plan_renames(root_dir, inventory=None):
+    """Work out every rename under root_dir from the directory listings alone.
+
+    Returns (old_path, new_path, is_dir, suffixed) tuples, deepest directories
+    first so each old_path is still valid when its turn comes. Within a
+    directory, a sanitized name that would land on a name already there (or
+    on another entry's new name, ignoring case) gets " (2)", " (3)", ...
+    added, assigned in sorted order so the same tree always gives the same plan.
+    """
+    inventory = get_inventory(root_dir, inventory)
+    listings = list(inventory.walk(root_dir, topdown=False))
+    # Files that would end up without an extension are sniffed all at once, in parallel
+    unnamed = [os.path.join(dirpath, name) for dirpath, _, filenames in listings for name in filenames
+               if not os.path.splitext(sanitize_name(name))[1]]
+    sniffed = sniff_files(unnamed)
+    plan = []
+    for dirpath, dirnames, filenames in listings:
+        entries = [(name, True) for name in dirnames] + [(name, False) for name in filenames]
+        targets = {}
+        for name, is_dir in entries:
+            new_name = _target_name(os.path.join(dirpath, name), name, is_dir, sniffed)
+            if new_name:
+                targets[name] = (new_name, is_dir)
+        plan.extend(_assign_names(dirpath, [name for name, _ in entries], targets))
+    return plan
+
+
+def _assign_names(dirpath, names, targets):
+    """Plan the renames in one directory, suffixing new names that collide with taken ones."""
+    # Every current name stays claimed, so no rename ever depends on another one happening first
+    claimed = {}
+    for name in names:
+        claimed.setdefault(name.casefold(), name)
+    plan = []
+    for name in sorted(targets):
+        new_name, is_dir = targets[name]
+        candidate, n = new_name, 2
+        while claimed.get(candidate.casefold(), name) != name:
+            candidate = _with_suffix(new_name, n, is_dir)
+            n += 1
+        claimed[candidate.casefold()] = name
+        plan.append((os.path.join(dirpath, name), os.path.join(dirpath, candidate), is_dir, candidate != new_name))
+    return plan
+
+
+def plan_package_renames(package, inventory=None):
+    """Plan the renames for one package folder: everything inside it, then the folder itself.
+
+    The folder's new name is checked against its siblings in the parent
+    directory, which the package's inventory doesn't cover, so it gets the
+    same " (2)", " (3)", ... suffix as any other name that is already taken.
+    """
+    inventory = get_inventory(package, inventory)
+    plan = plan_renames(package, inventory)
+    parent, name = os.path.split(package)
+    new_name = _target_name(package, name, True, {})
+    if new_name:
+        plan.extend(_assign_names(parent, os.listdir(parent), {name: (new_name, True)}))
+    return plan
+
+
+def print_plan(plan):
+    for old_path, new_path, is_dir, suffixed in plan:
+        kind = "folder" if is_dir else "file"
+        note = " (name taken, suffixed)" if suffixed else ""
+        print(f"📝 Would rename {kind}: {old_path} → {new_path}{note}")
+    print(f"{len(plan)} renames planned.")
+
+
+def apply_plan(plan, inventory, journal_path=JOURNAL_FILE):
+    """Carry out a rename plan, journaling each rename so undo_renames() can revert the batch."""
+    renamed = 0
+    with open(journal_path, "w", encoding="utf-8") as journal:
+        for old_path, new_path, is_dir, suffixed in plan:
+            kind = "folder" if is_dir else "file"
+            try:
+                with span("rename"):
                     os.rename(old_path, new_path)
-                    print(f"✅ Renamed file: {old_path} → {new_path}")
-                except Exception as e:
-                    print(f"❌ Error renaming file {old_path}: {e}")
+            except OSError as e:
+                print(f"❌ Error renaming {kind} {old_path}: {e}")
+                continue
+            inventory.rename(old_path, new_path)
+            journal.write(json.dumps({"old": old_path, "new": new_path}) + "\n")
+            journal.flush()
+            renamed += 1
+            note = " (name taken, suffixed)" if suffixed else ""
+            print(f"✅ Renamed {kind}: {old_path} → {new_path}{note}")
+        os.fsync(journal.fileno())
+    return renamed
+
+
+def rename_recursively(root_dir, inventory=None, dry_run=False):
+    """Recursively rename files and directories with sanitized names.
+
+    The whole plan is computed before anything is renamed; with dry_run it
+    is only printed.
+    """
+    inventory = get_inventory(root_dir, inventory)
+    plan = plan_renames(root_dir, inventory)
+    if dry_run:
+        print_plan(plan)
+        return 0
+    if not plan:
+        return 0
+    return apply_plan(plan, inventory)
+
+
+def undo_renames(inventory=None, journal_path=JOURNAL_FILE):
+    """Revert the last sanitize run, newest rename first, from its journal."""
+    if not os.path.exists(journal_path):
+        print("Nothing to undo.")
+        return 0
+    steps = []
+    with open(journal_path, encoding="utf-8") as f:
+        for line in f:
+            try:
+                steps.append(json.loads(line))
+            except ValueError:
+                break  # torn final write; the renames before it are intact
+    reverted = 0
+    for step in reversed(steps):
+        old_path, new_path = step["old"], step["new"]
+        if os.path.lexists(old_path) or not os.path.lexists(new_path):
+            print(f"⚠️  Skipping {new_path}: changed since it was renamed")
+            continue
+        try:
+            os.rename(new_path, old_path)
+        except OSError as e:
+            print(f"❌ Error restoring {old_path}: {e}")
+            continue
+        if inventory is not None:
+            inventory.rename(new_path, old_path)
+        reverted += 1
+        print(f"↩️  Restored: {new_path} → {old_path}")
+    os.remove(journal_path)
+    print(f"Reverted {reverted} of {len(steps)} renames.")
+    return reverted
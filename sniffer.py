@@ -0,0 +1,101 @@
+# sniffer.py
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+# One read covers every signature below: ftyp and brand, the EBML header with
+# its DocType, and ten MPEG-TS packets
+SNIFF_BYTES = 2048
+SNIFF_WORKERS = 8
+
+EBML_MAGIC = b'\x1A\x45\xDF\xA3'
+EBML_DOC_TYPE = 0x4282
+DOC_TYPES = {b'webm': '.webm', b'matroska': '.mkv'}
+# Top-level atoms an old QuickTime file may start with instead of ftyp
+QUICKTIME_ATOMS = {b'moov', b'mdat', b'wide', b'free', b'skip', b'pnot'}
+TS_SYNC = 0x47
+TS_PACKET = 188
+# Blu-ray M2TS: every packet has a 4-byte timestamp prefix
+M2TS_PACKET = 192
+TS_MIN_PACKETS = 3
+
+
+def _doc_type(header):
+    """The DocType from an EBML header ("webm", "matroska"), or None."""
+    # container_probe imports this module at load time, so its EBML reader is fetched here
+    from container_probe import HeaderError, _vint
+    try:
+        size, pos = _vint(header, len(EBML_MAGIC))
+        end = len(header) if size is None else min(pos + size, len(header))
+        while pos < end:
+            element_id, pos = _vint(header, pos, keep_marker=True)
+            size, pos = _vint(header, pos)
+            if element_id == EBML_DOC_TYPE:
+                return bytes(header[pos:pos + size]).rstrip(b'\0') if size is not None else None
+            if size is None:
+                break
+            pos += size
+    except (HeaderError, IndexError):
+        pass
+    return None
+
+
+def _packet_cadence(header, packet, offset):
+    """True if a sync byte starts every packet in the block (and the block holds several)."""
+    count = (len(header) - offset) // packet
+    return count >= TS_MIN_PACKETS and all(header[offset + i * packet] == TS_SYNC for i in range(count))
+
+
+def sniff_header(header):
+    """Container extension for a file's first bytes, or None if unrecognised.
+
+    Pass at least SNIFF_BYTES bytes (or the whole file if smaller): WebM is
+    told from Matroska by the EBML DocType and MPEG-TS by its sync bytes
+    repeating every packet, both of which need more than the magic number.
+    Every extension returned must be in utils.VIDEO_EXTENSIONS, or a file
+    renamed to it drops out of analyze, dedupe and codec.
+    """
+    if len(header) >= 12 and header[4:8] == b'ftyp':
+        # QuickTime declares itself with the 'qt  ' major brand; everything else is ISO MP4
+        return '.mov' if header[8:12] == b'qt  ' else '.mp4'
+    if header[:4] == EBML_MAGIC:
+        return DOC_TYPES.get(_doc_type(header), '.mkv')
+    if len(header) >= 12 and header[:4] == b'RIFF' and header[8:12] == b'AVI ':
+        return '.avi'
+    if len(header) >= 9 and header[:3] == b'FLV' and header[3] == 1:
+        return '.flv'
+    if _packet_cadence(header, TS_PACKET, 0):
+        return '.ts'
+    if _packet_cadence(header, M2TS_PACKET, 4):
+        return '.m2ts'
+    if len(header) >= 8 and header[4:8] in QUICKTIME_ATOMS:
+        return '.mov'
+    return None
+
+
+def read_header(fd, size=SNIFF_BYTES):
+    if hasattr(os, "pread"):
+        return os.pread(fd, size, 0)
+    os.lseek(fd, 0, os.SEEK_SET)
+    return os.read(fd, size)
+
+
+def sniff_file(filepath):
+    """Detect a file's container from one small read at its start."""
+    try:
+        fd = os.open(filepath, os.O_RDONLY | getattr(os, "O_BINARY", 0))
+        try:
+            return sniff_header(read_header(fd))
+        finally:
+            os.close(fd)
+    except OSError as e:
+        print(f"⚠️  Could not detect file type for {filepath}: {e}")
+    return None
+
+
+def sniff_files(filepaths, workers=SNIFF_WORKERS):
+    """Sniff many files, overlapping their reads on a thread pool; returns path -> extension or None."""
+    filepaths = list(filepaths)
+    if workers <= 1 or len(filepaths) <= 1:
+        return {path: sniff_file(path) for path in filepaths}
+    with ThreadPoolExecutor(max_workers=min(workers, len(filepaths)), thread_name_prefix="sniff") as executor:
+        return dict(zip(filepaths, executor.map(sniff_file, filepaths)))
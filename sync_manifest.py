@@ -0,0 +1,61 @@
+# sync_manifest.py
+import os
+import json
+import threading
+
+# Kept inside the target directory, so it travels with the copies it describes
+MANIFEST_FILE = ".dlvd_manifest.json"
+
+
+class SyncManifest:
+    """What earlier syncs put in a target directory, by path relative to it.
+
+    Each entry holds the source's size and mtime at copy time, the copy's own
+    mtime (filesystems like FAT round it) and, if requested, a checksum
+    computed while copying. A file is unchanged when the source still matches
+    its entry and the copy is still there with the recorded size and mtime.
+    """
+
+    def __init__(self, dst_dir):
+        self.path = os.path.join(dst_dir, MANIFEST_FILE)
+        self.lock = threading.Lock()
+        self.entries = self.load()
+
+    def load(self):
+        if not os.path.exists(self.path):
+            return {}
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}  # unreadable manifest: everything counts as changed
+
+    def unchanged(self, rel_path, src_stat, dst_path):
+        entry = self.entries.get(rel_path)
+        if entry is None or entry["size"] != src_stat.st_size or entry["mtime_ns"] != src_stat.st_mtime_ns:
+            return False
+        try:
+            dst_stat = os.stat(dst_path)
+        except OSError:
+            return False
+        return dst_stat.st_size == entry["size"] and dst_stat.st_mtime_ns == entry["dst_mtime_ns"]
+
+    def record(self, rel_path, src_stat, dst_path, checksum=None):
+        entry = {"size": src_stat.st_size, "mtime_ns": src_stat.st_mtime_ns,
+                 "dst_mtime_ns": os.stat(dst_path).st_mtime_ns}
+        if checksum is not None:
+            entry["checksum"] = checksum
+        with self.lock:
+            self.entries[rel_path] = entry
+
+    def forget(self, rel_path):
+        with self.lock:
+            self.entries.pop(rel_path, None)
+
+    def save(self):
+        """Write atomically, so an interrupted sync never leaves a half-written manifest."""
+        tmp_path = self.path + ".tmp"
+        with self.lock:
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(self.entries, f, indent=2, sort_keys=True)
+        os.replace(tmp_path, self.path)
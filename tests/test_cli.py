@@ -0,0 +1,74 @@
+# test_cli.py
+import sys
+import pytest
+import cli
+
+# Each operation flag and the function it must dispatch to
+SINGLE_FLAGS = {
+    "-anl": "run_analysis",
+    "-san": "rename_recursively",
+    "-usn": "undo_renames",
+    "-dup": "remove_duplicates",
+    "-xdp": "remove_cross_folder_duplicates",
+    "-exd": "remove_exact_duplicates",
+    "-prt": "remote_parts",
+    "-cnt": "count_files",
+    "-cdr": "perform",
+    "-cds": "perform",
+    "-mov": "move_all_contents",
+    "-copy": "copy_all_contents",
+    "-wch": "watch",
+    "-all": "run_all",
+}
+OPERATIONS = set(SINGLE_FLAGS.values())
+
+
+class Stop(Exception):
+    """Raised by the stubbed re-entry, since run_cli loops by calling itself."""
+
+
+@pytest.fixture
+def run(tmp_path, monkeypatch):
+    """Run the CLI once with argv, returning the operations it called and their kwargs."""
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(cli, "get_root_dir", lambda: str(tmp_path))
+    monkeypatch.setattr(cli, "get_target_dir", lambda: str(tmp_path / "target"))
+    called = []
+    for name in OPERATIONS:
+        monkeypatch.setattr(cli, name, lambda *args, _name=name, **kwargs: called.append((_name, kwargs)))
+    real_run_cli = cli.run_cli
+
+    def stop():
+        raise Stop
+
+    monkeypatch.setattr(cli, "run_cli", stop)
+
+    def run(*argv):
+        monkeypatch.setattr(sys, "argv", ["main.py", "--no-cache", *argv])
+        try:
+            real_run_cli()
+        except Stop:
+            pass
+        return called
+
+    return run
+
+
+@pytest.mark.parametrize("flag", sorted(SINGLE_FLAGS))
+def test_single_flag_dispatches_its_operation(run, flag):
+    assert [name for name, _ in run(flag)] == [SINGLE_FLAGS[flag]]
+
+
+def test_codec_flags_pick_dry_run(run):
+    assert run("-cdr")[0][1]["dry_run"] is True
+    assert run("-cds")[1][1]["dry_run"] is False
+
+
+@pytest.mark.parametrize("flag", ["-san", "-xdp", "-exd", "-mov", "-copy"])
+def test_dry_run_reaches_operation(run, flag):
+    assert run(flag, "--dry-run")[0][1]["dry_run"] is True
+
+
+def test_options_alone_open_the_menu(run, monkeypatch):
+    monkeypatch.setattr("builtins.input", lambda prompt: "remp")
+    assert [name for name, _ in run("--jobs", "2")] == ["remote_parts"]
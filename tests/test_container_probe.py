@@ -0,0 +1,252 @@
+# test_container_probe.py
+import struct
+import pytest
+from container_probe import probe_headers
+
+
+# --- ISO BMFF builders ---
+
+def box(box_type, *children):
+    body = b"".join(children)
+    return struct.pack(">I4s", 8 + len(body), box_type) + body
+
+
+def large_box(box_type, body):
+    return struct.pack(">I4sQ", 1, box_type, 16 + len(body)) + body
+
+
+def full_box(box_type, version_flags, *children):
+    return box(box_type, struct.pack(">I", version_flags), *children)
+
+
+def ftyp(brand=b"isom"):
+    return box(b"ftyp", brand, struct.pack(">I", 512), brand, b"mp41")
+
+
+def mvhd(timescale, duration):
+    return full_box(b"mvhd", 0, struct.pack(">IIII", 0, 0, timescale, duration) + b"\0" * 80)
+
+
+def mdhd(timescale, duration, version=0):
+    if version == 1:
+        return full_box(b"mdhd", 1 << 24, struct.pack(">QQIQ", 0, 0, timescale, duration) + b"\0" * 4)
+    return full_box(b"mdhd", 0, struct.pack(">IIII", 0, 0, timescale, duration) + b"\0" * 4)
+
+
+def hdlr(handler):
+    return full_box(b"hdlr", 0, struct.pack(">I4s", 0, handler) + b"\0" * 12 + b"\0")
+
+
+def stsd(entry_type, width, height):
+    entry = b"\0" * 6 + struct.pack(">H", 1) + b"\0" * 16 + struct.pack(">HH", width, height) + b"\0" * 50
+    return full_box(b"stsd", 0, struct.pack(">I", 1), box(entry_type, entry))
+
+
+def stts(*runs):
+    return full_box(b"stts", 0, struct.pack(">I", len(runs)) + b"".join(struct.pack(">II", *run) for run in runs))
+
+
+def stsz(sizes=None, sample_size=0, sample_count=0):
+    if sizes is None:
+        return full_box(b"stsz", 0, struct.pack(">II", sample_size, sample_count))
+    return full_box(b"stsz", 0, struct.pack(">II", 0, len(sizes)) + struct.pack(f">{len(sizes)}I", *sizes))
+
+
+def trak(handler, mdhd_box, *stbl_children):
+    return box(b"trak", box(b"mdia", mdhd_box, hdlr(handler), box(b"minf", box(b"stbl", *stbl_children))))
+
+
+def video_trak(codec=b"avc1", width=1280, height=720, timescale=30000, frames=30, delta=1001,
+               sizes=None, mdhd_version=0):
+    return trak(b"vide", mdhd(timescale, frames * delta, mdhd_version), stsd(codec, width, height),
+                stts((frames, delta)), stsz(sizes if sizes is not None else [1000] * frames))
+
+
+def audio_trak():
+    return trak(b"soun", mdhd(48000, 48000), stsd(b"mp4a", 0, 0), stts((47, 1024)), stsz(sample_size=1, sample_count=47))
+
+
+# --- EBML builders ---
+
+def ebml_id(element_id):
+    return element_id.to_bytes((element_id.bit_length() + 7) // 8, "big")
+
+
+def ebml_size(size):
+    for length in range(1, 9):
+        if size < (1 << (7 * length)) - 1:
+            return ((1 << (7 * length)) | size).to_bytes(length, "big")
+    raise ValueError(size)
+
+
+UNKNOWN_SIZE = b"\x01\xff\xff\xff\xff\xff\xff\xff"
+
+
+def element(element_id, *children, size=None):
+    body = b"".join(children)
+    return ebml_id(element_id) + (ebml_size(len(body)) if size is None else size) + body
+
+
+def uint(element_id, value):
+    return element(element_id, value.to_bytes(max(1, (value.bit_length() + 7) // 8), "big"))
+
+
+def ebml_header(doc_type=b"matroska"):
+    return element(0x1A45DFA3, uint(0x4286, 1), element(0x4282, doc_type))
+
+
+def info(duration_ms=2500.0, scale=1_000_000):
+    return element(0x1549A966, uint(0x2AD7B1, scale), element(0x4489, struct.pack(">d", duration_ms)))
+
+
+def track_entry(track_type, codec_id, width=None, height=None, default_duration=None):
+    children = [uint(0x83, track_type), element(0x86, codec_id)]
+    if default_duration:
+        children.append(uint(0x23E383, default_duration))
+    if width is not None:
+        children.append(element(0xE0, uint(0xB0, width), uint(0xBA, height)))
+    return element(0xAE, *children)
+
+
+def tracks(*entries):
+    return element(0x1654AE6B, *entries)
+
+
+CLUSTER = element(0x1F43B675, uint(0xE7, 0), b"\xa3\x84" + b"\0" * 4)
+
+
+def segment(*children, unknown_size=False):
+    return element(0x18538067, *children, size=UNKNOWN_SIZE if unknown_size else None)
+
+
+@pytest.fixture
+def probe(tmp_path):
+    def write_and_probe(data, name="clip"):
+        path = tmp_path / name
+        path.write_bytes(data)
+        return probe_headers(str(path))
+    return write_and_probe
+
+
+# --- MP4 / MOV ---
+
+def test_mp4_with_moov_first(probe):
+    data = ftyp() + box(b"moov", mvhd(1000, 1001), audio_trak(), video_trak()) + box(b"mdat", b"\0" * 64)
+    info_ = probe(data)
+    stream = info_["streams"][0]
+    assert stream["codec_name"] == "h264"
+    assert (stream["width"], stream["height"]) == (1280, 720)
+    assert stream["r_frame_rate"] == "30000/1001"
+    assert stream["nb_frames"] == "30"
+    assert stream["duration"] == "1.001000"
+    assert stream["bit_rate"] == str(int(30 * 1000 * 8 / 1.001))
+    assert info_["format"]["duration"] == "1.001000"
+    assert info_["format"]["size"] == str(len(data))
+    assert info_["format"]["probe"] == "native"
+
+
+def test_mp4_with_moov_after_large_mdat(probe):
+    data = ftyp() + large_box(b"mdat", b"\0" * 4096) + box(b"moov", mvhd(600, 1200),
+                                                           video_trak(b"hvc1", 1920, 1080, 25, 50, 1))
+    stream = probe(data)["streams"][0]
+    assert stream["codec_name"] == "hevc"
+    assert stream["r_frame_rate"] == "25/1"
+    assert stream["duration"] == "2.000000"
+
+
+def test_mp4_version_1_mdhd_and_variable_sample_sizes(probe):
+    sizes = [5000] + [100] * 9
+    data = ftyp() + box(b"moov", mvhd(1000, 400), video_trak(frames=10, delta=1200, timescale=30000, sizes=sizes,
+                                                             mdhd_version=1))
+    stream = probe(data)["streams"][0]
+    assert stream["duration"] == "0.400000"
+    assert stream["r_frame_rate"] == "25/1"
+    assert stream["bit_rate"] == str(int(sum(sizes) * 8 / 0.4))
+
+
+def test_quicktime_brand_is_parsed(probe):
+    data = ftyp(b"qt  ") + box(b"moov", mvhd(600, 600), video_trak(b"mp4v", 640, 480, 600, 24, 25))
+    stream = probe(data, "clip.mov")["streams"][0]
+    assert stream["codec_name"] == "mpeg4"
+    assert stream["r_frame_rate"] == "24/1"
+
+
+def test_mp4_unknown_codec_falls_back(probe):
+    assert probe(ftyp() + box(b"moov", mvhd(1000, 1000), video_trak(b"xyz1"))) is None
+
+
+def test_mp4_without_video_track_falls_back(probe):
+    assert probe(ftyp() + box(b"moov", mvhd(1000, 1000), audio_trak())) is None
+
+
+def test_mp4_without_moov_falls_back(probe):
+    assert probe(ftyp() + box(b"mdat", b"\0" * 64)) is None
+
+
+def test_truncated_mp4_falls_back(probe):
+    data = ftyp() + box(b"moov", mvhd(1000, 1001), video_trak())
+    assert probe(data[:-40]) is None
+
+
+def test_fragmented_mp4_falls_back(probe):
+    # Fragmented files keep their samples in moof boxes: the moov track has no duration
+    data = ftyp() + box(b"moov", mvhd(1000, 0), video_trak(frames=0)) + box(b"moof", b"\0" * 16)
+    assert probe(data) is None
+
+
+# --- Matroska / WebM ---
+
+def test_mkv(probe):
+    data = ebml_header() + segment(
+        info(2500.0),
+        tracks(track_entry(2, b"A_AAC"),
+               track_entry(1, b"V_MPEGH/ISO/HEVC", 1920, 1080, default_duration=41708333)),
+        CLUSTER)
+    result = probe(data)
+    stream = result["streams"][0]
+    assert stream["codec_name"] == "hevc"
+    assert (stream["width"], stream["height"]) == (1920, 1080)
+    assert stream["r_frame_rate"] == "24000/1001"
+    assert result["format"]["duration"] == "2.500000"
+    assert result["format"]["format_name"] == "matroska,webm"
+    assert "duration" not in stream
+
+
+def test_webm_with_unknown_segment_size(probe):
+    data = ebml_header(b"webm") + segment(
+        info(1000.0, scale=1_000_000),
+        tracks(track_entry(1, b"V_VP9", 640, 360, default_duration=40_000_000)),
+        CLUSTER, unknown_size=True)
+    result = probe(data, "clip.webm")
+    assert result["streams"][0]["codec_name"] == "vp9"
+    assert result["streams"][0]["r_frame_rate"] == "25/1"
+    assert result["format"]["duration"] == "1.000000"
+
+
+def test_mkv_timestamp_scale(probe):
+    data = ebml_header() + segment(info(3000.0, scale=500_000),
+                                   tracks(track_entry(1, b"V_MPEG4/ISO/AVC", 320, 240)), CLUSTER)
+    result = probe(data)
+    assert result["format"]["duration"] == "1.500000"
+    assert "r_frame_rate" not in result["streams"][0]
+
+
+def test_mkv_tracks_after_first_cluster_fall_back(probe):
+    data = ebml_header() + segment(info(), CLUSTER, tracks(track_entry(1, b"V_VP9", 640, 360)))
+    assert probe(data) is None
+
+
+def test_mkv_unsupported_codec_falls_back(probe):
+    data = ebml_header() + segment(info(), tracks(track_entry(1, b"V_REAL/RV40", 640, 360)), CLUSTER)
+    assert probe(data) is None
+
+
+def test_truncated_mkv_falls_back(probe):
+    data = ebml_header() + segment(info(), tracks(track_entry(1, b"V_VP9", 640, 360)), CLUSTER)
+    cut = len(ebml_header()) + 40
+    assert probe(data[:cut]) is None
+
+
+def test_unrecognised_file_falls_back(probe):
+    assert probe(b"RIFF\0\0\0\0AVI LIST" + b"\0" * 64) is None
+    assert probe(b"") is None
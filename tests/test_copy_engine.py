@@ -0,0 +1,189 @@
+# test_copy_engine.py
+import os
+import errno
+import random
+import hashlib
+import threading
+import pytest
+import copy_engine
+from copy_engine import copy_file, copy_files, move_file, CopyStats
+
+SIZE = 1024 * 1024 + 123
+
+
+@pytest.fixture
+def src(tmp_path):
+    path = tmp_path / "src" / "video.mp4"
+    path.parent.mkdir()
+    path.write_bytes(random.Random(1).getrandbits(SIZE * 8).to_bytes(SIZE, "little"))
+    return path
+
+
+@pytest.fixture
+def dst(tmp_path):
+    (tmp_path / "dst").mkdir()
+    return tmp_path / "dst" / "video.mp4"
+
+
+def damaging_copy(offset):
+    """copy_file that flips one byte of the finished copy at offset, like a bad write would."""
+    real_copy = copy_engine.copy_file
+
+    def copy_file(src, dst, *args, **kwargs):
+        copied = real_copy(src, dst, *args, **kwargs)
+        with open(dst, "r+b") as f:
+            f.seek(offset)
+            byte = f.read(1)
+            f.seek(offset)
+            f.write(bytes([byte[0] ^ 0xFF]))
+        return copied
+    return copy_file
+
+
+def refuse(err):
+    def kernel_copy(*args):
+        raise OSError(err, os.strerror(err))
+    return kernel_copy
+
+
+def test_copy_file_copies_data_and_metadata(src, dst):
+    os.utime(src, (1_000_000_000, 1_000_000_000))
+    assert copy_file(str(src), str(dst), chunk=100_000) == SIZE
+    assert dst.read_bytes() == src.read_bytes()
+    assert dst.stat().st_mtime == 1_000_000_000
+
+
+def test_copy_file_empty(tmp_path, dst):
+    empty = tmp_path / "empty.mp4"
+    empty.write_bytes(b"")
+    assert copy_file(str(empty), str(dst)) == 0
+    assert dst.read_bytes() == b""
+
+
+@pytest.mark.skipif(not hasattr(os, "sendfile"), reason="no sendfile")
+def test_copy_file_falls_back_to_sendfile(src, dst, monkeypatch):
+    monkeypatch.setattr(os, "copy_file_range", refuse(errno.EXDEV), raising=False)
+    sent = []
+    real_sendfile = os.sendfile
+    monkeypatch.setattr(os, "sendfile", lambda *args: sent.append(args) or real_sendfile(*args))
+    assert copy_file(str(src), str(dst), chunk=300_000) == SIZE
+    assert dst.read_bytes() == src.read_bytes()
+    assert len(sent) == 4
+
+
+@pytest.mark.parametrize("err", [errno.EXDEV, errno.ENOSYS, errno.EINVAL])
+def test_copy_file_falls_back_to_userspace(src, dst, monkeypatch, err):
+    monkeypatch.setattr(os, "copy_file_range", refuse(err), raising=False)
+    monkeypatch.setattr(os, "sendfile", refuse(err), raising=False)
+    assert copy_file(str(src), str(dst)) == SIZE
+    assert dst.read_bytes() == src.read_bytes()
+
+
+def test_copy_file_finishes_short_kernel_copy_in_userspace(src, dst, monkeypatch):
+    real_copy_file_range = getattr(os, "copy_file_range", None)
+    calls = []
+
+    def stops_early(src_fd, dst_fd, count):
+        calls.append(count)
+        if len(calls) > 1:
+            return 0  # e.g. the source shrank under us
+        if real_copy_file_range is not None:
+            return real_copy_file_range(src_fd, dst_fd, count)
+        return os.write(dst_fd, os.read(src_fd, count))
+
+    monkeypatch.setattr(os, "copy_file_range", stops_early, raising=False)
+    assert copy_file(str(src), str(dst), chunk=4096) == SIZE
+    assert dst.read_bytes() == src.read_bytes()
+
+
+def test_copy_file_real_errors_propagate(src, dst, monkeypatch):
+    monkeypatch.setattr(os, "copy_file_range", refuse(errno.EIO), raising=False)
+    with pytest.raises(OSError) as raised:
+        copy_file(str(src), str(dst))
+    assert raised.value.errno == errno.EIO
+
+
+def test_copy_file_with_digest_hashes_what_it_copies(src, dst, monkeypatch):
+    monkeypatch.setattr(os, "copy_file_range", refuse(errno.EIO), raising=False)
+    monkeypatch.setattr(os, "sendfile", refuse(errno.EIO), raising=False)
+    digest = hashlib.blake2b(digest_size=32)
+    assert copy_file(str(src), str(dst), digest=digest) == SIZE
+    assert digest.hexdigest() == hashlib.blake2b(src.read_bytes(), digest_size=32).hexdigest()
+    assert dst.read_bytes() == src.read_bytes()
+
+
+def test_copy_files_largest_first_with_stats(tmp_path):
+    jobs = []
+    for name, size in (("small", 10), ("big", 3000), ("medium", 500)):
+        path = tmp_path / name
+        path.write_bytes(b"x" * size)
+        jobs.append((str(path), str(tmp_path / (name + ".copy")), size))
+    order, done = [], []
+
+    def copy(src, dst):
+        order.append(os.path.basename(src))
+        return copy_file(src, dst)
+
+    stats = copy_files(jobs, workers=1, on_done=lambda *args: done.append(args), copy=copy)
+    assert order == ["big", "medium", "small"]
+    assert sorted(done) == sorted((src, dst, size) for src, dst, size in jobs)
+    assert (stats.files, stats.bytes, stats.failed) == (3, 3510, 0)
+    assert stats.finished is not None
+    assert "3 files" in stats.summary()
+
+
+def test_copy_files_reports_failures_and_continues(tmp_path):
+    good = tmp_path / "good"
+    good.write_bytes(b"data")
+    jobs = [(str(tmp_path / "missing"), str(tmp_path / "missing.copy"), 100),
+            (str(good), str(tmp_path / "good.copy"), 4)]
+    errors = []
+    stats = copy_files(jobs, workers=2, on_error=lambda src, dst, e: errors.append((src, type(e))))
+    assert errors == [(str(tmp_path / "missing"), FileNotFoundError)]
+    assert (stats.files, stats.bytes, stats.failed) == (1, 4, 1)
+    assert (tmp_path / "good.copy").read_bytes() == b"data"
+
+
+def test_copy_stats_is_thread_safe():
+    stats = CopyStats()
+    threads = [threading.Thread(target=lambda: [stats.add(1) for _ in range(1000)]) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert (stats.files, stats.bytes) == (8000, 8000)
+
+
+def test_move_file_moves_and_keeps_metadata(src, dst):
+    data = src.read_bytes()
+    os.utime(src, (1_000_000_000, 1_000_000_000))
+    assert move_file(str(src), str(dst)) == SIZE
+    assert not src.exists()
+    assert dst.read_bytes() == data
+    assert dst.stat().st_mtime == 1_000_000_000
+
+
+@pytest.mark.parametrize("offset", [SIZE // 4, SIZE // 2 + 70000, SIZE - 1])
+def test_move_file_keeps_source_when_copy_is_damaged(src, dst, monkeypatch, offset):
+    # SIZE // 4 lies outside the head/middle/tail chunks a sampled hash would read
+    data = src.read_bytes()
+    monkeypatch.setattr(copy_engine, "copy_file", damaging_copy(offset))
+    with pytest.raises(OSError) as raised:
+        move_file(str(src), str(dst))
+    assert raised.value.errno == errno.EIO
+    assert src.read_bytes() == data
+    assert not dst.exists()
+
+
+def test_move_file_keeps_source_when_copy_is_short(src, dst, monkeypatch):
+    real_copy = copy_engine.copy_file
+
+    def truncating_copy(src_path, dst_path, *args, **kwargs):
+        copied = real_copy(src_path, dst_path, *args, **kwargs)
+        os.truncate(dst_path, SIZE - 10)
+        return copied
+    monkeypatch.setattr(copy_engine, "copy_file", truncating_copy)
+    with pytest.raises(OSError):
+        move_file(str(src), str(dst))
+    assert src.stat().st_size == SIZE
+    assert not dst.exists()
@@ -0,0 +1,49 @@
+# test_deduplicator.py
+import os
+import pytest
+from deduplicator import remove_exact_duplicates
+
+PAYLOAD = os.urandom(5000)
+
+
+@pytest.fixture
+def library(tmp_path, monkeypatch):
+    """Two identical videos in different folders, plus a symlink to the first."""
+    monkeypatch.chdir(tmp_path)  # download_tracker keeps its snapshot in the working directory
+    root = tmp_path / "library"
+    for folder in ("a", "b", "c"):
+        (root / folder).mkdir(parents=True)
+    (root / "a" / "clip.mp4").write_bytes(PAYLOAD)
+    (root / "b" / "clip.mp4").write_bytes(PAYLOAD)
+    (root / "c" / "clip.mp4").symlink_to(root / "a" / "clip.mp4")
+    return root
+
+
+def test_dry_run_deletes_nothing(library, monkeypatch, capsys):
+    monkeypatch.setattr("builtins.input", lambda prompt: pytest.fail("prompted"))
+    remove_exact_duplicates(str(library), dry_run=True)
+    assert (library / "b" / "clip.mp4").exists()
+    assert "would remove 1 identical copies" in capsys.readouterr().out
+
+
+@pytest.mark.parametrize("answer", ["", "n", "no"])
+def test_declining_deletes_nothing(library, monkeypatch, answer):
+    monkeypatch.setattr("builtins.input", lambda prompt: answer)
+    remove_exact_duplicates(str(library))
+    assert (library / "b" / "clip.mp4").exists()
+
+
+def test_confirmed_deletes_copy_but_not_symlink_target(library, monkeypatch):
+    monkeypatch.setattr("builtins.input", lambda prompt: "y")
+    remove_exact_duplicates(str(library))
+    assert (library / "a" / "clip.mp4").read_bytes() == PAYLOAD
+    assert not (library / "b" / "clip.mp4").exists()
+    assert os.path.islink(library / "c" / "clip.mp4")
+
+
+def test_symlink_alone_is_not_a_duplicate(library, monkeypatch, capsys):
+    (library / "b" / "clip.mp4").unlink()
+    monkeypatch.setattr("builtins.input", lambda prompt: pytest.fail("prompted"))
+    remove_exact_duplicates(str(library))
+    assert (library / "a" / "clip.mp4").read_bytes() == PAYLOAD
+    assert "No identical copies found" in capsys.readouterr().out
@@ -0,0 +1,119 @@
+# test_download_tracker.py
+import os
+import json
+import time
+import pytest
+from download_tracker import DownloadTracker, in_packages, STALE_SECONDS
+
+
+@pytest.fixture
+def root(tmp_path):
+    root = tmp_path / "lib"
+    for package in ("active", "stale", "done"):
+        (root / package).mkdir(parents=True)
+        (root / package / "v.mp4").write_bytes(b"video")
+    (root / "active" / "w.mp4.part").write_bytes(b"part")
+    (root / "stale" / "w.mp4.part").write_bytes(b"part")
+    age(root / "stale" / "w.mp4.part", STALE_SECONDS + 60)
+    return root
+
+
+@pytest.fixture
+def snapshots(tmp_path):
+    return str(tmp_path / "part_snapshots.json")
+
+
+def age(path, seconds):
+    then = time.time() - seconds
+    os.utime(path, (then, then))
+
+
+def tracker(root, snapshots):
+    return DownloadTracker(str(root), path=snapshots)
+
+
+def test_classify_by_mtime(root, snapshots):
+    states = tracker(root, snapshots).classify()
+    assert states == {str(root / "active" / "w.mp4.part"): "active",
+                      str(root / "stale" / "w.mp4.part"): "stale"}
+
+
+def test_active_packages_are_top_level_folders(root, snapshots):
+    (root / "active" / "sub").mkdir()
+    os.replace(root / "active" / "w.mp4.part", root / "active" / "sub" / "w.mp4.part")
+    assert tracker(root, snapshots).active_packages() == {str(root / "active")}
+
+
+def test_part_that_changed_since_last_run_is_active_despite_old_mtime(root, snapshots):
+    part = root / "stale" / "w.mp4.part"
+    first = tracker(root, snapshots)
+    first.classify()
+    first.save()
+
+    part.write_bytes(b"part grown")  # written, but a downloader restored an old mtime
+    age(part, STALE_SECONDS + 60)
+    assert tracker(root, snapshots).classify()[str(part)] == "active"
+
+
+def test_unchanged_part_keeps_its_last_change_time(root, snapshots):
+    part = root / "stale" / "w.mp4.part"
+    first = tracker(root, snapshots)
+    first.classify()
+    first.save()
+    with open(snapshots) as f:
+        changed_at = json.load(f)[os.path.abspath(part)][2]
+
+    again = tracker(root, snapshots)
+    assert again.classify()[str(part)] == "stale"
+    assert again.snapshots[os.path.abspath(part)][2] == changed_at
+
+
+def test_sample_marks_growing_parts_active(root, snapshots, monkeypatch):
+    part = root / "stale" / "w.mp4.part"
+    t = tracker(root, snapshots)
+    t.classify()
+
+    def grow(seconds):
+        with open(part, "ab") as f:
+            f.write(b"more")
+    monkeypatch.setattr(time, "sleep", grow)
+    t.sample([str(part)])
+    assert t.states[str(part)] == "active"
+    assert t.active_packages() == {str(root / "active"), str(root / "stale")}
+
+
+def test_sample_drops_parts_that_vanished(root, snapshots, monkeypatch):
+    part = root / "stale" / "w.mp4.part"
+    t = tracker(root, snapshots)
+    t.classify()
+    monkeypatch.setattr(time, "sleep", lambda seconds: part.unlink())
+    t.sample([str(part)])
+    assert str(part) not in t.states
+
+
+def test_save_forgets_vanished_parts_under_root_only(root, snapshots):
+    elsewhere = os.path.abspath("/elsewhere/x.part")
+    with open(snapshots, "w") as f:
+        json.dump({elsewhere: [1, 1, 1.0], os.path.abspath(root / "gone" / "y.part"): [1, 1, 1.0]}, f)
+
+    t = tracker(root, snapshots)
+    t.classify()
+    t.save()
+    with open(snapshots) as f:
+        saved = json.load(f)
+    assert set(saved) == {elsewhere, os.path.abspath(root / "active" / "w.mp4.part"),
+                          os.path.abspath(root / "stale" / "w.mp4.part")}
+
+
+def test_corrupt_snapshot_file_is_ignored(root, snapshots):
+    with open(snapshots, "w") as f:
+        f.write("{not json")
+    assert tracker(root, snapshots).snapshots == {}
+
+
+def test_in_packages_matches_whole_path_components():
+    packages = {os.path.join("lib", "pkg")}
+    assert in_packages(os.path.join("lib", "pkg"), packages)
+    assert in_packages(os.path.join("lib", "pkg", "v.mp4"), packages)
+    assert not in_packages(os.path.join("lib", "pkg2", "v.mp4"), packages)
+    assert not in_packages(os.path.join("lib", "pkg"), set())
@@ -0,0 +1,78 @@
+# test_duplicate_index.py
+import os
+import random
+from duplicate_index import find_duplicate_groups, match_groups, THRESHOLD_SECONDS, THRESHOLD_RESOLUTION
+
+
+def video(duration, width=1920, height=1080):
+    return {"Duration": str(duration), "Width": width, "Height": height}
+
+
+def within(a, b):
+    return (abs(float(a["Duration"]) - float(b["Duration"])) < THRESHOLD_SECONDS
+            and abs(a["Width"] - b["Width"]) < THRESHOLD_RESOLUTION
+            and abs(a["Height"] - b["Height"]) < THRESHOLD_RESOLUTION)
+
+
+def all_pairs_groups(video_files, video_infos):
+    """The old O(n²) comparison of every pair, grouped the same way."""
+    pairs = [(i, j) for i in range(len(video_infos)) for j in range(i + 1, len(video_infos))
+             if within(video_infos[i], video_infos[j])]
+    groups = [[video_files[i] for i in items] for items in match_groups(len(video_files), pairs)]
+    groups = [paths for paths in groups if len({os.path.dirname(p) for p in paths}) > 1]
+    return sorted(sorted(paths) for paths in groups)
+
+
+def indexed_groups(video_files, video_infos):
+    return sorted(sorted(path for path, _ in group) for group in find_duplicate_groups(video_files, video_infos))
+
+
+def test_chain_of_near_matches_is_not_one_group():
+    # Each video 1.5 s longer than the last: neighbours match, the ends are over a minute apart
+    files = [f"/lib/pkg{i}/v.mp4" for i in range(50)]
+    infos = [video(60.0 + 1.5 * i) for i in range(50)]
+    groups = find_duplicate_groups(files, infos)
+
+    assert groups
+    for group in groups:
+        for _, a in group:
+            for _, b in group:
+                assert a is b or within(a, b)
+    assert max(len(group) for group in groups) == 2
+
+
+def test_copies_of_one_video_form_one_group():
+    files = ["/lib/a/v.mp4", "/lib/b/v.mp4", "/lib/c/v.mp4", "/lib/d/other.mp4"]
+    infos = [video(100.0), video(100.5), video(99.8, 1904, 1072), video(300.0)]
+    assert indexed_groups(files, infos) == [["/lib/a/v.mp4", "/lib/b/v.mp4", "/lib/c/v.mp4"]]
+
+
+def test_same_folder_groups_are_left_out():
+    files = ["/lib/a/v.mp4", "/lib/a/v (1).mp4"]
+    assert find_duplicate_groups(files, [video(10.0), video(10.0)]) == []
+
+
+def test_unusable_infos_are_skipped():
+    files = ["/lib/a/v.mp4", "/lib/b/v.mp4", "/lib/c/v.mp4"]
+    infos = [video(10.0), {"error": "no video stream"}, {"Duration": None, "Width": 1, "Height": 1}]
+    assert find_duplicate_groups(files, infos) == []
+
+
+def test_index_matches_all_pairs_comparison():
+    rng = random.Random(3)
+    resolutions = [(640, 360), (1280, 720), (1920, 1080), (1900, 1070)]
+    for _ in range(20):
+        files, infos = [], []
+        for i in range(rng.randint(2, 120)):
+            width, height = rng.choice(resolutions)
+            files.append(f"/lib/pkg{rng.randint(0, 9)}/v{i}.mp4")
+            infos.append(video(round(rng.uniform(0, 60), 2), width + rng.randint(-20, 20),
+                               height + rng.randint(-20, 20)))
+        assert indexed_groups(files, infos) == all_pairs_groups(files, infos)
+
+
+def test_match_groups_takes_only_mutual_matches():
+    # 0~1, 0~2, 1~2 form a group; 3 matches only 2, which is taken, so it stays alone
+    assert match_groups(5, [(0, 1), (0, 2), (1, 2), (2, 3)]) == [[0, 1, 2]]
+    assert match_groups(4, [(0, 1), (1, 2), (2, 3)]) == [[0, 1], [2, 3]]
+    assert match_groups(3, []) == []
@@ -0,0 +1,85 @@
+# test_encode_journal.py
+import json
+from encode_journal import EncodeJournal, QUEUED, ENCODING, VERIFIED, SWAPPED, KEPT, FAILED
+
+
+def read_lines(path):
+    with open(path, "rb") as f:
+        return f.read().splitlines(keepends=True)
+
+
+def test_latest_record_per_path_wins(tmp_path):
+    path = str(tmp_path / "journal.jsonl")
+    journal = EncodeJournal(path)
+    journal.record("/v/a.mp4", QUEUED, file={"size": 10})
+    journal.record("/v/a.mp4", ENCODING, output="/v/a.h265.mp4")
+    journal.record("/v/b.mp4", QUEUED)
+
+    entries = EncodeJournal(path).entries
+    assert entries["/v/a.mp4"] == {"path": "/v/a.mp4", "state": ENCODING, "file": {"size": 10},
+                                   "output": "/v/a.h265.mp4"}
+    assert entries["/v/b.mp4"]["state"] == QUEUED
+
+
+def test_unfinished_leaves_out_finished_states(tmp_path):
+    journal = EncodeJournal(str(tmp_path / "journal.jsonl"))
+    for name, state in [("a", QUEUED), ("b", ENCODING), ("c", VERIFIED), ("d", SWAPPED), ("e", KEPT),
+                        ("f", FAILED)]:
+        journal.record(name, state)
+
+    assert sorted(e["path"] for e in journal.unfinished()) == ["a", "b", "c"]
+    assert [e["path"] for e in journal.unfinished(ENCODING)] == ["b"]
+
+
+def test_torn_tail_is_ignored_and_truncated(tmp_path):
+    path = str(tmp_path / "journal.jsonl")
+    journal = EncodeJournal(path)
+    journal.record("/v/a.mp4", QUEUED)
+    journal.record("/v/a.mp4", ENCODING, output="/v/a.h265.mp4")
+    intact = read_lines(path)
+    with open(path, "ab") as f:
+        f.write(b'{"path": "/v/a.mp4", "state": "verif')  # crash mid-write
+
+    recovered = EncodeJournal(path)
+    assert recovered.entries["/v/a.mp4"]["state"] == ENCODING
+    assert read_lines(path) == intact
+
+    # New records start on a line of their own and survive the next load
+    recovered.record("/v/a.mp4", QUEUED)
+    assert EncodeJournal(path).entries["/v/a.mp4"]["state"] == QUEUED
+    assert [json.loads(line)["state"] for line in read_lines(path)] == [QUEUED, ENCODING, QUEUED]
+
+
+def test_record_missing_only_its_newline_is_kept(tmp_path):
+    path = str(tmp_path / "journal.jsonl")
+    journal = EncodeJournal(path)
+    journal.record("/v/a.mp4", QUEUED)
+    with open(path, "ab") as f:
+        f.write(b'{"path": "/v/a.mp4", "state": "encoding", "output": "/v/a.h265.mp4"}')  # newline lost
+
+    recovered = EncodeJournal(path)
+    assert recovered.entries["/v/a.mp4"]["state"] == ENCODING
+    recovered.record("/v/a.mp4", QUEUED)
+    assert EncodeJournal(path).entries["/v/a.mp4"]["state"] == QUEUED
+    assert len(read_lines(path)) == 3
+
+
+def test_torn_tail_after_garbage_line_drops_everything_after_it(tmp_path):
+    path = str(tmp_path / "journal.jsonl")
+    with open(path, "wb") as f:
+        f.write(b'{"path": "a", "state": "queued"}\n{"path": "b", "sta\n{"path": "c", "state": "queued"}\n')
+
+    journal = EncodeJournal(path)
+    assert list(journal.entries) == ["a"]
+    assert read_lines(path) == [b'{"path": "a", "state": "queued"}\n']
+
+
+def test_reset_discards_history(tmp_path):
+    path = tmp_path / "journal.jsonl"
+    journal = EncodeJournal(str(path))
+    journal.record("a", QUEUED)
+    journal.reset()
+
+    assert journal.entries == {}
+    assert not path.exists()
+    assert EncodeJournal(str(path)).entries == {}
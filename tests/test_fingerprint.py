@@ -0,0 +1,104 @@
+# test_fingerprint.py
+import os
+import random
+import pytest
+import fingerprint
+from fingerprint import SAMPLE_CHUNK, find_exact_duplicates, sample_hash, full_hash
+
+
+def data(size, seed=0):
+    return random.Random(seed).getrandbits(size * 8).to_bytes(size, "little")
+
+
+def write(path, payload):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_bytes(payload)
+    return str(path)
+
+
+@pytest.fixture
+def full_hashes(monkeypatch):
+    """Record which paths get the (expensive) full hash."""
+    seen = []
+
+    def counting_full_hash(path):
+        seen.append(path)
+        return full_hash(path)
+
+    monkeypatch.setattr(fingerprint, "full_hash", counting_full_hash)
+    return seen
+
+
+def test_identical_files_are_grouped(tmp_path):
+    payload = data(4 * SAMPLE_CHUNK)
+    a = write(tmp_path / "a" / "clip.mp4", payload)
+    b = write(tmp_path / "b" / "clip.mp4", payload)
+    assert find_exact_duplicates([a, b]) == [[a, b]]
+
+
+def test_different_sizes_are_never_read(tmp_path, monkeypatch):
+    a = write(tmp_path / "a.mp4", data(1000))
+    b = write(tmp_path / "b.mp4", data(1001))
+    monkeypatch.setattr(fingerprint, "sample_hash", lambda *args: pytest.fail("sampled"))
+    assert find_exact_duplicates([a, b]) == []
+
+
+def test_sample_mismatch_skips_full_hash(tmp_path, full_hashes):
+    payload = bytearray(data(8 * SAMPLE_CHUNK))
+    a = write(tmp_path / "a.mp4", bytes(payload))
+    payload[0] ^= 0xFF  # inside the head chunk
+    b = write(tmp_path / "b.mp4", bytes(payload))
+    assert find_exact_duplicates([a, b]) == []
+    assert full_hashes == []
+
+
+def test_difference_outside_samples_is_caught_by_full_hash(tmp_path, full_hashes):
+    size = 8 * SAMPLE_CHUNK
+    payload = bytearray(data(size))
+    a = write(tmp_path / "a.mp4", bytes(payload))
+    payload[SAMPLE_CHUNK + 1] ^= 0xFF  # between the head and middle chunks
+    b = write(tmp_path / "b.mp4", bytes(payload))
+    assert sample_hash(a, size) == sample_hash(b, size)
+    assert find_exact_duplicates([a, b]) == []
+    assert sorted(full_hashes) == [a, b]
+
+
+def test_small_files_are_covered_by_the_sample(tmp_path, full_hashes):
+    payload = data(3 * SAMPLE_CHUNK)
+    a = write(tmp_path / "a.mp4", payload)
+    b = write(tmp_path / "b.mp4", payload)
+    changed = bytearray(payload)
+    changed[SAMPLE_CHUNK + 1] ^= 0xFF
+    c = write(tmp_path / "c.mp4", bytes(changed))
+    assert find_exact_duplicates([a, b, c]) == [[a, b]]
+    assert full_hashes == []
+
+
+def test_empty_and_missing_files_are_ignored(tmp_path):
+    a = write(tmp_path / "a.mp4", b"")
+    b = write(tmp_path / "b.mp4", b"")
+    assert find_exact_duplicates([a, b, str(tmp_path / "gone.mp4")]) == []
+
+
+def test_groups_are_largest_first(tmp_path):
+    small, big = data(100, 1), data(5000, 2)
+    paths = [write(tmp_path / name, payload) for name, payload in
+             (("s1.mp4", small), ("s2.mp4", small), ("b1.mp4", big), ("b2.mp4", big))]
+    assert find_exact_duplicates(paths) == [paths[2:], paths[:2]]
+
+
+def test_symlinks_are_not_copies(tmp_path):
+    real = write(tmp_path / "a" / "clip.mp4", data(5000))
+    link = tmp_path / "b" / "clip.mp4"
+    link.parent.mkdir()
+    link.symlink_to(real)
+    assert find_exact_duplicates([real, str(link)]) == []
+
+
+def test_hard_links_count_once(tmp_path):
+    payload = data(5000)
+    a = write(tmp_path / "a.mp4", payload)
+    os.link(a, tmp_path / "a_link.mp4")
+    b = write(tmp_path / "b.mp4", payload)
+    assert find_exact_duplicates([a, str(tmp_path / "a_link.mp4"), b]) == [[a, b]]
+    assert find_exact_duplicates([a, str(tmp_path / "a_link.mp4")]) == []
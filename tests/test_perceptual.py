@@ -0,0 +1,117 @@
+# test_perceptual.py
+import random
+import pytest
+import perceptual
+from perceptual import (BKTree, HASH_WIDTH, HASH_HEIGHT, FRAME_COUNT, MAX_FRAME_DISTANCE,
+                        hamming, dhash, compute_fingerprint, find_near_duplicate_groups)
+
+
+def frame(rows):
+    """9x8 grayscale bytes from one row builder per row."""
+    return bytes(value for row in range(HASH_HEIGHT) for value in rows(row))
+
+
+ASCENDING = list(range(0, 9 * 20, 20))
+DESCENDING = ASCENDING[::-1]
+
+
+def flip_bits(value, count, rng):
+    for bit in rng.sample(range(64), count):
+        value ^= 1 << bit
+    return value
+
+
+def test_dhash_known_values():
+    assert dhash(frame(lambda row: ASCENDING)) == 0
+    assert dhash(frame(lambda row: DESCENDING)) == (1 << 64) - 1
+    # Only the first row falls left to right: its 8 gradient bits are the top byte
+    assert dhash(frame(lambda row: DESCENDING if row == 0 else ASCENDING)) == 0xFF << 56
+
+
+def test_dhash_distance_counts_changed_gradients():
+    base = frame(lambda row: ASCENDING)
+    changed = bytearray(base)
+    # Raising the first pixel of three rows flips exactly one gradient in each
+    for row in (0, 3, 7):
+        changed[row * HASH_WIDTH] = 255
+    assert hamming(dhash(base), dhash(bytes(changed))) == 3
+
+
+def test_dhash_ignores_brightness_shift():
+    base = frame(lambda row: ASCENDING)
+    assert dhash(bytes(min(255, v + 40) for v in base)) == dhash(base)
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_bktree_search_matches_brute_force(seed):
+    rng = random.Random(seed)
+    centres = [rng.getrandbits(64) for _ in range(20)]
+    # Clusters of near values, exact repeats and unrelated hashes
+    values = [flip_bits(rng.choice(centres), rng.randrange(0, 16), rng) for _ in range(400)]
+    values += values[:20] + [rng.getrandbits(64) for _ in range(50)]
+    tree = BKTree()
+    for index, value in enumerate(values):
+        tree.add(value, index)
+
+    for query in [rng.choice(values) for _ in range(20)] + [rng.getrandbits(64) for _ in range(5)]:
+        for radius in (0, 1, 5, MAX_FRAME_DISTANCE, 20):
+            expected = sorted((hamming(query, value), index) for index, value in enumerate(values)
+                              if hamming(query, value) <= radius)
+            assert sorted(tree.search(query, radius)) == expected
+
+
+def test_bktree_empty():
+    assert list(BKTree().search(0, 64)) == []
+
+
+def fingerprint(seed, frames=FRAME_COUNT):
+    rng = random.Random(seed)
+    return [rng.getrandbits(64) for _ in range(frames)]
+
+
+def reencoded(hashes, seed, bits=3):
+    rng = random.Random(seed)
+    return [flip_bits(h, bits, rng) for h in hashes]
+
+
+def test_near_duplicates_grouped_across_folders():
+    original = fingerprint(1)
+    files = ["a/clip.mp4", "b/clip_720p.mp4", "c/other.mp4"]
+    fingerprints = [original, reencoded(original, 2), fingerprint(3)]
+    assert find_near_duplicate_groups(files, fingerprints) == [["a/clip.mp4", "b/clip_720p.mp4"]]
+
+
+def test_trimmed_copy_matches_on_shared_frames():
+    original = fingerprint(1)
+    trimmed = reencoded(original[:4], 2)
+    assert find_near_duplicate_groups(["a/x.mp4", "b/x.mp4"], [original, trimmed]) == [["a/x.mp4", "b/x.mp4"]]
+
+
+def test_too_few_matching_frames_is_no_match():
+    original = fingerprint(1)
+    mixed = original[:3] + fingerprint(2, FRAME_COUNT - 3)
+    assert find_near_duplicate_groups(["a/x.mp4", "b/x.mp4"], [original, mixed]) == []
+
+
+def test_same_folder_only_when_asked():
+    original = fingerprint(1)
+    files = ["a/x.mp4", "a/y.mp4"]
+    fingerprints = [original, reencoded(original, 2)]
+    assert find_near_duplicate_groups(files, fingerprints) == []
+    assert find_near_duplicate_groups(files, fingerprints, cross_folder_only=False) == [files]
+
+
+def test_videos_without_fingerprint_never_match():
+    assert find_near_duplicate_groups(["a/x.mp4", "b/x.mp4"], [[], []]) == []
+
+
+def test_compute_fingerprint_drops_flat_and_failed_frames(monkeypatch):
+    detailed = 0x0F0F0F0F0F0F0F0F
+    frames = iter([detailed, 0, None, (1 << 64) - 1, detailed, detailed, None, detailed])
+    monkeypatch.setattr(perceptual, "extract_frame_hash", lambda path, timestamp: next(frames))
+    assert compute_fingerprint("x.mp4", 90.0) == {"hashes": [f"{detailed:016x}"] * 4}
+
+
+def test_compute_fingerprint_without_usable_frames(monkeypatch):
+    monkeypatch.setattr(perceptual, "extract_frame_hash", lambda path, timestamp: 0)
+    assert "error" in compute_fingerprint("x.mp4", 90.0)
@@ -0,0 +1,33 @@
+# test_plan.py
+import pytest
+import plan
+from inventory import Inventory
+from plan import Stage, check_plan, run_plan
+
+
+def test_probe_all_skips_packages_still_downloading(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    root = tmp_path / "lib"
+    for package in ("done", "downloading"):
+        (root / package).mkdir(parents=True)
+        (root / package / "v.mp4").write_bytes(b"video")
+    (root / "downloading" / "w.mp4.part").write_bytes(b"part")
+    probed = []
+    monkeypatch.setattr(plan, "get_video_infos", lambda videos, inventory: probed.extend(videos) or [])
+
+    plan.probe_all(str(root), Inventory(str(root)))
+    assert probed == [str(root / "done" / "v.mp4")]
+
+
+def test_stages_run_after_what_they_need(capsys):
+    order = []
+    stages = [Stage("b", lambda: order.append("b"), needs={"a"}, produces={"b"}),
+              Stage("a", lambda: order.append("a"), produces={"a"}),
+              Stage("c", lambda: order.append("c"), needs={"a", "b"})]
+    run_plan(stages)
+    assert order == ["a", "b", "c"]
+
+
+def test_check_plan_rejects_missing_needs():
+    with pytest.raises(ValueError):
+        check_plan([Stage("b", lambda: None, needs={"a"})])
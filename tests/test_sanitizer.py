@@ -0,0 +1,163 @@
+# test_sanitizer.py
+import os
+import json
+import pytest
+from inventory import Inventory
+from sanitizer import plan_renames, plan_package_renames, apply_plan, undo_renames, sanitize_name
+
+
+def make_tree(root, paths, content=b"video"):
+    for path in paths:
+        full = os.path.join(root, path)
+        os.makedirs(os.path.dirname(full), exist_ok=True)
+        with open(full, "wb") as f:
+            f.write(content)
+
+
+def tree(root):
+    found = set()
+    for dirpath, dirnames, filenames in os.walk(root):
+        for name in dirnames + filenames:
+            found.add(os.path.relpath(os.path.join(dirpath, name), root))
+    return found
+
+
+def planned(root, plan):
+    return {(os.path.relpath(old, root), os.path.relpath(new, root), suffixed)
+            for old, new, _, suffixed in plan}
+
+
+@pytest.fixture
+def journal(tmp_path):
+    return str(tmp_path / "rename_journal.jsonl")
+
+
+def test_sanitize_name_keeps_extension():
+    assert sanitize_name("Clip #4k #new.mp4") == "Clip.mp4"
+    assert sanitize_name("Trip★★Special__Edition.mkv") == "Trip-Special-Edition.mkv"
+
+
+def test_plan_renames_deepest_first(tmp_path):
+    root = str(tmp_path / "lib")
+    make_tree(root, ["Show #4k/Clip #a.mp4"])
+    plan = plan_renames(root, Inventory(root))
+    assert [os.path.relpath(new, root) for _, new, _, _ in plan] == [os.path.join("Show #4k", "Clip.mp4"), "Show"]
+
+
+def test_plan_renames_suffixes_collisions(tmp_path):
+    root = str(tmp_path / "lib")
+    make_tree(root, ["pkg/a.mp4", "pkg/a #x.mp4", "pkg/b #1.mp4", "pkg/b #2.mp4"])
+    plan = plan_renames(root, Inventory(root))
+    pkg = os.path.join
+    assert planned(root, plan) == {
+        (pkg("pkg", "a #x.mp4"), pkg("pkg", "a (2).mp4"), True),
+        (pkg("pkg", "b #1.mp4"), pkg("pkg", "b.mp4"), False),
+        (pkg("pkg", "b #2.mp4"), pkg("pkg", "b (2).mp4"), True),
+    }
+
+
+def test_plan_renames_collisions_ignore_case(tmp_path):
+    root = str(tmp_path / "lib")
+    make_tree(root, ["pkg/A.mp4", "pkg/a #x.mp4"])
+    plan = plan_renames(root, Inventory(root))
+    assert planned(root, plan) == {(os.path.join("pkg", "a #x.mp4"), os.path.join("pkg", "a (2).mp4"), True)}
+
+
+def test_plan_renames_suffixes_folders_before_extension(tmp_path):
+    root = str(tmp_path / "lib")
+    make_tree(root, ["Show/x.mp4", "Show #1/y.mp4"])
+    plan = plan_renames(root, Inventory(root))
+    assert planned(root, plan) == {("Show #1", "Show (2)", True)}
+
+
+def test_plan_renames_adds_sniffed_extension(tmp_path):
+    root = str(tmp_path / "lib")
+    make_tree(root, ["pkg/clip"], content=b"\x00\x00\x00\x18ftypisom" + b"\x00" * 100)
+    plan = plan_renames(root, Inventory(root))
+    assert planned(root, plan) == {(os.path.join("pkg", "clip"), os.path.join("pkg", "clip.mp4"), False)}
+
+
+def test_apply_then_undo_round_trip(tmp_path, journal):
+    root = str(tmp_path / "lib")
+    original = ["Show #4k/Clip #a.mp4", "Show #4k/Clip.mp4", "Show #4k/Sub★dir/x__y.mkv", "Show/z.mp4",
+                "Talk--Recording__/talk.webm"]
+    make_tree(root, original)
+    before = tree(root)
+    inventory = Inventory(root)
+    plan = plan_renames(root, inventory)
+
+    assert apply_plan(plan, inventory, journal) == len(plan)
+    after = tree(root)
+    assert after != before
+    assert set(inventory.files(root)) == {os.path.join(root, path) for path in after
+                                          if os.path.isfile(os.path.join(root, path))}
+    with open(journal) as f:
+        assert len(f.readlines()) == len(plan)
+
+    assert undo_renames(inventory, journal) == len(plan)
+    assert tree(root) == before
+    assert not os.path.exists(journal)
+
+
+def test_plan_is_empty_for_clean_tree(tmp_path):
+    root = str(tmp_path / "lib")
+    make_tree(root, ["Show/Clip.mp4"])
+    assert plan_renames(root, Inventory(root)) == []
+
+
+def test_undo_stops_at_torn_journal_tail(tmp_path, journal):
+    root = str(tmp_path / "lib")
+    make_tree(root, ["pkg/a #1.mp4", "pkg/b #1.mp4"])
+    inventory = Inventory(root)
+    plan = plan_renames(root, inventory)
+    apply_plan(plan, inventory, journal)
+    with open(journal, "a") as f:
+        f.write('{"old": "' + root + '/pkg/c #1.mp4", "ne')  # crash mid-write
+
+    assert undo_renames(inventory, journal) == 2
+    assert tree(root) == {"pkg", os.path.join("pkg", "a #1.mp4"), os.path.join("pkg", "b #1.mp4")}
+
+
+def test_undo_skips_entries_changed_since(tmp_path, journal):
+    root = str(tmp_path / "lib")
+    make_tree(root, ["pkg/a #1.mp4", "pkg/b #1.mp4"])
+    inventory = Inventory(root)
+    apply_plan(plan_renames(root, inventory), inventory, journal)
+    os.remove(os.path.join(root, "pkg", "b.mp4"))
+
+    assert undo_renames(None, journal) == 1
+    assert tree(root) == {"pkg", os.path.join("pkg", "a #1.mp4")}
+
+
+def test_undo_without_journal(journal):
+    assert undo_renames(None, journal) == 0
+
+
+def test_apply_plan_journals_only_done_renames(tmp_path, journal):
+    root = str(tmp_path / "lib")
+    make_tree(root, ["pkg/a #1.mp4", "pkg/b #1.mp4"])
+    inventory = Inventory(root)
+    plan = plan_renames(root, inventory)
+    os.remove(plan[0][0])  # vanished between planning and applying
+
+    assert apply_plan(plan, inventory, journal) == 1
+    with open(journal) as f:
+        steps = [json.loads(line) for line in f]
+    assert [step["old"] for step in steps] == [plan[1][0]]
+
+
+def test_plan_package_renames_folder_last_and_suffixed_against_siblings(tmp_path, journal):
+    root = str(tmp_path / "downloads")
+    make_tree(root, ["Show/x.mp4", "Show #new/Clip #1.mp4"])
+    package = os.path.join(root, "Show #new")
+    plan = plan_package_renames(package, Inventory(package))
+    assert planned(root, plan) == {
+        ("Show #new/Clip #1.mp4", "Show #new/Clip.mp4", False),
+        ("Show #new", "Show (2)", True),
+    }
+    assert plan[-1][0] == package
+
+    apply_plan(plan, Inventory(package), journal)
+    assert tree(root) == {"Show", "Show/x.mp4", "Show (2)", "Show (2)/Clip.mp4"}
+    undo_renames(journal_path=journal)
+    assert tree(root) == {"Show", "Show/x.mp4", "Show #new", "Show #new/Clip #1.mp4"}
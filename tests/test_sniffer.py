@@ -0,0 +1,95 @@
+# test_sniffer.py
+import os
+import pytest
+from inventory import Inventory
+from sanitizer import plan_renames
+from sniffer import SNIFF_BYTES, TS_PACKET, M2TS_PACKET, sniff_header, sniff_file, sniff_files
+from utils import VIDEO_EXTENSIONS
+
+
+def ebml(doc_type=None, unknown_size=False):
+    body = b""
+    if doc_type is not None:
+        body += b"\x42\x86\x81\x01"  # EBMLVersion 1, ahead of the DocType
+        body += b"\x42\x82" + bytes([0x80 | len(doc_type)]) + doc_type
+    size = b"\xff" if unknown_size else bytes([0x80 | len(body)])
+    return b"\x1a\x45\xdf\xa3" + size + body + b"\x18\x53\x80\x67" + b"\x00" * 32
+
+
+def transport_stream(packet, prefix=0, packets=10):
+    return b"".join(b"\x00" * prefix + b"\x47" + b"\x00" * (packet - prefix - 1) for _ in range(packets))
+
+
+HEADERS = {
+    "mp4": (b"\x00\x00\x00\x18ftypisom\x00\x00\x02\x00", ".mp4"),
+    "mov brand": (b"\x00\x00\x00\x14ftypqt  \x00\x00\x02\x00", ".mov"),
+    "mov bare atom": (b"\x00\x00\x00\x08wide\x00\x00\x10\x00mdat", ".mov"),
+    "webm": (ebml(b"webm"), ".webm"),
+    "matroska": (ebml(b"matroska"), ".mkv"),
+    "ebml without doctype": (ebml(), ".mkv"),
+    "ebml unknown size": (ebml(b"webm", unknown_size=True), ".webm"),
+    "avi": (b"RIFF\x00\x10\x00\x00AVI LIST", ".avi"),
+    "flv": (b"FLV\x01\x05\x00\x00\x00\x09", ".flv"),
+    "ts": (transport_stream(TS_PACKET), ".ts"),
+    "m2ts": (transport_stream(M2TS_PACKET, prefix=4), ".m2ts"),
+}
+
+
+@pytest.mark.parametrize("name", sorted(HEADERS))
+def test_sniff_header(name):
+    header, expected = HEADERS[name]
+    assert sniff_header(header) == expected
+    assert expected in VIDEO_EXTENSIONS
+
+
+@pytest.mark.parametrize("header", [
+    b"",
+    b"plain text, not a video" * 10,
+    b"RIFF\x00\x10\x00\x00WAVEfmt ",
+])
+def test_sniff_header_unrecognised(header):
+    assert sniff_header(header) is None
+
+
+def test_broken_ebml_header_falls_back_to_mkv():
+    # The magic alone is enough to call it Matroska
+    assert sniff_header(b"\x1a\x45\xdf\xa3\x00") == ".mkv"
+    assert sniff_header(b"\x1a\x45\xdf\xa3\x8f\x42\x82") == ".mkv"  # truncated
+
+
+def test_too_few_ts_packets_is_not_ts():
+    assert sniff_header(transport_stream(TS_PACKET, packets=2)) is None
+    broken = bytearray(transport_stream(TS_PACKET))
+    broken[3 * TS_PACKET] = 0
+    assert sniff_header(bytes(broken)) is None
+
+
+def test_sniff_file_reads_only_the_start(tmp_path):
+    path = tmp_path / "clip"
+    path.write_bytes(transport_stream(TS_PACKET, packets=SNIFF_BYTES // TS_PACKET) + b"junk" * 1000)
+    assert sniff_file(str(path)) == ".ts"
+
+
+def test_sniff_files_matches_sniff_file(tmp_path):
+    paths = []
+    for name, (header, _) in HEADERS.items():
+        path = tmp_path / name.replace(" ", "_")
+        path.write_bytes(header)
+        paths.append(str(path))
+    missing = str(tmp_path / "missing")
+    results = sniff_files(paths + [missing])
+    expected = {path: sniff_file(path) for path in paths}
+    expected[missing] = None
+    assert results == expected
+    assert sniff_files(paths, workers=1) == {path: results[path] for path in paths}
+
+
+@pytest.mark.parametrize("name, expected", [("ts", ".ts"), ("m2ts", ".m2ts")])
+def test_sanitize_adds_transport_stream_extension(tmp_path, name, expected):
+    root = str(tmp_path / "lib")
+    os.makedirs(os.path.join(root, "pkg"))
+    with open(os.path.join(root, "pkg", "recording"), "wb") as f:
+        f.write(HEADERS[name][0])
+    plan = plan_renames(root, Inventory(root))
+    assert [(os.path.relpath(old, root), os.path.relpath(new, root)) for old, new, _, _ in plan] == [
+        (os.path.join("pkg", "recording"), os.path.join("pkg", "recording" + expected))]
@@ -0,0 +1,121 @@
+# test_sync_manifest.py
+import os
+import json
+import hashlib
+import pytest
+import file_mover
+from inventory import Inventory
+from sync_manifest import SyncManifest, MANIFEST_FILE
+
+
+@pytest.fixture
+def pair(tmp_path):
+    """A source video and its copy, with distinct mtimes."""
+    src = tmp_path / "src.mp4"
+    dst_dir = tmp_path / "target"
+    dst_dir.mkdir()
+    dst = dst_dir / "src.mp4"
+    src.write_bytes(b"video data")
+    dst.write_bytes(b"video data")
+    os.utime(src, ns=(1_000_000_000_000_000_000, 1_000_000_000_000_000_000))
+    os.utime(dst, ns=(1_100_000_000_000_000_000, 1_100_000_000_000_000_000))
+    return src, dst_dir, dst
+
+
+def test_unknown_file_is_changed(pair):
+    src, dst_dir, dst = pair
+    assert not SyncManifest(str(dst_dir)).unchanged("src.mp4", os.stat(src), str(dst))
+
+
+def test_recorded_file_is_unchanged_after_reload(pair):
+    src, dst_dir, dst = pair
+    manifest = SyncManifest(str(dst_dir))
+    manifest.record("src.mp4", os.stat(src), str(dst), checksum="abc")
+    manifest.save()
+    reloaded = SyncManifest(str(dst_dir))
+    assert reloaded.unchanged("src.mp4", os.stat(src), str(dst))
+    assert reloaded.entries["src.mp4"]["checksum"] == "abc"
+    assert not os.path.exists(str(dst_dir / MANIFEST_FILE) + ".tmp")
+
+
+@pytest.mark.parametrize("change", ["source touched", "source grew", "copy touched", "copy grew", "copy deleted"])
+def test_any_change_on_either_side_is_changed(pair, change):
+    src, dst_dir, dst = pair
+    manifest = SyncManifest(str(dst_dir))
+    manifest.record("src.mp4", os.stat(src), str(dst))
+    if change == "source touched":
+        os.utime(src, ns=(1_200_000_000_000_000_000, 1_200_000_000_000_000_000))
+    elif change == "source grew":
+        with open(src, "ab") as f:
+            f.write(b"more")
+        os.utime(src, ns=(1_000_000_000_000_000_000, 1_000_000_000_000_000_000))
+    elif change == "copy touched":
+        os.utime(dst, ns=(1_200_000_000_000_000_000, 1_200_000_000_000_000_000))
+    elif change == "copy grew":
+        with open(dst, "ab") as f:
+            f.write(b"more")
+        os.utime(dst, ns=(1_100_000_000_000_000_000, 1_100_000_000_000_000_000))
+    else:
+        dst.unlink()
+    assert not manifest.unchanged("src.mp4", os.stat(src), str(dst))
+
+
+def test_forget_drops_entry(pair):
+    src, dst_dir, dst = pair
+    manifest = SyncManifest(str(dst_dir))
+    manifest.record("src.mp4", os.stat(src), str(dst))
+    manifest.forget("src.mp4")
+    manifest.forget("never-recorded.mp4")
+    assert not manifest.unchanged("src.mp4", os.stat(src), str(dst))
+
+
+def test_unreadable_manifest_counts_everything_changed(pair):
+    src, dst_dir, dst = pair
+    (dst_dir / MANIFEST_FILE).write_text("{not json")
+    assert SyncManifest(str(dst_dir)).entries == {}
+
+
+@pytest.fixture
+def library(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)  # download_tracker keeps its snapshot in the working directory
+    src_dir = tmp_path / "library"
+    for rel in ("a/one.mp4", "b/two.mkv"):
+        (src_dir / rel).parent.mkdir(parents=True, exist_ok=True)
+        (src_dir / rel).write_bytes(rel.encode() * 100)
+    monkeypatch.setattr(file_mover, "get_root_dir", lambda: str(src_dir))
+    return src_dir, tmp_path / "target"
+
+
+def copied(capsys):
+    return sorted(line.split(" -> ")[0].split(": ", 1)[1]
+                  for line in capsys.readouterr().out.splitlines() if "Copied:" in line)
+
+
+def test_sync_copies_only_changed_videos(library, capsys):
+    src_dir, dst_dir = library
+    file_mover.copy_all_contents(str(dst_dir), Inventory(str(src_dir)), sync=True)
+    assert copied(capsys) == [str(src_dir / "a" / "one.mp4"), str(src_dir / "b" / "two.mkv")]
+
+    file_mover.copy_all_contents(str(dst_dir), Inventory(str(src_dir)), sync=True)
+    assert copied(capsys) == []
+
+    (src_dir / "b" / "two.mkv").write_bytes(b"re-downloaded")
+    file_mover.copy_all_contents(str(dst_dir), Inventory(str(src_dir)), sync=True)
+    assert copied(capsys) == [str(src_dir / "b" / "two.mkv")]
+    assert (dst_dir / "b" / "two.mkv").read_bytes() == b"re-downloaded"
+
+
+def test_sync_dry_run_copies_nothing(library, capsys):
+    src_dir, dst_dir = library
+    file_mover.copy_all_contents(str(dst_dir), Inventory(str(src_dir)), sync=True, dry_run=True)
+    assert "would copy 2 video files" in capsys.readouterr().out
+    assert not dst_dir.exists()
+
+
+def test_sync_checksum_recorded(library):
+    src_dir, dst_dir = library
+    file_mover.copy_all_contents(str(dst_dir), Inventory(str(src_dir)), sync=True, checksum=True)
+    with open(dst_dir / MANIFEST_FILE, encoding="utf-8") as f:
+        entries = json.load(f)
+    data = (src_dir / "a" / "one.mp4").read_bytes()
+    assert entries[os.path.join("a", "one.mp4")]["checksum"] == hashlib.blake2b(data, digest_size=32).hexdigest()
@@ -0,0 +1,77 @@
+# test_watcher.py
+import os
+import time
+import pytest
+import watcher
+from download_tracker import STALE_SECONDS, ABANDONED_SECONDS
+from watcher import package_ready, process_package
+
+
+@pytest.fixture(autouse=True)
+def workdir(tmp_path, monkeypatch):
+    # The tracker's snapshots and the rename journal live in the working directory
+    monkeypatch.chdir(tmp_path)
+
+
+def make_package(root, part_age=None):
+    package = root / "package"
+    package.mkdir()
+    (package / "clip.mp4").write_bytes(b"video")
+    if part_age is not None:
+        part = package / "next.mp4.part"
+        part.write_bytes(b"partial")
+        then = time.time() - part_age
+        os.utime(part, (then, then))
+    return package
+
+
+def test_package_without_parts_is_ready(tmp_path):
+    assert package_ready(str(make_package(tmp_path)))
+
+
+def test_package_without_videos_is_not_ready(tmp_path):
+    (tmp_path / "empty").mkdir()
+    assert not package_ready(str(tmp_path / "empty"))
+
+
+@pytest.mark.parametrize("age", [0, 2 * STALE_SECONDS, ABANDONED_SECONDS - 60])
+def test_paused_part_blocks_package(tmp_path, age):
+    assert not package_ready(str(make_package(tmp_path, part_age=age)))
+
+
+def test_abandoned_part_releases_package(tmp_path):
+    assert package_ready(str(make_package(tmp_path, part_age=ABANDONED_SECONDS + 60)))
+
+
+@pytest.fixture
+def stages(monkeypatch):
+    """Stub out the probing/moving stages and record the package each one got."""
+    seen = {}
+    monkeypatch.setattr(watcher, "analyze_directory", lambda package, inventory: seen.setdefault("analyze", package))
+    monkeypatch.setattr(watcher, "remove_duplicates", lambda package, inventory: seen.setdefault("dedupe", package))
+    monkeypatch.setattr(watcher, "get_target_dir", lambda: "target")
+    monkeypatch.setattr(watcher, "move_all_contents",
+                        lambda target, inventory, sync, top: seen.setdefault("move", (top, sorted(inventory.files(top)))))
+    return seen
+
+
+def test_process_package_renames_through_planner(tmp_path, stages):
+    root = tmp_path / "downloads"
+    (root / "Show").mkdir(parents=True)
+    package = root / "Show #new"
+    package.mkdir()
+    (package / "Clip #1.mp4").write_bytes(b"video")
+
+    process_package(str(package))
+
+    renamed = str(root / "Show (2)")
+    assert stages["analyze"] == stages["dedupe"] == renamed
+    assert stages["move"] == (renamed, [os.path.join(renamed, "Clip.mp4")])
+    assert os.path.exists("rename_journal.jsonl")
+    assert (root / "Show").is_dir() and not os.listdir(root / "Show")
+
+
+def test_process_package_with_clean_name_keeps_folder(tmp_path, stages):
+    package = make_package(tmp_path)
+    process_package(str(package))
+    assert stages["move"] == (str(package), [str(package / "clip.mp4")])
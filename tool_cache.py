@@ -0,0 +1,134 @@
+# tool_cache.py
+import os
+import json
+import shutil
+import platform
+import subprocess
+
+TOOLS_CACHE_FILE = "tools_cache.json"
+
+# Where perform() already looks for ffmpeg on Windows when it isn't on PATH
+WINDOWS_FALLBACK_DIR = r"C:\ffmpeg\bin"
+
+# One tiny synthetic frame; enough to prove an encoder can actually open and encode
+TEST_ENCODE_INPUT = ['-f', 'lavfi', '-i', 'color=c=black:s=256x256:d=0.1', '-pix_fmt', 'yuv420p', '-frames:v', '1']
+
+_memo = {}
+
+
+def resolve_tool(tool):
+    """Full path of an ffmpeg tool, or None if it can't be found."""
+    path = shutil.which(tool)
+    if path is None and platform.system() == 'Windows':
+        candidate = os.path.join(WINDOWS_FALLBACK_DIR, f"{tool}.exe")
+        if os.path.exists(candidate):
+            path = candidate
+    return path
+
+
+def _binary_key(path):
+    st = os.stat(path)
+    return {"path": path, "size": st.st_size, "mtime_ns": st.st_mtime_ns}
+
+
+def _load():
+    if os.path.exists(TOOLS_CACHE_FILE):
+        try:
+            with open(TOOLS_CACHE_FILE, "r") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            pass
+    return {}
+
+
+def _save(cache):
+    with open(TOOLS_CACHE_FILE, "w") as f:
+        json.dump(cache, f, indent=2)
+
+
+def _entry(tool):
+    """Cached facts about a tool's current binary, reset whenever the binary changes."""
+    path = resolve_tool(tool)
+    if path is None:
+        return None, None
+    key = _binary_key(path)
+    if tool in _memo and _memo[tool]["key"] == key:
+        return path, _memo[tool]["facts"]
+    cache = _load()
+    stored = cache.get(tool, {})
+    facts = stored.get("facts", {}) if stored.get("key") == key else {}
+    _memo[tool] = {"key": key, "facts": facts}
+    return path, facts
+
+
+def _store(tool, **facts):
+    _memo[tool]["facts"].update(facts)
+    cache = _load()
+    cache[tool] = {"key": _memo[tool]["key"], "facts": _memo[tool]["facts"]}
+    _save(cache)
+
+
+def get_tool_version(tool):
+    """First line of `tool -version`, cached until the binary changes; None if unusable."""
+    path, facts = _entry(tool)
+    if path is None:
+        return None
+    if "version" not in facts:
+        try:
+            result = subprocess.run([path, '-version'], capture_output=True, text=True, check=True, timeout=5)
+        except (subprocess.CalledProcessError, OSError, subprocess.TimeoutExpired):
+            return None
+        _store(tool, version=(result.stdout.splitlines() or [""])[0])
+    return facts["version"]
+
+
+def list_encoders(ffmpeg_path):
+    """Encoder names from `ffmpeg -encoders`, parsed by column rather than substring."""
+    result = subprocess.run([ffmpeg_path, '-hide_banner', '-encoders'], capture_output=True, text=True, timeout=10)
+    names = set()
+    started = False
+    for line in result.stdout.splitlines():
+        if line.strip().startswith('------'):
+            started = True
+            continue
+        parts = line.split()
+        # Rows look like " V....D libx264   description"; without a separator
+        # line (older builds), accept any row with a flags column
+        if len(parts) >= 2 and (started or len(parts[0]) == 6):
+            names.add(parts[1])
+    return names
+
+
+def encoder_works(ffmpeg_path, encoder):
+    """Encode one synthetic frame with `encoder` and report whether it succeeded."""
+    cmd = [ffmpeg_path, '-v', 'error', '-hide_banner'] + TEST_ENCODE_INPUT + ['-c:v', encoder, '-f', 'null', '-']
+    try:
+        return subprocess.run(cmd, capture_output=True, timeout=30).returncode == 0
+    except (OSError, subprocess.TimeoutExpired):
+        return False
+
+
+def get_usable_encoders(encoder_map):
+    """Pick the first working encoder for each codec, testing each candidate once per ffmpeg build.
+
+    encoder_map maps codec -> candidate encoder names in preference order.
+    Returns (codec -> encoder), or None if ffmpeg can't be found.
+    """
+    path, facts = _entry('ffmpeg')
+    if path is None:
+        return None
+    tested = dict(facts.get("encoders", {}))
+    candidates = {e for encoders in encoder_map.values() for e in encoders}
+    if not candidates.issubset(tested):
+        listed = list_encoders(path)
+        for encoder in candidates - set(tested):
+            tested[encoder] = encoder in listed and encoder_works(path, encoder)
+        _store('ffmpeg', encoders=tested)
+
+    available = {}
+    for codec, encoders in encoder_map.items():
+        for encoder in encoders:
+            if tested.get(encoder):
+                available[codec] = encoder
+                break
+    return available
@@ -2,9 +2,15 @@
 import os
 import subprocess
 import json
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 from colorama import Fore, Style
+from probe_cache import cached_probe
+from container_probe import probe_headers
+from profiler import profiled
 
-VIDEO_EXTENSIONS = {".mp4", ".mkv", ".avi", ".mov", ".webm", ".flv"}
+VIDEO_EXTENSIONS = {".mp4", ".mkv", ".avi", ".mov", ".webm", ".flv", ".ts", ".m2ts"}
 FFPROBE_FIELDS = {
     "r_frame_rate": "Frame Rate",
     "width": "Width",
@@ -12,6 +18,10 @@ FFPROBE_FIELDS = {
     "bit_rate": "Bitrate",
     "duration": "Duration",
 }
+PROBE_TIMEOUT = 30
+
+_probe_pool = {"jobs": os.cpu_count() or 1, "executor": None}
+_probe_pool_lock = threading.Lock()
 
 def is_video_file(filename):
     return any(filename.lower().endswith(ext) for ext in VIDEO_EXTENSIONS)
@@ -19,31 +29,113 @@ def is_video_file(filename):
 def is_part_file(filename):
     return filename.endswith('.part')
 
-def get_video_info(filepath):
+@profiled("ffprobe")
+def run_ffprobe(filepath):
+    """Run a full ffprobe of filepath and return its parsed JSON output."""
+    result = subprocess.run(
+        ['ffprobe', '-v', 'error', '-print_format', 'json', '-show_format', '-show_streams', filepath],
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+        timeout=PROBE_TIMEOUT
+    )
+    if result.returncode != 0:
+        return {"error": result.stderr.decode(errors="replace").strip() or f"ffprobe exited with {result.returncode}"}
+    return json.loads(result.stdout)
+
+def probe_video(filepath):
+    """Read MP4/MKV headers natively; spawn ffprobe only for other containers or parse failures."""
+    return probe_headers(filepath) or run_ffprobe(filepath)
+
+@profiled("get_video_info")
+def get_video_info(filepath, stat_result=None):
     try:
-        result = subprocess.run(
-            ['ffprobe', '-v', 'error', '-select_streams', 'v:0', '-show_entries',
-             'stream=width,height,r_frame_rate,bit_rate,duration', '-of', 'json', filepath],
-            stdout=subprocess.PIPE,
-            stderr=subprocess.PIPE,
-            check=True
-        )
-        data = json.loads(result.stdout)
-        stream = data.get("streams", [{}])[0]
+        data = cached_probe(filepath, probe_video, stat_result)
+        if "error" in data:
+            return {"error": data["error"]}
+        stream = next(s for s in data.get("streams", []) if s.get("codec_type") == "video")
+        stream = {k: stream.get(k) for k in FFPROBE_FIELDS if k in stream}
 
         if "r_frame_rate" in stream:
             num, denom = stream["r_frame_rate"].split('/')
             stream["r_frame_rate"] = round(float(num) / float(denom), 2)
 
         info = {FFPROBE_FIELDS[k]: stream.get(k, None) for k in FFPROBE_FIELDS}
-        size_mb = os.path.getsize(filepath) / (1024 * 1024)
-        info["Size (MB)"] = round(size_mb, 2)
+        size = stat_result.st_size if stat_result is not None else os.path.getsize(filepath)
+        info["Size (MB)"] = round(size / (1024 * 1024), 2)
         info["name"] = filepath
 
         return info
+    except StopIteration:
+        return {"error": "no video stream"}
     except Exception as e:
         return {"error": str(e)}
 
+def set_probe_jobs(jobs):
+    """Set how many ffprobe processes may run at once (defaults to the CPU count)."""
+    jobs = max(1, jobs or os.cpu_count() or 1)
+    with _probe_pool_lock:
+        if jobs == _probe_pool["jobs"]:
+            return
+        if _probe_pool["executor"] is not None:
+            _probe_pool["executor"].shutdown(wait=True)
+            _probe_pool["executor"] = None
+        _probe_pool["jobs"] = jobs
+
+def _get_probe_executor():
+    with _probe_pool_lock:
+        if _probe_pool["executor"] is None:
+            _probe_pool["executor"] = ThreadPoolExecutor(max_workers=_probe_pool["jobs"],
+                                                         thread_name_prefix="ffprobe")
+        return _probe_pool["executor"]
+
+def _inventory_prober(inventory):
+    """get_video_info that reuses the inventory's cached stat instead of stat-ing again."""
+    def probe(filepath):
+        try:
+            stat_result = inventory.stat(filepath)
+        except (KeyError, OSError):
+            stat_result = None
+        return get_video_info(filepath, stat_result)
+    return probe
+
+def map_on_probe_pool(fn, items, ahead=None):
+    """Run fn over items on the shared subprocess pool, yielding results in input order.
+
+    With `ahead`, at most the pool size plus `ahead` calls are in flight at
+    once, so a consumer that stops taking results also stops the submissions.
+    """
+    if _probe_pool["jobs"] == 1:
+        return map(fn, items)
+    if ahead is not None:
+        return _map_windowed(fn, items, _probe_pool["jobs"] + ahead)
+    items = list(items)
+    if len(items) <= 1:
+        return map(fn, items)
+    return _get_probe_executor().map(fn, items)
+
+def _map_windowed(fn, items, window):
+    executor = _get_probe_executor()
+    futures = deque()
+    try:
+        for item in items:
+            futures.append(executor.submit(fn, item))
+            if len(futures) >= window:
+                yield futures.popleft().result()
+        while futures:
+            yield futures.popleft().result()
+    finally:
+        # Abandoned early (interrupted): don't leave queued probes behind on the shared pool
+        for future in futures:
+            future.cancel()
+
+def iter_video_infos(filepaths, inventory=None):
+    """Probe files concurrently on the shared pool, yielding infos in input order."""
+    probe = get_video_info if inventory is None else _inventory_prober(inventory)
+    return map_on_probe_pool(probe, filepaths)
+
+def get_video_infos(filepaths, inventory=None):
+    return list(iter_video_infos(filepaths, inventory))
+
 def calculate_quality_score(info):
     score = 0
     width = info.get("Width") or 0
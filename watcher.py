@@ -0,0 +1,245 @@
+# watcher.py
+import os
+import time
+import errno
+import select
+import struct
+import ctypes
+import ctypes.util
+from colorama import Fore, Style
+from config_handler import get_target_dir
+from inventory import Inventory
+from download_tracker import DownloadTracker, ABANDONED_SECONDS
+from sanitizer import plan_package_renames, apply_plan
+from analyzer import analyze_directory
+from deduplicator import remove_duplicates
+from file_mover import move_all_contents, is_video_file
+from codec_processor import perform
+
+# Seconds a package folder must stay quiet before it is processed
+DEBOUNCE_SECONDS = 5.0
+POLL_INTERVAL = 2.0
+
+# inotify(7) constants
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_MOVE_SELF = 0x00000800
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ISDIR = 0x40000000
+IN_NONBLOCK = 0o4000
+IN_CLOEXEC = 0o2000000
+# No IN_MODIFY: active downloads write constantly, and a finished download
+# shows up as its .part being renamed or closed anyway
+WATCH_MASK = (IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE
+              | IN_DELETE_SELF | IN_MOVE_SELF)
+EVENT_HEADER = struct.Struct("iIII")
+
+
+class InotifyWatcher:
+    """Recursive inotify watch on a tree through libc, reporting changed paths."""
+
+    def __init__(self, root):
+        libc_name = ctypes.util.find_library("c")
+        if libc_name is None:
+            raise OSError(errno.ENOSYS, "libc not found")
+        self.libc = ctypes.CDLL(libc_name, use_errno=True)
+        if not hasattr(self.libc, "inotify_init1"):
+            raise OSError(errno.ENOSYS, "inotify not available")
+        self.root = root
+        self.fd = self.libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        self.paths = {}
+        self.add_tree(root)
+
+    def add_watch(self, path):
+        wd = self.libc.inotify_add_watch(self.fd, os.fsencode(path), WATCH_MASK)
+        if wd < 0:
+            err = ctypes.get_errno()
+            if err == errno.ENOSPC:
+                raise OSError(err, "inotify watch limit reached (fs.inotify.max_user_watches)")
+            return  # directory vanished before we got to it
+        self.paths[wd] = path
+
+    def add_tree(self, top):
+        for dirpath, _, _ in os.walk(top):
+            self.add_watch(dirpath)
+
+    def wait(self, timeout=None):
+        """Block until events arrive (or timeout) and return the set of paths they touched."""
+        ready, _, _ = select.select([self.fd], [], [], timeout)
+        if not ready:
+            return set()
+        try:
+            data = os.read(self.fd, 64 * 1024)
+        except BlockingIOError:
+            return set()
+        changed = set()
+        offset = 0
+        while offset + EVENT_HEADER.size <= len(data):
+            wd, mask, _, length = EVENT_HEADER.unpack_from(data, offset)
+            name = os.fsdecode(data[offset + EVENT_HEADER.size:offset + EVENT_HEADER.size + length].rstrip(b"\0"))
+            offset += EVENT_HEADER.size + length
+            if mask & IN_Q_OVERFLOW:
+                changed.add(self.root)  # events were lost; everything may have changed
+                continue
+            path = self.paths.get(wd)
+            if path is None:
+                continue
+            if mask & IN_IGNORED:
+                del self.paths[wd]
+                continue
+            changed.add(os.path.join(path, name) if name else path)
+            if mask & IN_ISDIR and mask & (IN_CREATE | IN_MOVED_TO):
+                # New folders (e.g. a package moved in whole) need their own watches
+                self.add_tree(os.path.join(path, name))
+        return changed
+
+    def close(self):
+        os.close(self.fd)
+
+
+class PollingWatcher:
+    """Portable fallback: re-stat the tree every interval and report package folders that changed."""
+
+    def __init__(self, root, interval=POLL_INTERVAL):
+        self.root = root
+        self.interval = interval
+        self.signatures = self.snapshot()
+
+    def snapshot(self):
+        signatures = {}
+        try:
+            packages = [entry.path for entry in os.scandir(self.root) if entry.is_dir()]
+        except OSError:
+            return signatures
+        for package in packages:
+            state = []
+            for dirpath, _, filenames in os.walk(package):
+                for name in filenames:
+                    try:
+                        st = os.stat(os.path.join(dirpath, name))
+                    except OSError:
+                        continue
+                    state.append((dirpath, name, st.st_size, st.st_mtime_ns))
+            signatures[package] = tuple(sorted(state))
+        return signatures
+
+    def wait(self, timeout=None):
+        time.sleep(self.interval if timeout is None else min(timeout, self.interval))
+        signatures = self.snapshot()
+        changed = {path for path in signatures.keys() | self.signatures.keys()
+                   if signatures.get(path) != self.signatures.get(path)}
+        self.signatures = signatures
+        return changed
+
+    def close(self):
+        pass
+
+
+def make_watcher(root, poll=False):
+    if not poll:
+        try:
+            return InotifyWatcher(root)
+        except (OSError, AttributeError) as e:
+            print(Fore.YELLOW + f"inotify unavailable ({e}); polling every {POLL_INTERVAL}s instead" + Style.RESET_ALL)
+    return PollingWatcher(root)
+
+
+def package_of(root, path):
+    """The top-level package folder under root that contains path, or None."""
+    rel = os.path.relpath(path, root)
+    if rel == os.curdir or rel.startswith(os.pardir):
+        return None
+    return os.path.join(root, rel.split(os.sep)[0])
+
+
+def package_ready(package):
+    """A package is finished when it holds at least one video and no .part file that may still grow.
+
+    A download can sit paused for far longer than the stale window the
+    other operations use, so here any part counts as unfinished until
+    download_tracker has seen no write to it for ABANDONED_SECONDS.
+    """
+    tracker = DownloadTracker(package, stale_after=ABANDONED_SECONDS)
+    states = tracker.classify()
+    tracker.save()
+    if "active" in states.values():
+        return False
+    return any(is_video_file(os.path.basename(path)) for path in tracker.inventory.files(package))
+
+
+def process_package(package, encode=False, encode_jobs=None, sync=False):
+    """Sanitize, analyze, dedupe, optionally re-encode, then move one finished package.
+
+    The package folder and its contents are renamed as one sanitize plan, so
+    a cleaned name that is already taken gets a suffix and -usn can undo it.
+    """
+    print(Fore.GREEN + f"\n📦 Package finished: {package}" + Style.RESET_ALL)
+    # Only this package is scanned; the rest of the tree is never touched
+    inventory = Inventory(package)
+    plan = plan_package_renames(package, inventory)
+    if plan:
+        apply_plan(plan, inventory)
+        old_path, new_path = plan[-1][:2]
+        if old_path == package and os.path.isdir(new_path):
+            # The inventory is rooted at the old folder name; rescan under the new one
+            package = new_path
+            inventory = Inventory(package)
+
+    analyze_directory(package, inventory=inventory)
+    remove_duplicates(package, inventory)
+    if encode:
+        perform(dry_run=False, inventory=inventory, jobs=encode_jobs, directory=package, confirm=False)
+    move_all_contents(get_target_dir(), inventory, sync=sync, top=package)
+
+
+def watch(root, debounce=DEBOUNCE_SECONDS, poll=False, encode=False, encode_jobs=None, sync=False):
+    """Process each package folder under root as soon as its downloads finish.
+
+    Packages already present are checked once at startup. After that the
+    loop sleeps in the watcher until something changes, so an idle tree
+    costs no CPU; a package is handled once it has been quiet for
+    `debounce` seconds and has no .part files that could still be resumed.
+    """
+    watcher = make_watcher(root, poll)
+    print(Fore.CYAN + f"👀 Watching {root} ({type(watcher).__name__}); Ctrl+C to stop" + Style.RESET_ALL)
+    now = time.monotonic()
+    pending = {entry.path: now - debounce for entry in os.scandir(root) if entry.is_dir()}
+    try:
+        while True:
+            now = time.monotonic()
+            for package, last_event in list(pending.items()):
+                if now - last_event < debounce:
+                    continue
+                del pending[package]
+                if os.path.isdir(package) and package_ready(package):
+                    try:
+                        process_package(package, encode, encode_jobs, sync)
+                    except Exception as e:
+                        print(Fore.RED + f"⚠️  Failed to process {package}: {e}" + Style.RESET_ALL)
+
+            timeout = None
+            if pending:
+                timeout = max(0.0, min(pending.values()) + debounce - time.monotonic())
+            changed = watcher.wait(timeout)
+            now = time.monotonic()
+            for path in changed:
+                if path == root:
+                    # Lost events or root itself changed: recheck every package
+                    for entry in os.scandir(root):
+                        if entry.is_dir():
+                            pending[entry.path] = now
+                    continue
+                package = package_of(root, path)
+                if package is not None:
+                    pending[package] = now
+    except KeyboardInterrupt:
+        print(Fore.YELLOW + "\nStopped watching." + Style.RESET_ALL)
+    finally:
+        watcher.close()